@@ -0,0 +1,74 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Any, Optional
+
+from .models import User, PushToken, NotificationPreference
+
+
+DEFAULT_PUSH_PREFERENCES = {
+    'push_enabled': True,
+    'push_marketing': True,
+    'push_transactional': True,
+    'push_security': True,
+}
+
+
+def profile_key(user_id: Any) -> Optional[str]:
+    """
+    Key of a user's profile in build_delivery_profiles results ("007" -> "7"),
+    or None for ids that can't belong to a user
+    """
+    return str(int(user_id)) if str(user_id).isdigit() else None
+
+
+def build_delivery_profiles(user_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Build push delivery profiles for many users in a constant number of queries
+
+    Preferences are read first and push tokens are only queried for users who
+    have push enabled. Unknown, inactive or non-numeric ids are left out of the
+    result.
+
+    Args:
+        user_ids: User ids (ints or numeric strings)
+
+    Returns:
+        Dict mapping profile_key(user_id) to the user's delivery profile
+    """
+    ids = {int(user_id) for user_id in user_ids if str(user_id).isdigit()}
+    if not ids:
+        return {}
+
+    preferences = {
+        row.pop('user_id'): row
+        for row in NotificationPreference.objects.filter(
+            user_id__in=ids,
+            user__is_active=True
+        ).values(
+            'user_id', 'push_enabled', 'push_marketing', 'push_transactional', 'push_security'
+        )
+    }
+
+    # Preferences are created lazily, so users without a row get the model defaults
+    missing = ids - preferences.keys()
+    if missing:
+        for user_id in User.objects.filter(id__in=missing, is_active=True).values_list('id', flat=True):
+            preferences[user_id] = dict(DEFAULT_PUSH_PREFERENCES)
+
+    enabled = [user_id for user_id, prefs in preferences.items() if prefs['push_enabled']]
+    push_tokens = defaultdict(list)
+    if enabled:
+        for token in PushToken.objects.filter(
+            user_id__in=enabled,
+            is_active=True
+        ).order_by('user_id', '-updated_at').values('user_id', 'token', 'device_type'):
+            push_tokens[token.pop('user_id')].append(token)
+
+    return {
+        str(user_id): {
+            'user_id': str(user_id),
+            'push_enabled': prefs.pop('push_enabled'),
+            'preferences': prefs,
+            'push_tokens': push_tokens.get(user_id, []),
+        }
+        for user_id, prefs in preferences.items()
+    }
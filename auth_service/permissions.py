@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 from .models import User
 
@@ -61,4 +64,18 @@ class IsOwnerOrAdmin(permissions.BasePermission):
         elif hasattr(obj, 'supplier'):
             return obj.supplier == request.user
         
-        return False 
\ No newline at end of file
+        return False 
+
+
+class IsInternalService(permissions.BasePermission):
+    """
+    Permission for service-to-service endpoints
+    Requires the shared internal API key in the X-API-Key header;
+    every request is denied while INTERNAL_API_KEY is not configured
+    """
+    def has_permission(self, request, view):
+        expected = settings.INTERNAL_API_KEY
+        api_key = request.headers.get('X-API-Key')
+        if not expected or not api_key:
+            return False
+        return hmac.compare_digest(api_key.encode(), expected.encode())
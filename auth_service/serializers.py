@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
@@ -220,4 +221,15 @@ class UserListSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'username', 'phone_number', 'is_verified', 'created_at']
-        read_only_fields = ['id', 'created_at'] 
\ No newline at end of file
+        read_only_fields = ['id', 'created_at'] 
+
+
+class DeliveryProfileBatchSerializer(serializers.Serializer):
+    """
+    Serializer for internal batch delivery profile lookups
+    """
+    user_ids = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        allow_empty=False,
+        max_length=settings.INTERNAL_BATCH_MAX_USERS
+    )
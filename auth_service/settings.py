@@ -99,6 +99,20 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Shared key for internal service-to-service endpoints (/internal/...)
+# No default: while it is unset those endpoints reject every request
+INTERNAL_API_KEY = config('INTERNAL_API_KEY', default=None)
+INTERNAL_BATCH_MAX_USERS = config('INTERNAL_BATCH_MAX_USERS', default=500, cast=int)
+
+# Redis holding the push service's delivery profile cache, and its key prefix
+PUSH_CACHE_REDIS_URL = config(
+    'PUSH_CACHE_REDIS_URL',
+    default=f"redis://{config('REDIS_HOST', default='localhost')}:{config('REDIS_PORT', default='6379')}/0"
+)
+PUSH_DELIVERY_CACHE_PREFIX = config('PUSH_DELIVERY_CACHE_PREFIX', default='user_delivery_profile')
+# Pub/sub channel carrying push token / preference change events
+PUSH_CACHE_EVENTS_CHANNEL = config('PUSH_CACHE_EVENTS_CHANNEL', default='user_delivery_changes')
+
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
     default='http://localhost:3000,http://localhost:8000',
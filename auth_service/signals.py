@@ -1,6 +1,16 @@
-from django.db.models.signals import post_save
+import json
+import logging
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import User, NotificationPreference
+from .models import User, NotificationPreference, PushToken
+
+logger = logging.getLogger(__name__)
+
+_push_cache_client = None
 
 
 @receiver(post_save, sender=User)
@@ -12,3 +22,67 @@ def create_user_notification_preferences(sender, instance, created, **kwargs):
     if created:
         NotificationPreference.objects.get_or_create(user=instance)
 
+
+def _get_push_cache_client():
+    global _push_cache_client
+    if _push_cache_client is None:
+        _push_cache_client = redis.from_url(
+            settings.PUSH_CACHE_REDIS_URL,
+            socket_timeout=1,
+            socket_connect_timeout=1
+        )
+    return _push_cache_client
+
+
+def publish_delivery_change(user_id, kind, op):
+    """
+    Drop the push service's cached delivery profile for a user and publish a
+    compact change event so every push service process evicts its in-memory copy
+
+    Args:
+        user_id: Id of the user whose tokens or preferences changed
+        kind: 'token' or 'prefs'
+        op: 'save' or 'delete'
+
+    Failures are logged and ignored; the cache entries then expire on their own
+    """
+    if not settings.PUSH_CACHE_REDIS_URL:
+        return
+    event = json.dumps({'u': str(user_id), 'k': kind, 'op': op}, separators=(',', ':'))
+    try:
+        pipe = _get_push_cache_client().pipeline(transaction=False)
+        pipe.delete(f"{settings.PUSH_DELIVERY_CACHE_PREFIX}:{user_id}")
+        pipe.publish(settings.PUSH_CACHE_EVENTS_CHANNEL, event)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Failed to publish delivery change for user %s: %s", user_id, e)
+
+
+def _on_commit_publish(user_id, kind, op):
+    transaction.on_commit(lambda: publish_delivery_change(user_id, kind, op))
+
+
+@receiver(post_save, sender=PushToken)
+def push_token_saved(sender, instance, **kwargs):
+    """
+    Registering, updating or deactivating a token changes the user's delivery profile
+    """
+    _on_commit_publish(instance.user_id, 'token', 'save')
+
+
+@receiver(post_delete, sender=PushToken)
+def push_token_deleted(sender, instance, **kwargs):
+    _on_commit_publish(instance.user_id, 'token', 'delete')
+
+
+@receiver(post_save, sender=NotificationPreference)
+def notification_preference_saved(sender, instance, **kwargs):
+    """
+    Opt-outs must reach the push service within seconds, not after the cache TTL
+    """
+    _on_commit_publish(instance.user_id, 'prefs', 'save')
+
+
+@receiver(post_delete, sender=NotificationPreference)
+def notification_preference_deleted(sender, instance, **kwargs):
+    _on_commit_publish(instance.user_id, 'prefs', 'delete')
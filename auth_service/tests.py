@@ -1,3 +1,189 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import redis
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .delivery import DEFAULT_PUSH_PREFERENCES, build_delivery_profiles, profile_key
+from .models import User, PushToken, NotificationPreference
+
+
+def create_user(username, **kwargs):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password='secret-password-123',
+        **kwargs
+    )
+
+
+class DeliveryProfileBuilderTests(TestCase):
+    """
+    build_delivery_profiles: defaults, opt-outs, inactive users and token order
+    """
+
+    def setUp(self):
+        # Signals publish on commit, which TestCase never reaches
+        self.user = create_user('alice')
+        self.opted_out = create_user('bob')
+        NotificationPreference.objects.filter(user=self.opted_out).update(push_enabled=False)
+        self.inactive = create_user('carol', is_active=False)
+
+    def test_profiles_include_preferences_and_active_tokens_newest_first(self):
+        PushToken.objects.create(user=self.user, token='old-token', device_type='android')
+        PushToken.objects.create(user=self.user, token='new-token', device_type='ios')
+        PushToken.objects.create(user=self.user, token='dead-token', is_active=False)
+
+        profile = build_delivery_profiles([self.user.id])[str(self.user.id)]
+
+        self.assertTrue(profile['push_enabled'])
+        self.assertEqual(profile['preferences'], {
+            key: value for key, value in DEFAULT_PUSH_PREFERENCES.items() if key != 'push_enabled'
+        })
+        self.assertEqual(
+            profile['push_tokens'],
+            [
+                {'token': 'new-token', 'device_type': 'ios'},
+                {'token': 'old-token', 'device_type': 'android'},
+            ]
+        )
+
+    def test_opted_out_users_have_no_tokens_and_unknown_users_are_left_out(self):
+        PushToken.objects.create(user=self.opted_out, token='token-b')
+
+        profiles = build_delivery_profiles([self.opted_out.id, self.inactive.id, 999999, 'abc'])
+
+        self.assertEqual(list(profiles), [str(self.opted_out.id)])
+        self.assertFalse(profiles[str(self.opted_out.id)]['push_enabled'])
+        self.assertEqual(profiles[str(self.opted_out.id)]['push_tokens'], [])
+
+    def test_users_without_a_preference_row_get_the_defaults(self):
+        NotificationPreference.objects.filter(user=self.user).delete()
+
+        profile = build_delivery_profiles([str(self.user.id)])[str(self.user.id)]
+
+        self.assertTrue(profile['push_enabled'])
+        self.assertTrue(profile['preferences']['push_marketing'])
+
+    def test_profile_keys_are_canonical_ids(self):
+        self.assertEqual(profile_key('007'), '7')
+        self.assertEqual(profile_key(7), '7')
+        self.assertIsNone(profile_key('abc'))
+
+
+@override_settings(INTERNAL_API_KEY='test-internal-key')
+class DeliveryProfileEndpointTests(TestCase):
+    """
+    Internal delivery profile endpoints used by the push service
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_API_KEY='test-internal-key')
+        self.user = create_user('alice')
+        PushToken.objects.create(user=self.user, token='token-a', device_type='android')
+
+    def test_single_profile(self):
+        response = self.client.get(reverse('internal-delivery-profile', args=[self.user.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['push_tokens'], [{'token': 'token-a', 'device_type': 'android'}])
+
+    def test_unknown_user_is_404(self):
+        response = self.client.get(reverse('internal-delivery-profile', args=[999999]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.data['success'])
+
+    def test_requests_without_the_internal_key_are_rejected(self):
+        response = APIClient().post(reverse('internal-delivery-profiles-batch'), {'user_ids': ['1']}, format='json')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_wrong_key_is_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_X_API_KEY='your-api-key-for-service-communication')
+
+        response = client.get(reverse('internal-delivery-profile', args=[self.user.id]))
+
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(INTERNAL_API_KEY=None)
+    def test_requests_are_rejected_while_no_key_is_configured(self):
+        response = self.client.get(reverse('internal-delivery-profile', args=[self.user.id]))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_batch_reports_missing_ids_as_requested(self):
+        padded_id = f"00{self.user.id}"
+
+        response = self.client.post(
+            reverse('internal-delivery-profiles-batch'),
+            {'user_ids': [padded_id, '999999', 'abc', '999999']},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['data']['profiles']), [str(self.user.id)])
+        # The padded id found its profile; the others are reported once each
+        self.assertEqual(response.data['data']['missing'], ['999999', 'abc'])
+
+    def test_invalid_batch_uses_the_response_envelope(self):
+        response = self.client.post(
+            reverse('internal-delivery-profiles-batch'),
+            {'user_ids': []},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['success'])
+        self.assertEqual(response.data['error'], "Validation failed")
+        self.assertIn('user_ids', response.data['data'])
+
+
+@override_settings(PUSH_CACHE_REDIS_URL='redis://cache.test:6379/0')
+class DeliveryChangeSignalTests(TestCase):
+    """
+    Token and preference changes evict the push service's cached profile after commit
+    """
+
+    def setUp(self):
+        self.user = create_user('alice')
+        patcher = mock.patch('auth_service.signals._get_push_cache_client')
+        self.redis_client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.pipe = self.redis_client.pipeline.return_value
+
+    def test_token_changes_publish_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            PushToken.objects.create(user=self.user, token='token-a')
+
+        # Nothing is published until the transaction commits
+        self.pipe.execute.assert_not_called()
+        for callback in callbacks:
+            callback()
+
+        self.pipe.delete.assert_called_once_with(f"{settings.PUSH_DELIVERY_CACHE_PREFIX}:{self.user.id}")
+        channel, event = self.pipe.publish.call_args.args
+        self.assertEqual(channel, settings.PUSH_CACHE_EVENTS_CHANNEL)
+        self.assertEqual(event, f'{{"u":"{self.user.id}","k":"token","op":"save"}}')
+
+    def test_preference_changes_publish(self):
+        preference = NotificationPreference.objects.get(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            preference.push_enabled = False
+            preference.save()
+
+        self.assertIn('"k":"prefs"', self.pipe.publish.call_args.args[1])
+        self.pipe.execute.assert_called_once()
+
+    def test_redis_errors_are_swallowed(self):
+        self.pipe.execute.side_effect = redis.ConnectionError("cache down")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PushToken.objects.create(user=self.user, token='token-a')
+
+        self.pipe.execute.assert_called_once()
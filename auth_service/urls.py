@@ -9,4 +9,14 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('auth_service.urls')),
     path('health/', views.health_check, name='health'),
+    path(
+        'internal/users/<int:user_id>/delivery-profile/',
+        views.delivery_profile,
+        name='internal-delivery-profile'
+    ),
+    path(
+        'internal/users/batch/',
+        views.delivery_profiles_batch,
+        name='internal-delivery-profiles-batch'
+    ),
 ]
\ No newline at end of file
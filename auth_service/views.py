@@ -1,6 +1,6 @@
 from django.shortcuts import render
 from rest_framework import status, generics, viewsets
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
@@ -27,10 +27,12 @@ from .serializers import (
     PushTokenCreateSerializer,
     NotificationPreferenceSerializer,
     UserDetailSerializer,
-    UserListSerializer
+    UserListSerializer,
+    DeliveryProfileBatchSerializer
 )
 from .utils import create_response, create_pagination_meta
-from .permissions import IsOwnerOrAdmin
+from .delivery import build_delivery_profiles, profile_key
+from .permissions import IsOwnerOrAdmin, IsInternalService
 
 
 class StandardPagination(PageNumberPagination):
@@ -717,3 +719,65 @@ class UserListView(generics.ListAPIView):
             message="Users retrieved successfully",
             data=serializer.data
         )
+
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([IsInternalService])
+def delivery_profile(request, user_id):
+    """
+    Internal endpoint returning everything the push service needs to deliver
+    to a user: push preferences and active push tokens, in one round trip.
+    Preferences are read first so opted-out users never cost a token query.
+    """
+    profile = build_delivery_profiles([user_id]).get(str(user_id))
+
+    if profile is None:
+        return create_response(
+            success=False,
+            message="User not found",
+            error="User not found",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+
+    return create_response(
+        success=True,
+        message="Delivery profile retrieved successfully",
+        data=profile
+    )
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([IsInternalService])
+def delivery_profiles_batch(request):
+    """
+    Internal endpoint returning delivery profiles for up to
+    INTERNAL_BATCH_MAX_USERS users in a constant number of queries
+    """
+    serializer = DeliveryProfileBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return create_response(
+            success=False,
+            message="Invalid delivery profile request",
+            data=serializer.errors,
+            error="Validation failed",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+    user_ids = serializer.validated_data['user_ids']
+    profiles = build_delivery_profiles(user_ids)
+
+    return create_response(
+        success=True,
+        message="Delivery profiles retrieved successfully",
+        data={
+            'profiles': profiles,
+            # Requested ids as sent; profiles are keyed by profile_key
+            'missing': [
+                user_id for user_id in dict.fromkeys(user_ids)
+                if profile_key(user_id) not in profiles
+            ],
+        }
+    )
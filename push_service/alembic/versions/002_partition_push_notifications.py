@@ -0,0 +1,117 @@
+"""Range partition push_notifications on created_at
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-11-20 10:00:00.000000
+
+The existing table is not copied: it is renamed and attached as the
+partition for everything before the first new period. Because the partition
+key has to be part of every unique constraint, the primary key becomes
+(id, created_at) and notification_id is no longer unique.
+
+"""
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+INDEXED_COLUMNS = ('notification_id', 'user_id', 'request_id')
+LEGACY_PARTITION = 'push_notifications_legacy'
+# Daily partitions, named like the ones app/services/partition_maintenance.py
+# creates. Kept fixed here so the migration doesn't depend on application
+# code or settings; maintenance takes over from the configured interval.
+PARTITIONS_AHEAD = 7
+
+
+def _create_partition_sql(start: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS push_notifications_d{start:%Y%m%d} "
+        f"PARTITION OF push_notifications FOR VALUES FROM ('{start}') TO ('{start + timedelta(days=1)}')"
+    )
+
+
+def _columns():
+    return [
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('notification_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('template_code', sa.String(), nullable=False),
+        sa.Column('variables', sa.JSON(), nullable=True),
+        sa.Column('request_id', sa.String(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('metadata', sa.JSON(), nullable=True),
+        sa.Column('device_token', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('click_url', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.Column('failed_at', sa.DateTime(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('retry_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    # The legacy partition also takes rows written today
+    boundary = datetime.utcnow().date() + timedelta(days=1)
+
+    op.execute(f"ALTER TABLE push_notifications RENAME TO {LEGACY_PARTITION}")
+    op.execute(f"ALTER TABLE {LEGACY_PARTITION} RENAME CONSTRAINT push_notifications_pkey TO {LEGACY_PARTITION}_pkey")
+    for column in INDEXED_COLUMNS:
+        op.execute(f"ALTER INDEX ix_push_notifications_{column} RENAME TO ix_{LEGACY_PARTITION}_{column}")
+
+    op.create_table('push_notifications',
+    *_columns(),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    for column in INDEXED_COLUMNS:
+        op.create_index(op.f(f'ix_push_notifications_{column}'), 'push_notifications', [column], unique=False)
+
+    # Bring the old table in line with the partitioned parent, then attach it
+    op.execute(f"UPDATE {LEGACY_PARTITION} SET created_at = now() WHERE created_at IS NULL")
+    op.execute(f"ALTER TABLE {LEGACY_PARTITION} ALTER COLUMN created_at SET NOT NULL")
+    op.execute(
+        f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {LEGACY_PARTITION}_pkey, "
+        f"ADD CONSTRAINT {LEGACY_PARTITION}_pkey PRIMARY KEY (id, created_at)"
+    )
+    op.execute(f"DROP INDEX ix_{LEGACY_PARTITION}_notification_id")
+    op.execute(
+        f"ALTER TABLE push_notifications ATTACH PARTITION {LEGACY_PARTITION} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary}')"
+    )
+
+    for day in range(PARTITIONS_AHEAD):
+        op.execute(_create_partition_sql(boundary + timedelta(days=day)))
+
+
+def downgrade() -> None:
+    op.create_table('push_notifications_unpartitioned',
+    *_columns(),
+    sa.PrimaryKeyConstraint('id', name='push_notifications_unpartitioned_pkey')
+    )
+    columns = ', '.join(column.name for column in _columns())
+    op.execute(
+        f"INSERT INTO push_notifications_unpartitioned ({columns}) "
+        f"SELECT {columns} FROM push_notifications"
+    )
+
+    # Drops every attached partition; detached (retired) partitions are kept
+    op.drop_table('push_notifications')
+
+    op.execute("ALTER TABLE push_notifications_unpartitioned RENAME TO push_notifications")
+    op.execute("ALTER TABLE push_notifications RENAME CONSTRAINT push_notifications_unpartitioned_pkey TO push_notifications_pkey")
+    op.create_index(op.f('ix_push_notifications_notification_id'), 'push_notifications', ['notification_id'], unique=True)
+    op.create_index(op.f('ix_push_notifications_user_id'), 'push_notifications', ['user_id'], unique=False)
+    op.create_index(op.f('ix_push_notifications_request_id'), 'push_notifications', ['request_id'], unique=False)
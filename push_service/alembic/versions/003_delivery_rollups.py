@@ -0,0 +1,40 @@
+"""Per-minute delivery rollup counters
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-11-24 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('push_delivery_rollups',
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('template_code', sa.String(), nullable=False),
+    sa.Column('provider', sa.String(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket', 'status', 'template_code', 'provider')
+    )
+
+    # Backfill from the notifications that are still attached, so the
+    # rollups start with history instead of from zero
+    op.execute(
+        "INSERT INTO push_delivery_rollups (bucket, status, template_code, provider, count) "
+        "SELECT date_trunc('minute', COALESCE(delivered_at, updated_at, created_at)), "
+        "status, template_code, '', count(*) "
+        "FROM push_notifications WHERE status IN ('delivered', 'failed') "
+        "GROUP BY 1, 2, 3"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('push_delivery_rollups')
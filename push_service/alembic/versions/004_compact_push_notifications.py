@@ -0,0 +1,104 @@
+"""Compact push_notifications: uuid ids, enum status, jsonb
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-11-26 10:00:00.000000
+
+- id becomes a native uuid (16 bytes instead of 37) and notification_id,
+  a copy of id with its own index, is dropped
+- status becomes the notification_status enum (4 bytes) and NOT NULL
+- variables and metadata become jsonb
+- image_url, click_url, sent_at, failed_at and retry_count were never
+  written and are dropped
+
+Every attached partition is rewritten once by the combined ALTER TABLE,
+which also reclaims the space of the dropped columns. Partitions already
+detached by retention keep the old layout. When run online, the table and
+index sizes before and after are logged.
+
+"""
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+STATUSES = ('pending', 'delivered', 'failed')
+UNUSED_COLUMNS = (
+    ('image_url', 'VARCHAR'),
+    ('click_url', 'VARCHAR'),
+    ('sent_at', 'TIMESTAMP WITHOUT TIME ZONE'),
+    ('failed_at', 'TIMESTAMP WITHOUT TIME ZONE'),
+    ('retry_count', 'INTEGER'),
+)
+
+SIZE_QUERY = sa.text(
+    "SELECT count(*) AS partitions, "
+    "coalesce(sum(pg_table_size(c.oid)), 0) AS table_bytes, "
+    "coalesce(sum(pg_indexes_size(c.oid)), 0) AS index_bytes, "
+    "(SELECT avg(pg_column_size(t.*)) FROM (SELECT * FROM push_notifications LIMIT 10000) t) AS avg_row_bytes "
+    "FROM pg_inherits i "
+    "JOIN pg_class c ON c.oid = i.inhrelid "
+    "JOIN pg_class p ON p.oid = i.inhparent "
+    "WHERE p.relname = 'push_notifications'"
+)
+
+
+def _size_report():
+    if context.is_offline_mode():
+        return None
+    return op.get_bind().execute(SIZE_QUERY).mappings().one()
+
+
+def _log_sizes(before, after):
+    if before is None or after is None:
+        return
+    for key in ('table_bytes', 'index_bytes', 'avg_row_bytes'):
+        old, new = float(before[key] or 0), float(after[key] or 0)
+        change = f"{(new - old) / old:+.1%}" if old else "n/a"
+        logger.info(f"push_notifications {key}: {old:,.0f} -> {new:,.0f} ({change})")
+
+
+def upgrade() -> None:
+    before = _size_report()
+
+    op.execute(f"CREATE TYPE notification_status AS ENUM ({', '.join(repr(s) for s in STATUSES)})")
+    op.drop_index('ix_push_notifications_notification_id', table_name='push_notifications')
+    op.execute(
+        "ALTER TABLE push_notifications "
+        "DROP COLUMN notification_id, "
+        + "".join(f"DROP COLUMN {column}, " for column, _ in UNUSED_COLUMNS)
+        + "ALTER COLUMN id TYPE uuid USING id::uuid, "
+        "ALTER COLUMN status TYPE notification_status "
+        "USING COALESCE(status, 'pending')::notification_status, "
+        "ALTER COLUMN status SET NOT NULL, "
+        "ALTER COLUMN variables TYPE jsonb USING variables::jsonb, "
+        "ALTER COLUMN metadata TYPE jsonb USING metadata::jsonb"
+    )
+    op.execute("ANALYZE push_notifications")
+
+    _log_sizes(before, _size_report())
+
+
+def downgrade() -> None:
+    op.execute(
+        "ALTER TABLE push_notifications "
+        "ALTER COLUMN id TYPE varchar USING id::text, "
+        "ALTER COLUMN status DROP NOT NULL, "
+        "ALTER COLUMN status TYPE varchar USING status::text, "
+        "ALTER COLUMN variables TYPE json USING variables::json, "
+        "ALTER COLUMN metadata TYPE json USING metadata::json, "
+        + ", ".join(f"ADD COLUMN {column} {column_type}" for column, column_type in UNUSED_COLUMNS)
+        + ", ADD COLUMN notification_id varchar"
+    )
+    op.execute("UPDATE push_notifications SET notification_id = id")
+    op.execute("ALTER TABLE push_notifications ALTER COLUMN notification_id SET NOT NULL")
+    op.create_index(op.f('ix_push_notifications_notification_id'), 'push_notifications', ['notification_id'], unique=False)
+    op.execute("DROP TYPE notification_status")
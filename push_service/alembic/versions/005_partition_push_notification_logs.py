@@ -0,0 +1,95 @@
+"""Range partition push_notification_logs on timestamp
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-12-01 10:00:00.000000
+
+The delivery timeline gets at least two rows per device and notification,
+so it is partitioned like push_notifications (migration 002) and retired
+with it by app/services/partition_maintenance.py. The existing table is
+renamed and attached as the partition for everything before the first new
+period; the primary key becomes (id, timestamp).
+
+"""
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+LEGACY_PARTITION = 'push_notification_logs_legacy'
+# Daily partitions, named like the ones partition maintenance creates
+PARTITIONS_AHEAD = 7
+
+
+def _create_partition_sql(start: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS push_notification_logs_d{start:%Y%m%d} "
+        f"PARTITION OF push_notification_logs FOR VALUES FROM ('{start}') TO ('{start + timedelta(days=1)}')"
+    )
+
+
+def _columns():
+    return [
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('notification_id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('metadata', sa.JSON(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    # The legacy partition also takes rows written today
+    boundary = datetime.utcnow().date() + timedelta(days=1)
+
+    op.execute(f"ALTER TABLE push_notification_logs RENAME TO {LEGACY_PARTITION}")
+    op.execute(f"ALTER TABLE {LEGACY_PARTITION} RENAME CONSTRAINT push_notification_logs_pkey TO {LEGACY_PARTITION}_pkey")
+    op.execute(f"ALTER INDEX ix_push_notification_logs_notification_id RENAME TO ix_{LEGACY_PARTITION}_notification_id")
+
+    op.create_table('push_notification_logs',
+    *_columns(),
+    sa.PrimaryKeyConstraint('id', 'timestamp'),
+    postgresql_partition_by='RANGE (timestamp)'
+    )
+    op.create_index(op.f('ix_push_notification_logs_notification_id'), 'push_notification_logs', ['notification_id'], unique=False)
+
+    # Bring the old table in line with the partitioned parent, then attach it
+    op.execute(f"UPDATE {LEGACY_PARTITION} SET timestamp = now() WHERE timestamp IS NULL")
+    op.execute(f"ALTER TABLE {LEGACY_PARTITION} ALTER COLUMN timestamp SET NOT NULL")
+    op.execute(
+        f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {LEGACY_PARTITION}_pkey, "
+        f"ADD CONSTRAINT {LEGACY_PARTITION}_pkey PRIMARY KEY (id, timestamp)"
+    )
+    op.execute(
+        f"ALTER TABLE push_notification_logs ATTACH PARTITION {LEGACY_PARTITION} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary}')"
+    )
+
+    for day in range(PARTITIONS_AHEAD):
+        op.execute(_create_partition_sql(boundary + timedelta(days=day)))
+
+
+def downgrade() -> None:
+    op.create_table('push_notification_logs_unpartitioned',
+    *_columns(),
+    sa.PrimaryKeyConstraint('id', name='push_notification_logs_unpartitioned_pkey')
+    )
+    columns = ', '.join(column.name for column in _columns())
+    op.execute(
+        f"INSERT INTO push_notification_logs_unpartitioned ({columns}) "
+        f"SELECT {columns} FROM push_notification_logs"
+    )
+
+    # Drops every attached partition; detached (retired) partitions are kept
+    op.drop_table('push_notification_logs')
+
+    op.execute("ALTER TABLE push_notification_logs_unpartitioned RENAME TO push_notification_logs")
+    op.execute("ALTER TABLE push_notification_logs RENAME CONSTRAINT push_notification_logs_unpartitioned_pkey TO push_notification_logs_pkey")
+    op.create_index(op.f('ix_push_notification_logs_notification_id'), 'push_notification_logs', ['notification_id'], unique=False)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
 from typing import Dict, Any
 import asyncio
 import aio_pika
@@ -7,6 +8,7 @@ import structlog
 
 from app.core.config import settings
 from app.core.database import engine
+from app.utils.metrics import metrics
 
 logger = structlog.get_logger()
 router = APIRouter(tags=["health"])
@@ -63,4 +65,11 @@ async def readiness_check() -> Dict[str, Any]:
         "service": "push-service",
         "ready": True,
         "timestamp": asyncio.get_event_loop().time()
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> str:
+    """In-process metrics in the Prometheus text format"""
+    
+    return metrics.render_prometheus()
@@ -1,34 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
 import logging
 
-from app.core.database import AsyncSessionLocal
-from app.services.push_service import PushNotificationService
+from app.core.database import AsyncSessionLocal, ReadSessionLocal
+from app.services.batch_send import enqueue_batch
+from app.services.delivery_rollups import query_stats
+from app.services.push_service import PushNotificationService, queued_status
+from app.services.queue_producer import QueueProducer
+from app.services.status_cache import status_cache
+from app.utils.ids import uuid7
 from app.models.notification import (
     PushNotificationRequest,
     PushNotificationResponse,
-    NotificationStatusUpdate
+    NotificationStatusUpdate,
+    NotificationStatusBatchRequest,
+    PushNotificationBatchRequest
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/push", tags=["push"])
 
+# Shared by requests so accepting a notification doesn't open a connection
+queue_producer = QueueProducer()
 
-def get_db():
-    session = AsyncSessionLocal()
-    try:
-        return session
-    finally:
-        pass
+
+async def get_db():
+    async with AsyncSessionLocal() as session:
+        yield session
 
 
-@router.post("/send", response_model=PushNotificationResponse)
+async def get_read_db():
+    """Session on the read replica (the primary when none is configured)"""
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+@router.post("/send", response_model=PushNotificationResponse, status_code=status.HTTP_202_ACCEPTED)
 async def send_push_notification(
-    request: PushNotificationRequest
+    request: PushNotificationRequest,
+    response: Response,
+    sync: bool = False
 ):
-    """Send a push notification directly (for testing)"""
+    """Accept a push notification and queue it for the consumer
+    
+    Returns 202 with the notification id as soon as the message is on the
+    push queue; delivery, retries and the status record happen in the
+    consumer. Until then the status cache reports the id as pending.
+    ``sync=true`` delivers inline instead (for testing).
+    """
+    
+    request = request.model_copy(update={"notification_id": str(uuid7())})
+    
+    if sync:
+        response.status_code = status.HTTP_200_OK
+        return await _send_inline(request)
+    
+    try:
+        await queue_producer.publish_notification(
+            request.model_dump(mode="json"),
+            request.request_id
+        )
+    except Exception as e:
+        logger.error(f"Push notification enqueue failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Notification queue unavailable"
+        )
+    # Without overwriting an outcome the consumer may already have recorded
+    await status_cache.set(request.notification_id, queued_status(request.notification_id), only_if_missing=True)
+    
+    return PushNotificationResponse(
+        success=True,
+        data={"notification_id": request.notification_id, "status": "queued"},
+        message="Notification accepted for delivery"
+    )
+
+
+@router.post("/send-batch", status_code=status.HTTP_202_ACCEPTED)
+async def send_push_notification_batch(batch: PushNotificationBatchRequest):
+    """Accept many notifications in one call and queue them in one publish burst
+    
+    Invalid items are rejected individually; the response has one result
+    per item, in request order, with the notification id of queued items.
+    """
     
+    try:
+        results = await enqueue_batch(queue_producer, batch, status_cache)
+    except Exception as e:
+        logger.error(f"Push notification batch enqueue failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Notification queue unavailable"
+        )
+    
+    queued = sum(result["status"] == "queued" for result in results)
+    return {
+        "success": queued > 0,
+        "data": {
+            "queued": queued,
+            "rejected": sum(result["status"] == "rejected" for result in results),
+            "failed": sum(result["status"] == "failed" for result in results),
+            "results": results
+        },
+        "message": f"{queued} of {len(results)} notifications accepted for delivery"
+    }
+
+
+async def _send_inline(request: PushNotificationRequest) -> PushNotificationResponse:
     async with AsyncSessionLocal() as session:
         try:
             push_service = PushNotificationService(session)
@@ -60,13 +140,15 @@ async def send_push_notification(
 @router.get("/status/{notification_id}")
 async def get_notification_status(
     notification_id: str,
-    db_session: AsyncSession = Depends(get_db)
+    allow_stale: bool = True,
+    db_session: AsyncSession = Depends(get_db),
+    read_session: AsyncSession = Depends(get_read_db)
 ):
-    """Get notification status"""
+    """Get notification status (``allow_stale=false`` reads from the primary)"""
     
     try:
-        push_service = PushNotificationService(db_session)
-        status_info = await push_service.get_notification_status(notification_id)
+        push_service = PushNotificationService(db_session, read_session=read_session)
+        status_info = await push_service.get_notification_status(notification_id, allow_stale)
         
         if not status_info:
             raise HTTPException(
@@ -90,6 +172,78 @@ async def get_notification_status(
         )
 
 
+@router.post("/status/batch")
+async def get_notification_statuses(
+    batch_request: NotificationStatusBatchRequest,
+    allow_stale: bool = True,
+    db_session: AsyncSession = Depends(get_db),
+    read_session: AsyncSession = Depends(get_read_db)
+):
+    """Get the statuses of several notifications in one request"""
+    
+    try:
+        push_service = PushNotificationService(db_session, read_session=read_session)
+        statuses = await push_service.get_notification_statuses(
+            batch_request.notification_ids,
+            allow_stale=allow_stale
+        )
+        
+        notification_ids = list(dict.fromkeys(batch_request.notification_ids))
+        return {
+            "success": True,
+            "data": {
+                "statuses": [statuses[i] for i in notification_ids if i in statuses],
+                "not_found": [i for i in notification_ids if i not in statuses]
+            },
+            "message": "Statuses retrieved successfully"
+        }
+        
+    except Exception as e:
+        logger.error(f"Batch status retrieval failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/status/{notification_id}/timeline")
+async def get_notification_timeline(
+    notification_id: str,
+    allow_stale: bool = True,
+    db_session: AsyncSession = Depends(get_db),
+    read_session: AsyncSession = Depends(get_read_db)
+):
+    """Get the delivery timeline of a notification"""
+    
+    try:
+        push_service = PushNotificationService(db_session, read_session=read_session)
+        timeline = await push_service.get_notification_timeline(notification_id, allow_stale)
+        
+        if not timeline:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Notification not found"
+            )
+        
+        return {
+            "success": True,
+            "data": {
+                "notification_id": notification_id,
+                "timeline": timeline
+            },
+            "message": "Timeline retrieved successfully"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Timeline retrieval failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 @router.post("/status")
 async def update_notification_status(
     status_update: NotificationStatusUpdate,
@@ -100,19 +254,76 @@ async def update_notification_status(
     try:
         push_service = PushNotificationService(db_session)
         
-        await push_service._update_notification_status(
+        updated = await push_service._update_notification_status(
             status_update.notification_id,
             status_update.status,
             status_update.error
         )
         
+        if not updated:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Notification not found"
+            )
+        
         return {
             "success": True,
             "message": "Status updated successfully"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Status update failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/stats")
+async def get_delivery_stats(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: str = "status",
+    interval: Optional[str] = None,
+    read_session: AsyncSession = Depends(get_read_db)
+):
+    """Delivery counts from the per-minute rollups (default: the last hour by status)
+    
+    ``group_by`` is a comma-separated subset of status, template_code and
+    provider; ``interval`` (minute, hour or day) splits the counts over time.
+    """
+    
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=1)
+    
+    try:
+        stats = await query_stats(
+            read_session,
+            start,
+            end,
+            [column.strip() for column in group_by.split(",") if column.strip()],
+            interval
+        )
+        
+        return {
+            "success": True,
+            "data": {
+                "start": start,
+                "end": end,
+                "stats": stats
+            },
+            "message": "Stats retrieved successfully"
+        }
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Stats retrieval failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -1,26 +1,72 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from contextlib import asynccontextmanager
+from typing import Any, Dict
+import uuid
 import structlog
 
 from app.core.config import settings
+from app.utils.db_metrics import DatabaseMetrics, TimedQueuePool
+from app.utils.metrics import metrics
 
 logger = structlog.get_logger()
 
+
+def connect_args() -> Dict[str, Any]:
+    """asyncpg connection arguments for the statement caches"""
+    
+    if settings.db_pgbouncer:
+        # pgbouncer may hand each transaction a different server connection,
+        # so nothing prepared on one can be reused (or collide) on another
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__"
+        }
+    return {
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size
+    }
+
+
+def _create_engine(url: str):
+    return create_async_engine(
+        url,
+        echo=settings.debug,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=True,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args=connect_args()
+    )
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-    pool_recycle=300
-)
+engine = _create_engine(settings.database_url)
+db_metrics = DatabaseMetrics(engine)
+metrics.register("db", db_metrics.stats)
+
+# Reads that tolerate replication lag go to the replica, when one is configured
+if settings.database_read_url:
+    read_engine = _create_engine(settings.database_read_url)
+    read_db_metrics = DatabaseMetrics(read_engine)
+    metrics.register("db_read", read_db_metrics.stats)
+else:
+    read_engine = engine
 
-# Create session factory
+# Create session factories
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False
 )
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
 
 Base = declarative_base()
 
@@ -42,9 +88,11 @@ async def get_db_session():
 async def create_tables():
     """Create database tables"""
     from app.models.notification import Base
+    from app.services.partition_maintenance import ensure_partitions
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_partitions(conn)
     
     logger.info("Database tables created")
 
@@ -52,4 +100,6 @@ async def create_tables():
 async def close_db():
     """Close database connections"""
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     logger.info("Database connections closed")
\ No newline at end of file
@@ -1,32 +1,28 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-import os
 
-app = FastAPI(title="Push Notification Service", version="1.0.0")
+from app.api import health, push_routes
+from app.core.config import settings
+from app.core.database import close_db
+from app.services.push_provider import FCMPushProvider
+from app.services.status_cache import status_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Connections opened lazily by request handlers
+    await push_routes.queue_producer.close()
+    await status_cache.close()
+    await FCMPushProvider.close_shared()
+    await close_db()
 
-@app.get("/health")
-async def health_check():
-    return {
-        "success": True,
-        "message": "Push Service is healthy",
-        "data": {
-            "service": "push-service",
-            "status": "up",
-            "port": 8003
-        }
-    }
 
-@app.post("/api/v1/push/send")
-async def send_push_notification(notification: dict):
-    return {
-        "success": True,
-        "message": "Push notification queued successfully",
-        "data": {
-            "notification_id": "push-123",
-            "status": "queued"
-        }
-    }
+app = FastAPI(title="Push Notification Service", version=settings.version, lifespan=lifespan)
+app.include_router(health.router)
+app.include_router(push_routes.router)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
+    uvicorn.run(app, host=settings.host, port=settings.port)
@@ -1,9 +1,16 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, Text, JSON
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, BigInteger, Text, JSON
+from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, Dict, Any, List
 from enum import Enum
 import uuid
 
+from app.core.config import settings
+from app.utils.ids import uuid7
+
 Base = declarative_base()
 
 class NotificationStatus(str, Enum):
@@ -16,41 +23,130 @@ class NotificationType(str, Enum):
 
 class PushNotification(Base):
     __tablename__ = "push_notifications"
+    # Range partitioned on created_at; see app/services/partition_maintenance.py
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    notification_id = Column(String, unique=True, nullable=False, index=True)
+    # Time-ordered UUIDv7, handled as a string in Python
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid7()))
     user_id = Column(String, nullable=False, index=True)
     template_code = Column(String, nullable=False)
-    variables = Column(JSON, nullable=True)
+    variables = Column(JSONB, nullable=True)
     request_id = Column(String, nullable=False, index=True)
     priority = Column(Integer, default=1)
-    metadata = Column(JSON, nullable=True)
+    metadata_ = Column("metadata", JSONB, nullable=True)
     
     # Push specific fields
     device_token = Column(String, nullable=False)
     title = Column(String, nullable=True)
     body = Column(Text, nullable=True)
-    image_url = Column(String, nullable=True)
-    click_url = Column(String, nullable=True)
     
     # Status tracking
-    status = Column(String, default=NotificationStatus.PENDING)
-    sent_at = Column(DateTime, nullable=True)
+    status = Column(
+        SQLEnum(
+            NotificationStatus,
+            name="notification_status",
+            values_callable=lambda statuses: [status.value for status in statuses]
+        ),
+        nullable=False,
+        default=NotificationStatus.PENDING
+    )
     delivered_at = Column(DateTime, nullable=True)
-    failed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
-    retry_count = Column(Integer, default=0)
     
     # Timestamps
-    created_at = Column(DateTime, server_default=func.now())
+    # Part of the table's primary key because it is the partition key. The
+    # service writes the id's UUIDv7 timestamp here, so the key is unique per
+    # id and lookups by id know which partition to read
+    created_at = Column(DateTime, primary_key=True, nullable=False, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class PushNotificationLog(Base):
     __tablename__ = "push_notification_logs"
+    # Range partitioned on timestamp, with the same partitions and retention as push_notifications
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     notification_id = Column(String, nullable=False, index=True)
     status = Column(String, nullable=False)
-    timestamp = Column(DateTime, server_default=func.now())
+    # Part of the primary key because it is the partition key
+    timestamp = Column(DateTime, primary_key=True, nullable=False, server_default=func.now())
     error_message = Column(Text, nullable=True)
-    metadata = Column(JSON, nullable=True)
\ No newline at end of file
+    metadata_ = Column("metadata", JSON, nullable=True)
+
+class PushDeliveryRollup(Base):
+    __tablename__ = "push_delivery_rollups"
+    # Per-minute delivery counters; see app/services/delivery_rollups.py
+    
+    bucket = Column(DateTime, primary_key=True)
+    status = Column(String, primary_key=True)
+    template_code = Column(String, primary_key=True)
+    # "" when the provider is unknown (e.g. the send failed before routing)
+    provider = Column(String, primary_key=True, default="")
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class PushNotificationRequest(BaseModel):
+    notification_type: NotificationType = NotificationType.PUSH
+    user_id: str
+    template_code: str
+    variables: Dict[str, Any] = Field(default_factory=dict)
+    request_id: str
+    priority: int = 1
+    metadata: Optional[Dict[str, Any]] = None
+    # Assigned by the API when a request is accepted asynchronously, so the
+    # id returned to the client is the one the consumer records
+    notification_id: Optional[str] = None
+
+
+class PushNotificationBatchRequest(BaseModel):
+    """Many notifications in one call: either full ``notifications`` or one
+    template (``template_code``, shared ``variables``) for many ``recipients``
+    
+    Items are kept raw here and validated together by
+    ``app.services.batch_send`` so one bad item doesn't reject the batch.
+    Recipients are ``{"user_id", "variables", "request_id"}``; their
+    variables override the shared ones and ``request_id`` defaults to
+    ``"{request_id}:{index}"``.
+    """
+    notifications: Optional[List[Dict[str, Any]]] = Field(default=None, max_length=settings.push_batch_max_size)
+    template_code: Optional[str] = None
+    variables: Dict[str, Any] = Field(default_factory=dict)
+    recipients: Optional[List[Dict[str, Any]]] = Field(default=None, max_length=settings.push_batch_max_size)
+    request_id: Optional[str] = None
+    priority: int = 1
+    metadata: Optional[Dict[str, Any]] = None
+    
+    @model_validator(mode="after")
+    def check_form(self):
+        if (self.notifications is None) == (self.recipients is None):
+            raise ValueError("Provide either notifications or recipients")
+        if self.recipients is not None and not (self.template_code and self.request_id):
+            raise ValueError("recipients require template_code and request_id")
+        return self
+
+
+class PushNotificationData(BaseModel):
+    title: str
+    body: str
+    data: Optional[Dict[str, Any]] = None
+    image_url: Optional[str] = None
+    click_action: Optional[str] = None
+    # Not sent; scopes the providers' payload template cache
+    template_code: Optional[str] = None
+
+
+class PushNotificationResponse(BaseModel):
+    success: bool
+    data: Optional[Dict[str, Any]] = None
+    message: str
+    error: Optional[str] = None
+
+
+class NotificationStatusUpdate(BaseModel):
+    notification_id: str
+    status: NotificationStatus
+    error: Optional[str] = None
+
+
+class NotificationStatusBatchRequest(BaseModel):
+    notification_ids: List[str] = Field(min_length=1, max_length=settings.status_batch_max_ids)
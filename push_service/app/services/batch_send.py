@@ -0,0 +1,99 @@
+"""
+Validation and enqueueing for ``POST /api/v1/push/send-batch``.
+
+All items of a batch are validated in one ``TypeAdapter`` call. When some
+items are invalid, they are reported by index and the rest are validated
+again in a second call, so a single bad recipient doesn't reject the whole
+batch. Valid items get a notification id and are published to the push
+queue in one burst (``QueueProducer.publish_notifications``); queued ids
+are reported as pending by the status cache until the consumer records
+them.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.notification import PushNotificationBatchRequest, PushNotificationRequest
+from app.services.push_service import queued_status
+from app.services.queue_producer import QueueProducer
+from app.services.status_cache import NotificationStatusCache, status_cache
+from app.utils.ids import uuid7
+
+_requests_adapter = TypeAdapter(List[PushNotificationRequest])
+
+
+def expand_batch(batch: PushNotificationBatchRequest) -> List[Dict[str, Any]]:
+    """Raw notification items of a batch, one per recipient in template form"""
+    
+    if batch.notifications is not None:
+        return batch.notifications
+    
+    items = []
+    for index, recipient in enumerate(batch.recipients):
+        variables = recipient.get("variables") or {}
+        items.append({
+            "template_code": batch.template_code,
+            "priority": batch.priority,
+            "metadata": batch.metadata,
+            **recipient,
+            "request_id": recipient.get("request_id") or f"{batch.request_id}:{index}",
+            "variables": {**batch.variables, **variables} if isinstance(variables, dict) else variables
+        })
+    return items
+
+
+def validate_items(
+    items: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[int, PushNotificationRequest]], Dict[int, List[str]]]:
+    """Validate every item, returning ``(index, request)`` pairs and errors by index"""
+    
+    try:
+        return list(enumerate(_requests_adapter.validate_python(items))), {}
+    except ValidationError as e:
+        errors = e.errors()
+    
+    rejected: Dict[int, List[str]] = {}
+    for error in errors:
+        index, *field = error["loc"]
+        location = ".".join(str(part) for part in field)
+        rejected.setdefault(index, []).append(f"{location}: {error['msg']}" if location else error["msg"])
+    
+    indexes = [index for index in range(len(items)) if index not in rejected]
+    valid = _requests_adapter.validate_python([items[index] for index in indexes])
+    return list(zip(indexes, valid)), rejected
+
+
+async def enqueue_batch(
+    producer: QueueProducer,
+    batch: PushNotificationBatchRequest,
+    cache: NotificationStatusCache = status_cache
+) -> List[Dict[str, Any]]:
+    """Validate and publish a batch; one result per item, in request order"""
+    
+    items = expand_batch(batch)
+    valid, rejected = validate_items(items)
+    
+    for _, request in valid:
+        request.notification_id = str(uuid7())
+    failures = await producer.publish_notifications(
+        [request.model_dump(mode="json") for _, request in valid]
+    )
+    
+    await cache.set_many(
+        {
+            request.notification_id: queued_status(request.notification_id)
+            for (_, request), failure in zip(valid, failures)
+            if failure is None
+        },
+        only_if_missing=True
+    )
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    for index, errors in rejected.items():
+        results[index] = {"index": index, "status": "rejected", "errors": errors}
+    for (index, request), failure in zip(valid, failures):
+        if failure is None:
+            results[index] = {"index": index, "notification_id": request.notification_id, "status": "queued"}
+        else:
+            results[index] = {"index": index, "status": "failed", "error": str(failure)}
+    return results
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from typing import Optional
+
+import structlog
+
+from app.core.config import settings
+from app.services.user_service_client import UserServiceClient
+
+logger = structlog.get_logger()
+
+
+class CacheInvalidationListener:
+    """Subscribes to User Service change events and evicts cached profiles
+    
+    ``auth_service`` publishes ``{"u": user_id, "k": "token"|"prefs", "op": ...}``
+    on ``user_cache_events_channel`` whenever a push token or notification
+    preference changes. Invalidating also bumps the user's version in Redis,
+    so profile fetches already in flight don't cache what they read. Pub/sub
+    is not durable, so the in-process cache is cleared after every
+    (re)subscribe to cover events missed while offline.
+    """
+    
+    def __init__(self, user_client: UserServiceClient):
+        self.user_client = user_client
+        self.channel = settings.user_cache_events_channel
+        self._task: Optional[asyncio.Task] = None
+        self.events_handled = 0
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def handle_event(self, data) -> None:
+        try:
+            event = json.loads(data)
+            user_id = event["u"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring malformed cache event", error=str(e))
+            return
+        
+        await self.user_client.invalidate(str(user_id))
+        self.events_handled += 1
+        logger.info(
+            "Delivery profile invalidated",
+            user_id=user_id,
+            kind=event.get("k"),
+            op=event.get("op")
+        )
+    
+    async def _run(self):
+        backoff = 1
+        while True:
+            pubsub = None
+            try:
+                redis_client = await self.user_client._get_redis_client()
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                self.user_client.l1_cache.clear()
+                logger.info("Listening for delivery profile changes", channel=self.channel)
+                backoff = 1
+                
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self.handle_event(message["data"])
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache event subscription lost", error=str(e), retry_in=backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,60 @@
+"""
+Local stand-in for the FCM HTTP v1 send endpoint.
+
+Used by tests (through ``httpx.ASGITransport``) and for local development:
+
+    python -m app.services.fcm_standin
+
+then point the service at it with ``FCM_BASE_URL=http://localhost:8005`` and
+``FIREBASE_PROJECT_ID=<anything>``. Tokens starting with ``invalid`` are
+rejected with FCM's ``UNREGISTERED`` error.
+"""
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="FCM Stand-in")
+
+sent_messages: List[Dict[str, Any]] = []
+
+
+def _unregistered_error() -> Dict[str, Any]:
+    return {
+        "error": {
+            "code": 404,
+            "message": "Requested entity was not found.",
+            "status": "NOT_FOUND",
+            "details": [
+                {
+                    "@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError",
+                    "errorCode": "UNREGISTERED"
+                }
+            ]
+        }
+    }
+
+
+@app.post("/v1/projects/{project_id}/messages:send")
+async def send_message(project_id: str, request: Request):
+    body = await request.json()
+    message = body.get("message") or {}
+    token = message.get("token")
+
+    if not token:
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": 400, "message": "Missing token", "status": "INVALID_ARGUMENT"}}
+        )
+
+    if token.startswith("invalid"):
+        return JSONResponse(status_code=404, content=_unregistered_error())
+
+    sent_messages.append(message)
+    return {"name": f"projects/{project_id}/messages/{uuid.uuid4()}"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8005)
@@ -0,0 +1,201 @@
+"""
+Partition maintenance for the range-partitioned ``push_notifications`` and
+``push_notification_logs`` tables.
+
+Notifications are partitioned on ``created_at`` and their timeline entries
+on ``timestamp``, into daily or weekly partitions
+(``notification_partition_interval``). Maintenance creates the partitions
+of both tables for the next ``notification_partitions_ahead`` periods and
+retires partitions that ended more than ``notification_retention_days`` ago
+by detaching or dropping them (``notification_retention_mode``), so old
+data never goes through DELETE.
+
+It runs periodically inside the consumer and can be run from cron:
+
+    python -m app.services.partition_maintenance
+"""
+import asyncio
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+PARENT_TABLE = "push_notifications"
+LEGACY_PARTITION = "push_notifications_legacy"
+LOG_TABLE = "push_notification_logs"
+# Maintained with the same interval and retention
+PARTITIONED_TABLES = (PARENT_TABLE, LOG_TABLE)
+
+# Serializes maintenance across consumers (arbitrary, fixed advisory lock key)
+MAINTENANCE_LOCK_KEY = 742001
+
+_INTERVAL_CODES = {"daily": "d", "weekly": "w"}
+_PARTITION_NAME = re.compile(r"^(\w+)_([dw])(\d{8})$")
+
+
+def period_length(interval: str) -> timedelta:
+    return timedelta(days=7 if interval == "weekly" else 1)
+
+
+def period_start(day: date, interval: str) -> date:
+    """First day of the partition period containing ``day`` (weeks start on Monday)"""
+    return day - timedelta(days=day.weekday()) if interval == "weekly" else day
+
+
+def partition_name(start: date, interval: str, table: str = PARENT_TABLE) -> str:
+    return f"{table}_{_INTERVAL_CODES[interval]}{start:%Y%m%d}"
+
+
+def partition_range(name: str, table: str = PARENT_TABLE) -> Optional[tuple]:
+    """``(start, end)`` of a partition of ``table`` created by this module, else None"""
+    
+    match = _PARTITION_NAME.match(name)
+    if not match or match.group(1) != table:
+        return None
+    interval = "weekly" if match.group(2) == "w" else "daily"
+    start = datetime.strptime(match.group(3), "%Y%m%d").date()
+    return start, start + period_length(interval)
+
+
+def create_partition_sql(start: date, interval: str, table: str = PARENT_TABLE) -> str:
+    end = start + period_length(interval)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start, interval, table)} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+def upcoming_periods(first: date, interval: str, count: int) -> List[date]:
+    start = period_start(first, interval)
+    return [start + period_length(interval) * i for i in range(count)]
+
+
+async def list_partitions(conn, table: str = PARENT_TABLE) -> List[str]:
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent ORDER BY c.relname"
+    ), {"parent": table})
+    return [row[0] for row in result]
+
+
+async def ensure_partitions(conn, today: Optional[date] = None) -> List[str]:
+    """Create any missing partitions for the current and upcoming periods
+    
+    Periods already covered by another partition (the legacy partition, or
+    partitions created with a different interval) are skipped.
+    """
+    
+    interval = settings.notification_partition_interval
+    periods = upcoming_periods(today or datetime.utcnow().date(), interval, settings.notification_partitions_ahead + 1)
+    created = []
+    
+    for table in PARTITIONED_TABLES:
+        existing = set(await list_partitions(conn, table))
+        for start in periods:
+            name = partition_name(start, interval, table)
+            if name in existing:
+                continue
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text(create_partition_sql(start, interval, table)))
+                created.append(name)
+            except DBAPIError as e:
+                if "overlap" not in str(e):
+                    raise
+                logger.info("Partition period already covered", partition=name)
+    
+    return created
+
+
+async def apply_retention(conn, today: Optional[date] = None) -> List[str]:
+    """Detach or drop partitions that ended before the retention cutoff"""
+    
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=settings.notification_retention_days)
+    retired = []
+    
+    for table in PARTITIONED_TABLES:
+        for name in await list_partitions(conn, table):
+            bounds = partition_range(name, table)
+            if bounds is None or bounds[1] > cutoff:
+                continue
+            
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if settings.notification_retention_mode == "drop":
+                await conn.execute(text(f"DROP TABLE {name}"))
+            retired.append(name)
+            logger.info(
+                "Partition retired",
+                partition=name,
+                mode=settings.notification_retention_mode
+            )
+    
+    return retired
+
+
+async def run_maintenance(engine=None) -> Dict[str, List[str]]:
+    """Create upcoming partitions and apply retention in one transaction"""
+    
+    if engine is None:
+        from app.core.database import engine
+    
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+        created = await ensure_partitions(conn)
+        retired = await apply_retention(conn)
+    
+    if created or retired:
+        logger.info("Partition maintenance done", created=created, retired=retired)
+    return {"created": created, "retired": retired}
+
+
+class PartitionMaintenanceTask:
+    """Runs ``run_maintenance`` every ``notification_partition_maintenance_interval`` seconds"""
+    
+    def __init__(self, interval: Optional[int] = None):
+        self.interval = settings.notification_partition_maintenance_interval if interval is None else interval
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                await run_maintenance()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Partition maintenance failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+
+async def main():
+    from app.core.database import close_db
+    
+    result = await run_maintenance()
+    print(f"created: {', '.join(result['created']) or '-'}")
+    print(f"retired: {', '.join(result['retired']) or '-'}")
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Compact encoding for delivery profiles cached in Redis.
+
+A packed entry is a single binary string (big-endian)::
+
+    version:u8  fresh_until:u32  flags:u8  (device_type:u8  length:u16  token)*
+
+``flags`` holds ``push_enabled`` and the per-category push preferences as a
+bitmask and device types are stored as one-byte codes, so an entry is little
+more than its tokens. The user id is not stored; it is part of the key.
+
+Profiles that do not fit the packed layout exactly (unexpected keys, device
+types or non-boolean preferences) are stored as compact JSON instead, so
+decoding always returns what was encoded.
+"""
+import json
+import math
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+PACKED_VERSION = 2
+
+# Bit ``i`` of the flags byte is ``PREFERENCE_FLAGS[i]``
+PREFERENCE_FLAGS = ("push_enabled", "push_marketing", "push_transactional", "push_security")
+DEVICE_TYPES = ("android", "ios", "web")
+
+_PROFILE_KEYS = {"user_id", "push_enabled", "preferences", "push_tokens"}
+_TOKEN_KEYS = {"token", "device_type"}
+_HEADER = struct.Struct(">BIB")
+_TOKEN = struct.Struct(">BH")
+
+
+def _is_packable(user_id: str, profile: Dict[str, Any]) -> bool:
+    if set(profile) != _PROFILE_KEYS or profile["user_id"] != user_id:
+        return False
+    
+    preferences = profile["preferences"]
+    if not isinstance(preferences, dict) or set(preferences) != set(PREFERENCE_FLAGS[1:]):
+        return False
+    if not all(isinstance(value, bool) for value in (profile["push_enabled"], *preferences.values())):
+        return False
+    
+    return all(
+        isinstance(token, dict)
+        and set(token) == _TOKEN_KEYS
+        and token["device_type"] in DEVICE_TYPES
+        and isinstance(token["token"], str)
+        and len(token["token"].encode()) <= 0xFFFF
+        for token in profile["push_tokens"]
+    )
+
+
+def encode_profile(user_id: str, profile: Dict[str, Any], fresh_until: float) -> bytes:
+    """Encode a profile together with the time it stops being fresh"""
+    
+    if not _is_packable(user_id, profile):
+        return json.dumps(
+            {"fresh_until": fresh_until, "profile": profile},
+            separators=(",", ":")
+        ).encode()
+    
+    values = {"push_enabled": profile["push_enabled"], **profile["preferences"]}
+    flags = 0
+    for bit, name in enumerate(PREFERENCE_FLAGS):
+        if values[name]:
+            flags |= 1 << bit
+    
+    parts = [_HEADER.pack(PACKED_VERSION, math.ceil(fresh_until), flags)]
+    for token in profile["push_tokens"]:
+        encoded = token["token"].encode()
+        parts.append(_TOKEN.pack(DEVICE_TYPES.index(token["device_type"]), len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def decode_profile(user_id: str, value: bytes) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Return ``(profile, fresh_until)``; ``fresh_until`` is None for legacy entries"""
+    
+    if value[0] != PACKED_VERSION:
+        entry = json.loads(value)
+        if "fresh_until" not in entry:
+            # Written before entries carried their freshness
+            return entry, None
+        return entry["profile"], entry["fresh_until"]
+    
+    _, fresh_until, flags = _HEADER.unpack_from(value)
+    offset = _HEADER.size
+    push_tokens = []
+    while offset < len(value):
+        device_type, length = _TOKEN.unpack_from(value, offset)
+        offset += _TOKEN.size
+        push_tokens.append({
+            "token": value[offset:offset + length].decode(),
+            "device_type": DEVICE_TYPES[device_type]
+        })
+        offset += length
+    
+    return {
+        "user_id": user_id,
+        "push_enabled": bool(flags & 1),
+        "preferences": {
+            name: bool(flags & (1 << bit))
+            for bit, name in enumerate(PREFERENCE_FLAGS)
+            if bit
+        },
+        "push_tokens": push_tokens
+    }, float(fresh_until)
@@ -1,12 +1,28 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import calendar
+import json
+import time
+from json.encoder import encode_basestring_ascii
+from collections import OrderedDict
 import httpx
 import logging
 from app.models.notification import PushNotificationData
 from app.core.config import settings
 
+try:
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import Request as GoogleAuthRequest
+except ImportError:  # google-auth is only needed for the FCM provider
+    service_account = None
+    GoogleAuthRequest = None
+
 logger = logging.getLogger(__name__)
 
+FCM_DEFAULT_BASE_URL = "https://fcm.googleapis.com"
+FCM_SCOPES = ["https://www.googleapis.com/auth/firebase.messaging"]
+
 
 class PushProvider(ABC):
     """Abstract base class for push notification providers"""
@@ -19,6 +35,27 @@ class PushProvider(ABC):
         correlation_id: str = None
     ) -> Dict[str, Any]:
         pass
+    
+    async def send_multicast(
+        self,
+        device_tokens: List[str],
+        notification_data: PushNotificationData,
+        correlation_id: str = None
+    ) -> List[Dict[str, Any]]:
+        """Send the same notification to several devices, one result per token"""
+        
+        return list(await asyncio.gather(*(
+            self.send_notification(device_token, notification_data, correlation_id)
+            for device_token in device_tokens
+        )))
+    
+    def for_device(self, device_type: Optional[str]) -> "PushProvider":
+        """Return the provider that should deliver to the given device type"""
+        return self
+    
+    async def close(self):
+        """Release any pooled connections held by the provider"""
+        pass
 
 
 class MockPushProvider(PushProvider):
@@ -40,78 +77,477 @@ class MockPushProvider(PushProvider):
         }
 
 
+class PayloadTemplateCache:
+    """LRU cache of pre-serialized payloads, keyed by notification content
+    
+    Each entry holds the JSON bytes surrounding the recipient, so a send only
+    serializes the recipient and concatenates.
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, Tuple], Tuple[bytes, bytes]]" = OrderedDict()
+    
+    @staticmethod
+    def content_key(notification_data: PushNotificationData) -> Tuple:
+        """Template code plus the rendered fields, without dumping the whole model"""
+        
+        data = notification_data.data
+        return (
+            notification_data.template_code,
+            notification_data.title,
+            notification_data.body,
+            notification_data.image_url,
+            notification_data.click_action,
+            json.dumps(data) if data else None
+        )
+    
+    def get(self, key: Tuple[str, Tuple], build) -> Tuple[bytes, bytes]:
+        template = self._entries.get(key)
+        if template is not None:
+            self._entries.move_to_end(key)
+            return template
+        
+        template = build()
+        self._entries[key] = template
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return template
+
+
 class OneSignalPushProvider(PushProvider):
     """OneSignal push notification provider"""
     
+    # Shared by every instance so repeated content skips serialization
+    _templates = PayloadTemplateCache(settings.payload_template_cache_size)
+    
     def __init__(self):
         self.app_id = settings.onesignal_app_id
         self.api_key = settings.onesignal_api_key
         self.base_url = "https://onesignal.com/api/v1"
+        self.max_recipients = settings.onesignal_max_recipients
+        self._url = f"{self.base_url}/notifications"
+        self._headers = {
+            "Authorization": f"Basic {self.api_key}",
+            "Content-Type": "application/json"
+        }
     
-    async def send_notification(
-        self,
-        device_token: str,
-        notification_data: PushNotificationData,
-        correlation_id: str = None
-    ) -> Dict[str, Any]:
-        if not self.app_id or not self.api_key:
-            return {
-                "success": False,
-                "provider": "onesignal",
-                "error": "OneSignal credentials not configured"
-            }
+    def _build_template(self, notification_data: PushNotificationData) -> Tuple[bytes, bytes]:
+        """Serialize everything except ``include_player_ids``"""
+        
+        payload = {
+            "app_id": self.app_id,
+            "headings": {"en": notification_data.title},
+            "contents": {"en": notification_data.body},
+            "data": notification_data.data or {},
+        }
         
+        if notification_data.image_url:
+            payload["big_picture"] = notification_data.image_url
+        
+        if notification_data.click_action:
+            payload["url"] = notification_data.click_action
+        
+        serialized = json.dumps(payload).encode()
+        return serialized[:-1] + b', "include_player_ids": ', b"}"
+    
+    def _build_payload(
+        self,
+        device_tokens: List[str],
+        notification_data: PushNotificationData
+    ) -> bytes:
+        key = (self.app_id, PayloadTemplateCache.content_key(notification_data))
+        prefix, suffix = self._templates.get(
+            key,
+            lambda: self._build_template(notification_data)
+        )
+        recipients = ",".join(map(encode_basestring_ascii, device_tokens))
+        return prefix + b"[" + recipients.encode() + b"]" + suffix
+    
+    async def _post(
+        self,
+        device_tokens: List[str],
+        notification_data: PushNotificationData
+    ) -> List[Dict[str, Any]]:
         try:
-            headers = {
-                "Authorization": f"Basic {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "app_id": self.app_id,
-                "include_player_ids": [device_token],
-                "headings": {"en": notification_data.title},
-                "contents": {"en": notification_data.body},
-                "data": notification_data.data or {},
-            }
-            
-            if notification_data.image_url:
-                payload["big_picture"] = notification_data.image_url
-            
-            if notification_data.click_action:
-                payload["url"] = notification_data.click_action
-            
             async with httpx.AsyncClient() as client:
                 response = await client.post(
-                    f"{self.base_url}/notifications",
-                    json=payload,
-                    headers=headers
+                    self._url,
+                    content=self._build_payload(device_tokens, notification_data),
+                    headers=self._headers
                 )
                 
                 result = response.json()
                 
                 if response.status_code == 200 and result.get("id"):
                     logger.info(f"OneSignal notification sent: {result['id']}")
-                    return {
-                        "success": True,
-                        "provider": "onesignal",
-                        "message_id": result["id"]
-                    }
+                    errors = result.get("errors")
+                    invalid_ids = set(errors.get("invalid_player_ids", [])) if isinstance(errors, dict) else set()
+                    return [
+                        {
+                            "success": False,
+                            "provider": "onesignal",
+                            "error": "Invalid player id",
+                            "invalid_token": True
+                        }
+                        if device_token in invalid_ids else
+                        {
+                            "success": True,
+                            "provider": "onesignal",
+                            "message_id": result["id"]
+                        }
+                        for device_token in device_tokens
+                    ]
                 else:
                     logger.error(f"OneSignal notification failed: {result}")
-                    return {
-                        "success": False,
-                        "provider": "onesignal",
-                        "error": result.get("errors", "Unknown error")
-                    }
+                    return [
+                        {
+                            "success": False,
+                            "provider": "onesignal",
+                            "error": result.get("errors", "Unknown error")
+                        }
+                        for _ in device_tokens
+                    ]
                     
         except Exception as e:
             logger.error(f"OneSignal notification failed: {str(e)}")
+            return [
+                {
+                    "success": False,
+                    "provider": "onesignal",
+                    "error": str(e)
+                }
+                for _ in device_tokens
+            ]
+    
+    async def send_notification(
+        self,
+        device_token: str,
+        notification_data: PushNotificationData,
+        correlation_id: str = None
+    ) -> Dict[str, Any]:
+        results = await self.send_multicast([device_token], notification_data, correlation_id)
+        return results[0]
+    
+    async def send_multicast(
+        self,
+        device_tokens: List[str],
+        notification_data: PushNotificationData,
+        correlation_id: str = None
+    ) -> List[Dict[str, Any]]:
+        if not self.app_id or not self.api_key:
+            return [
+                {
+                    "success": False,
+                    "provider": "onesignal",
+                    "error": "OneSignal credentials not configured"
+                }
+                for _ in device_tokens
+            ]
+        
+        # OneSignal accepts up to max_recipients player ids per request
+        chunks = [
+            device_tokens[i:i + self.max_recipients]
+            for i in range(0, len(device_tokens), self.max_recipients)
+        ]
+        results = await asyncio.gather(*(
+            self._post(chunk, notification_data) for chunk in chunks
+        ))
+        return [result for chunk_results in results for result in chunk_results]
+
+
+class _AccessTokenCache:
+    """Caches an OAuth access token until shortly before it expires"""
+    
+    def __init__(self, refresh_margin: int):
+        self.refresh_margin = refresh_margin
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    def _is_fresh(self) -> bool:
+        return bool(self._token) and time.time() < self._expires_at - self.refresh_margin
+    
+    async def get(self, fetch) -> str:
+        if self._is_fresh():
+            return self._token
+        
+        async with self._lock:
+            # Another sender may have refreshed the token while we waited
+            if not self._is_fresh():
+                self._token, self._expires_at = await fetch()
+                logger.info("FCM access token refreshed")
+        
+        return self._token
+
+
+class FCMPushProvider(PushProvider):
+    """Firebase Cloud Messaging HTTP v1 provider
+    
+    All sends share one pooled HTTP/2 client, so a multicast is multiplexed
+    over a handful of connections instead of opening one per device, and
+    ``fcm_max_concurrency`` bounds the in-flight sends across all instances.
+    The shared client lives for the whole process: ``close`` only releases an
+    instance's private client and ``close_shared`` is called at shutdown.
+    When ``fcm_base_url`` points at the local stand-in (see ``fcm_standin``)
+    and no credentials are configured, requests are sent without an access
+    token.
+    """
+    
+    _shared_client: Optional[httpx.AsyncClient] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _token_cache: Optional[_AccessTokenCache] = None
+    _templates = PayloadTemplateCache(settings.payload_template_cache_size)
+    
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.project_id = settings.firebase_project_id
+        self.credentials_path = settings.firebase_credentials_path
+        self.base_url = settings.fcm_base_url.rstrip("/")
+        self._send_path = f"/v1/projects/{self.project_id}/messages:send"
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._credentials = None
+        
+        if FCMPushProvider._semaphore is None:
+            FCMPushProvider._semaphore = asyncio.Semaphore(settings.fcm_max_concurrency)
+        if FCMPushProvider._token_cache is None:
+            FCMPushProvider._token_cache = _AccessTokenCache(settings.fcm_token_refresh_margin)
+    
+    @property
+    def uses_standin(self) -> bool:
+        return not self.credentials_path and self.base_url != FCM_DEFAULT_BASE_URL
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP/2 client, creating it on first use"""
+        
+        if self._transport is not None:
+            # Injected transports (tests, stand-in) get a private client
+            if self._client is None:
+                self._client = httpx.AsyncClient(
+                    transport=self._transport,
+                    base_url=self.base_url,
+                    timeout=settings.fcm_timeout
+                )
+            return self._client
+        
+        if FCMPushProvider._shared_client is None:
+            FCMPushProvider._shared_client = httpx.AsyncClient(
+                http2=True,
+                base_url=self.base_url,
+                timeout=settings.fcm_timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.fcm_max_connections,
+                    max_keepalive_connections=settings.fcm_max_connections
+                )
+            )
+        return FCMPushProvider._shared_client
+    
+    def _refresh_service_account_token(self) -> Tuple[str, float]:
+        """Blocking token refresh, run in a worker thread"""
+        
+        if self._credentials is None:
+            self._credentials = service_account.Credentials.from_service_account_file(
+                self.credentials_path,
+                scopes=FCM_SCOPES
+            )
+        self._credentials.refresh(GoogleAuthRequest())
+        expires_at = calendar.timegm(self._credentials.expiry.utctimetuple())
+        return self._credentials.token, float(expires_at)
+    
+    async def _fetch_access_token(self) -> Tuple[str, float]:
+        return await asyncio.to_thread(self._refresh_service_account_token)
+    
+    async def _get_headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if not self.uses_standin:
+            token = await FCMPushProvider._token_cache.get(self._fetch_access_token)
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+    
+    def _configuration_error(self) -> Optional[str]:
+        if not self.project_id:
+            return "FCM project id not configured"
+        if self.uses_standin:
+            return None
+        if not self.credentials_path:
+            return "FCM credentials not configured"
+        if service_account is None:
+            return "google-auth is required for the FCM provider"
+        return None
+    
+    @staticmethod
+    def _build_template(notification_data: PushNotificationData) -> Tuple[bytes, bytes]:
+        """Serialize an FCM v1 message body around its ``token`` field"""
+        
+        notification = {
+            "title": notification_data.title,
+            "body": notification_data.body,
+        }
+        if notification_data.image_url:
+            notification["image"] = notification_data.image_url
+        
+        message: Dict[str, Any] = {"notification": notification}
+        
+        if notification_data.data:
+            # FCM data payloads only accept string values
+            message["data"] = {
+                key: value if isinstance(value, str) else json.dumps(value)
+                for key, value in notification_data.data.items()
+            }
+        
+        if notification_data.click_action:
+            message["android"] = {
+                "notification": {"click_action": notification_data.click_action}
+            }
+            message["webpush"] = {
+                "fcm_options": {"link": notification_data.click_action}
+            }
+        
+        serialized = json.dumps({"message": message}).encode()
+        opening = b'{"message": {'
+        return opening + b'"token": ', b", " + serialized[len(opening):]
+    
+    @staticmethod
+    def _parse_error(response: httpx.Response) -> Tuple[str, Optional[str]]:
+        """Return the error message and FCM error code of a failed send"""
+        
+        try:
+            error = response.json().get("error", {})
+        except ValueError:
+            return f"HTTP {response.status_code}", None
+        
+        error_code = None
+        for detail in error.get("details", []):
+            if "errorCode" in detail:
+                error_code = detail["errorCode"]
+                break
+        
+        return error.get("message") or error.get("status") or f"HTTP {response.status_code}", error_code
+    
+    async def _send(
+        self,
+        device_token: str,
+        template: Tuple[bytes, bytes],
+        headers: Dict[str, str]
+    ) -> Dict[str, Any]:
+        prefix, suffix = template
+        try:
+            async with FCMPushProvider._semaphore:
+                response = await self._get_client().post(
+                    self._send_path,
+                    content=prefix + encode_basestring_ascii(device_token).encode() + suffix,
+                    headers=headers
+                )
+            
+            if response.status_code == 200:
+                message_id = response.json().get("name")
+                logger.info(f"FCM notification sent: {message_id}")
+                return {
+                    "success": True,
+                    "provider": "fcm",
+                    "message_id": message_id
+                }
+            
+            error, error_code = self._parse_error(response)
+            logger.error(f"FCM notification failed: {error_code or error}")
             return {
                 "success": False,
-                "provider": "onesignal",
+                "provider": "fcm",
+                "error": error,
+                "error_code": error_code,
+                "invalid_token": error_code == "UNREGISTERED"
+            }
+        
+        except Exception as e:
+            logger.error(f"FCM notification failed: {str(e)}")
+            return {
+                "success": False,
+                "provider": "fcm",
                 "error": str(e)
             }
+    
+    async def send_notification(
+        self,
+        device_token: str,
+        notification_data: PushNotificationData,
+        correlation_id: str = None
+    ) -> Dict[str, Any]:
+        results = await self.send_multicast([device_token], notification_data, correlation_id)
+        return results[0]
+    
+    async def send_multicast(
+        self,
+        device_tokens: List[str],
+        notification_data: PushNotificationData,
+        correlation_id: str = None
+    ) -> List[Dict[str, Any]]:
+        configuration_error = self._configuration_error()
+        if configuration_error:
+            return [
+                {"success": False, "provider": "fcm", "error": configuration_error}
+                for _ in device_tokens
+            ]
+        
+        try:
+            headers = await self._get_headers()
+        except Exception as e:
+            logger.error(f"FCM access token refresh failed: {str(e)}")
+            return [
+                {"success": False, "provider": "fcm", "error": str(e)}
+                for _ in device_tokens
+            ]
+        
+        template = self._templates.get(
+            (self.project_id, PayloadTemplateCache.content_key(notification_data)),
+            lambda: self._build_template(notification_data)
+        )
+        
+        # One request per device, multiplexed over the shared HTTP/2 connections
+        return list(await asyncio.gather(*(
+            self._send(device_token, template, headers)
+            for device_token in device_tokens
+        )))
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @classmethod
+    async def close_shared(cls):
+        """Close the process-wide HTTP/2 client; only call this at shutdown"""
+        
+        if cls._shared_client is not None:
+            await cls._shared_client.aclose()
+            cls._shared_client = None
+
+
+class DeviceRoutingPushProvider(PushProvider):
+    """Routes each device to a provider based on its ``PushToken.device_type``"""
+    
+    def __init__(self, routes: Dict[str, PushProvider], default: PushProvider):
+        self.routes = routes
+        self.default = default
+    
+    def for_device(self, device_type: Optional[str]) -> PushProvider:
+        return self.routes.get(device_type, self.default)
+    
+    async def send_notification(
+        self,
+        device_token: str,
+        notification_data: PushNotificationData,
+        correlation_id: str = None
+    ) -> Dict[str, Any]:
+        return await self.default.send_notification(
+            device_token,
+            notification_data,
+            correlation_id
+        )
+    
+    async def close(self):
+        providers = {id(provider): provider for provider in [self.default, *self.routes.values()]}
+        for provider in providers.values():
+            await provider.close()
 
 
 class PushProviderFactory:
@@ -121,5 +557,19 @@ class PushProviderFactory:
     def create_provider(provider_type: str = "onesignal") -> PushProvider:
         if provider_type == "onesignal":
             return OneSignalPushProvider()
+        elif provider_type == "fcm":
+            return FCMPushProvider()
+        elif provider_type == "routed":
+            # FCM for the device types it serves directly, OneSignal for the rest
+            fcm_provider = FCMPushProvider()
+            device_types = [
+                device_type.strip()
+                for device_type in settings.fcm_device_types.split(",")
+                if device_type.strip()
+            ]
+            return DeviceRoutingPushProvider(
+                routes={device_type: fcm_provider for device_type in device_types},
+                default=OneSignalPushProvider()
+            )
         else:
             return MockPushProvider()
\ No newline at end of file
@@ -1,32 +1,182 @@
+import asyncio
 import json
-import uuid
-from typing import Dict, Any, Optional
-from datetime import datetime
+from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import JSON, DateTime, and_, any_, bindparam, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
 from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
 
 from app.models.notification import (
     PushNotification, 
+    PushNotificationLog,
     NotificationStatus, 
     PushNotificationData,
     PushNotificationRequest
 )
+from app.services.delivery_rollups import minute_bucket, upsert_rollups
 from app.services.push_provider import PushProviderFactory, PushProvider
 from app.services.queue_producer import QueueProducer
+from app.services.status_cache import NotificationStatusCache, status_cache
+from app.services.status_writer import StatusWriteBuffer
 from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.ids import derived_uuid7, is_uuid, uuid7, uuid7_time
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def build_notification_row(
+    notification_id: str,
+    request: PushNotificationRequest,
+    device_token: str,
+    status: NotificationStatus = NotificationStatus.PENDING,
+    error_message: Optional[str] = None,
+    now: Optional[datetime] = None,
+    created_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Column values for one push_notifications row, keyed by attribute name"""
+    
+    now = now or datetime.utcnow()
+    return {
+        "id": notification_id,
+        "user_id": request.user_id,
+        "template_code": request.template_code,
+        "variables": request.variables,
+        "request_id": request.request_id,
+        "priority": request.priority,
+        "metadata_": request.metadata,
+        "device_token": device_token,
+        "title": request.variables.get("title", "Notification"),
+        "body": request.variables.get("body", "You have a new notification"),
+        "status": status,
+        "delivered_at": now if status == NotificationStatus.DELIVERED else None,
+        "error_message": error_message,
+        # Set here rather than by the server so callers know the partition key
+        "created_at": created_at or now
+    }
+
+
+# Timeline entries are written after their notification's id is assigned,
+# possibly on another host; this much clock skew is tolerated
+TIMELINE_CLOCK_SKEW = timedelta(minutes=5)
+
+STATUS_COLUMNS = (
+    PushNotification.id,
+    PushNotification.status,
+    PushNotification.created_at,
+    PushNotification.delivered_at,
+    PushNotification.error_message
+)
+
+
+def _ids_clause(notification_ids: List[str]):
+    """WHERE clause matching notifications by id, limited to their partitions
+    
+    UUIDv7 rows are created at their id's timestamp, so ``created_at`` is
+    known and only those partitions are read. Older ids are matched by id
+    alone.
+    """
+    
+    created = {notification_id: uuid7_time(notification_id) for notification_id in notification_ids}
+    keyed = [notification_id for notification_id, created_at in created.items() if created_at is not None]
+    legacy = [notification_id for notification_id, created_at in created.items() if created_at is None]
+    
+    clauses = []
+    if keyed:
+        clauses.append(and_(
+            PushNotification.id == any_(bindparam("ids", keyed, type_=ARRAY(UUID(as_uuid=False)))),
+            PushNotification.created_at == any_(
+                bindparam("created", sorted({created[notification_id] for notification_id in keyed}), type_=ARRAY(DateTime))
+            )
+        ))
+    if legacy:
+        clauses.append(PushNotification.id == any_(bindparam("legacy_ids", legacy, type_=ARRAY(UUID(as_uuid=False)))))
+    return or_(*clauses)
+
+
+def queued_status(notification_id: str) -> Dict[str, Any]:
+    """Status entry for a notification that is accepted but not processed yet"""
+    
+    return {
+        "notification_id": notification_id,
+        "status": NotificationStatus.PENDING.value,
+        "created_at": uuid7_time(notification_id),
+        "delivered_at": None,
+        "error_message": None
+    }
+
+
+def _status_info(row) -> Dict[str, Any]:
+    return {
+        "notification_id": row.id,
+        "status": row.status,
+        "created_at": row.created_at,
+        "delivered_at": row.delivered_at,
+        "error_message": row.error_message
+    }
+
+
+def device_notification_ids(notification_id: str, devices: List[Dict[str, Any]]) -> List[str]:
+    """Row ids for a multicast: ``notification_id`` for the first device, and
+    ids derived from it and the device token for the others
+    
+    Every id carries ``notification_id``'s timestamp, so all rows share its
+    ``created_at``, and a redelivered message maps to the same rows.
+    """
+    
+    created_at = uuid7_time(notification_id)
+    ids = [notification_id]
+    seen: Dict[str, int] = {}
+    for device in devices[1:]:
+        key = f"{notification_id}:{device['token']}"
+        # A token listed twice still gets two rows
+        seen[key] = seen.get(key, 0) + 1
+        ids.append(str(derived_uuid7(created_at, key if seen[key] == 1 else f"{key}:{seen[key]}")))
+    return ids
+
+
+def build_log_row(
+    notification_id: str,
+    status: NotificationStatus,
+    error_message: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    timestamp: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """One push_notification_logs timeline entry, keyed by attribute name"""
+    
+    return {
+        "id": str(uuid7()),
+        "notification_id": notification_id,
+        "status": NotificationStatus(status).value,
+        "timestamp": timestamp or datetime.utcnow(),
+        "error_message": error_message,
+        "metadata_": {key: value for key, value in (metadata or {}).items() if value is not None} or None
+    }
+
+
 class PushNotificationService:
     """Service for handling push notifications"""
     
-    def __init__(self, db_session: AsyncSession):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        status_writer: Optional[StatusWriteBuffer] = None,
+        status_cache: NotificationStatusCache = status_cache,
+        read_session: Optional[AsyncSession] = None
+    ):
         self.db_session = db_session
-        self.push_provider: PushProvider = PushProviderFactory.create_provider()
+        # Reads that tolerate replication lag (allow_stale) use this session
+        self.read_session = read_session or db_session
+        # When set, timeline rows (and, with status_write_behind, two-phase
+        # status updates) are written behind instead of inline
+        self.status_writer = status_writer
+        self.status_cache = status_cache
+        self.push_provider: PushProvider = PushProviderFactory.create_provider(
+            settings.push_provider
+        )
         self.queue_producer = QueueProducer()
         self.circuit_breaker = CircuitBreaker(
             failure_threshold=settings.circuit_breaker_threshold
@@ -36,68 +186,165 @@ class PushNotificationService:
         self,
         notification_request: PushNotificationRequest,
         device_token: str,
+        correlation_id: str = None,
+        device_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Process a push notification request for a single device"""
+        
+        return await self.process_multicast(
+            notification_request,
+            [{"token": device_token, "device_type": device_type}],
+            correlation_id
+        )
+    
+    async def process_multicast(
+        self,
+        notification_request: PushNotificationRequest,
+        devices: List[Dict[str, Any]],
         correlation_id: str = None
     ) -> Dict[str, Any]:
-        """Process a push notification request"""
+        """Process a push notification request for all of a user's devices
         
-        notification_id = str(uuid.uuid4())
+        ``devices`` are ``{"token", "device_type"}`` entries as returned in a
+        delivery profile. Every device gets its own notification row, all rows
+        are written with one bulk insert and devices served by the same
+        provider are sent in one multicast call. The first device's row id is
+        returned as the ``notification_id``; it is the request's
+        ``notification_id`` when that is a UUIDv7 (the API and the consumer
+        assign one), otherwise a new one.
         
-        try:
-            # Create notification record
-            notification = await self._create_notification_record(
-                notification_id,
-                notification_request,
-                device_token
+        Row ids are derived from that id (see ``device_notification_ids``) and
+        ``created_at`` is the id's timestamp, so a redelivered message writes
+        the same rows: the inserts use ``ON CONFLICT`` and update them instead
+        of adding duplicates. The push itself is sent again.
+        
+        With ``notification_write_mode="single"`` the rows are only inserted
+        once the outcome is known, in one transaction. ``"two_phase"`` inserts
+        pending rows first and updates them afterwards.
+        """
+        
+        notification_id = notification_request.notification_id
+        if uuid7_time(notification_id) is None:
+            notification_id = str(uuid7())
+        notification_ids = device_notification_ids(notification_id, devices)
+        two_phase = settings.notification_write_mode == "two_phase"
+        # The partition key follows from the id, so retries hit the same row
+        created_at = uuid7_time(notification_id)
+        timeline = [
+            build_log_row(
+                device_notification_id,
+                NotificationStatus.PENDING,
+                metadata={"device_type": device.get("device_type"), "correlation_id": correlation_id}
             )
-            
-            logger.info(f"Notification created: {notification_id} for user {notification_request.user_id}")
+            for device_notification_id, device in zip(notification_ids, devices)
+        ]
+        # Buffered timeline rows can't be taken back once handed over
+        timeline_appended = False
+        outcomes_recorded = False
+        results = None
+        
+        try:
+            if two_phase:
+                # Create notification records
+                await self._create_notification_records(
+                    notification_ids,
+                    notification_request,
+                    devices,
+                    created_at=created_at
+                )
+                
+                logger.info(
+                    f"Notification created: {notification_id} for user {notification_request.user_id} "
+                    f"({len(devices)} devices)"
+                )
             
             # Process notification data
             notification_data = await self._prepare_notification_data(
                 notification_request
             )
             
-            # Send notification with circuit breaker
-            result = await self.circuit_breaker.call(
-                self._send_with_retry,
-                device_token,
-                notification_data,
-                correlation_id
-            )
+            results = await self._send_to_devices(devices, notification_data, correlation_id)
             
-            # Update notification status
-            status = NotificationStatus.DELIVERED if result["success"] else NotificationStatus.FAILED
-            await self._update_notification_status(
-                notification_id,
-                status,
-                result.get("error")
+            # Record the outcome
+            statuses = [
+                NotificationStatus.DELIVERED if result["success"] else NotificationStatus.FAILED
+                for result in results
+            ]
+            timeline.extend(
+                build_log_row(
+                    device_notification_id,
+                    status,
+                    result.get("error"),
+                    {"provider": result.get("provider"), "message_id": result.get("message_id")}
+                )
+                for device_notification_id, status, result in zip(notification_ids, statuses, results)
             )
-            
-            # Send status update to other services
-            await self.queue_producer.send_status_update(
-                notification_id,
-                status.value,
-                result.get("error"),
-                correlation_id
+            await self._append_timeline(timeline)
+            timeline_appended = self.status_writer is not None
+            await self._record_outcomes(
+                two_phase,
+                notification_ids,
+                notification_request,
+                devices,
+                [(status, result.get("error")) for status, result in zip(statuses, results)],
+                created_at
+            )
+            outcomes_recorded = True
+            # Best-effort from here on: the outcome is committed and must be reported as it is
+            await self._record_rollups(
+                notification_request.template_code,
+                [(status, result.get("provider")) for status, result in zip(statuses, results)]
             )
+            await self._send_status_updates(notification_ids, statuses, results, correlation_id)
             
-            logger.info(f"Notification processed: {notification_id}, success: {result['success']}")
+            success = any(result["success"] for result in results)
+            errors = [result.get("error") for result in results if not result["success"]]
+            
+            logger.info(
+                f"Notification processed: {notification_id}, "
+                f"delivered: {statuses.count(NotificationStatus.DELIVERED)}/{len(devices)}"
+            )
             
             return {
                 "notification_id": notification_id,
-                "success": result["success"],
-                "message": "Notification processed successfully" if result["success"] else "Notification failed",
-                "error": result.get("error")
+                "success": success,
+                "message": "Notification processed successfully" if success else "Notification failed",
+                "error": None if success else errors[0],
+                "deliveries": [
+                    {
+                        "notification_id": device_notification_id,
+                        "device_type": device.get("device_type"),
+                        "success": result["success"],
+                        "error": result.get("error")
+                    }
+                    for device_notification_id, device, result in zip(notification_ids, devices, results)
+                ]
             }
             
         except Exception as e:
             logger.error(f"Notification processing failed: {notification_id}, error: {str(e)}")
+            # Whatever failed may have left the session in a failed transaction
+            await self.db_session.rollback()
             
-            await self._update_notification_status(
-                notification_id,
-                NotificationStatus.FAILED,
-                str(e)
-            )
+            if not outcomes_recorded:
+                failed_rows = [
+                    build_log_row(device_notification_id, NotificationStatus.FAILED, str(e))
+                    for device_notification_id in notification_ids
+                ]
+                await self._append_timeline(failed_rows if timeline_appended else timeline + failed_rows)
+                await self._record_outcomes(
+                    two_phase,
+                    notification_ids,
+                    notification_request,
+                    devices,
+                    [(NotificationStatus.FAILED, str(e))] * len(devices),
+                    created_at
+                )
+                providers = [result.get("provider") for result in results] if results else [None] * len(devices)
+                await self._record_rollups(
+                    notification_request.template_code,
+                    [(NotificationStatus.FAILED, provider) for provider in providers]
+                )
             
             return {
                 "notification_id": notification_id,
@@ -106,28 +353,201 @@ class PushNotificationService:
                 "error": str(e)
             }
     
-    async def _create_notification_record(
+    async def _record_outcomes(
         self,
-        notification_id: str,
+        two_phase: bool,
+        notification_ids: List[str],
         request: PushNotificationRequest,
-        device_token: str
-    ) -> PushNotification:
-        """Create notification record in database"""
-        
-        notification = PushNotification(
-            id=notification_id,
-            user_id=request.user_id,
-            device_token=device_token,
-            title=request.variables.get("title", "Notification"),
-            body=request.variables.get("body", "You have a new notification"),
-            data=json.dumps(request.variables.get("data", {})),
-            status=NotificationStatus.PENDING
-        )
+        devices: List[Dict[str, Any]],
+        outcomes: List[Tuple[NotificationStatus, Optional[str]]],
+        created_at: datetime
+    ):
+        """Update the pending rows, or insert the final rows in single-write mode
+        
+        The final statuses are written through to the status cache as well.
+        """
+        
+        if two_phase and self.status_writer is not None and settings.status_write_behind:
+            for notification_id, (status, error) in zip(notification_ids, outcomes):
+                await self.status_writer.add(notification_id, status, error)
+        elif two_phase:
+            await self._update_notification_statuses([
+                (notification_id, status, error)
+                for notification_id, (status, error) in zip(notification_ids, outcomes)
+            ])
+        else:
+            await self._create_notification_records(
+                notification_ids, request, devices, outcomes, created_at=created_at
+            )
+        
+        now = datetime.utcnow()
+        await self.status_cache.set_many({
+            notification_id: {
+                "notification_id": notification_id,
+                "status": NotificationStatus(status).value,
+                "created_at": created_at,
+                "delivered_at": now if status == NotificationStatus.DELIVERED else None,
+                "error_message": error
+            }
+            for notification_id, (status, error) in zip(notification_ids, outcomes)
+        })
+    
+    async def _record_rollups(
+        self,
+        template_code: str,
+        outcomes: List[Tuple[NotificationStatus, Optional[str]]]
+    ):
+        """Count ``(status, provider)`` outcomes in the per-minute delivery rollups
+        
+        Called once the outcomes are recorded, so a failed write is never
+        counted twice. Without a status writer the increments are committed
+        inline. The counters are best-effort: failures are logged and never
+        fail the notification.
+        """
+        
+        counts: Dict[Tuple[str, str], int] = {}
+        for status, provider in outcomes:
+            key = (NotificationStatus(status).value, provider or "")
+            counts[key] = counts.get(key, 0) + 1
+        
+        try:
+            if self.status_writer is not None:
+                await self.status_writer.add_rollups(template_code, counts)
+            else:
+                bucket = minute_bucket(datetime.utcnow())
+                await upsert_rollups(self.db_session, {
+                    (bucket, status, template_code, provider): count
+                    for (status, provider), count in counts.items()
+                })
+                await self.db_session.commit()
+        except Exception as e:
+            logger.warning(f"Delivery rollups not recorded: {str(e)}")
+            if self.status_writer is None:
+                await self.db_session.rollback()
+    
+    async def _send_status_updates(
+        self,
+        notification_ids: List[str],
+        statuses: List[NotificationStatus],
+        results: List[Dict[str, Any]],
+        correlation_id: Optional[str]
+    ):
+        """Publish each device's final status to other services; failures are logged only"""
         
-        self.db_session.add(notification)
+        try:
+            for device_notification_id, status, result in zip(notification_ids, statuses, results):
+                await self.queue_producer.send_status_update(
+                    device_notification_id,
+                    status.value,
+                    result.get("error"),
+                    correlation_id
+                )
+        except Exception as e:
+            logger.warning(f"Status updates not published: {str(e)}")
+    
+    async def _append_timeline(self, rows: List[Dict[str, Any]]):
+        """Append delivery timeline entries to push_notification_logs
+        
+        Buffered through the status writer when there is one; otherwise the
+        rows join the session and are committed with the next status write.
+        """
+        
+        if self.status_writer is not None:
+            await self.status_writer.add_log(rows)
+        else:
+            self.db_session.add_all([PushNotificationLog(**row) for row in rows])
+    
+    async def _create_notification_records(
+        self,
+        notification_ids: List[str],
+        request: PushNotificationRequest,
+        devices: List[Dict[str, Any]],
+        outcomes: Optional[List[Tuple[NotificationStatus, Optional[str]]]] = None,
+        created_at: Optional[datetime] = None
+    ):
+        """Create one notification record per device in a single insert
+        
+        Rows are pending unless ``outcomes`` gives each device's final status
+        and error. Rows that already exist (a redelivered message) keep their
+        status when pending and take the new outcome otherwise.
+        """
+        
+        now = datetime.utcnow()
+        statement = pg_insert(PushNotification).values([
+            build_notification_row(notification_id, request, device["token"], status, error, now, created_at)
+            for notification_id, device, (status, error) in zip(
+                notification_ids,
+                devices,
+                outcomes or [(NotificationStatus.PENDING, None)] * len(devices)
+            )
+        ])
+        if outcomes is None:
+            statement = statement.on_conflict_do_nothing(index_elements=["id", "created_at"])
+        else:
+            statement = statement.on_conflict_do_update(
+                index_elements=["id", "created_at"],
+                set_={
+                    "status": statement.excluded.status,
+                    "delivered_at": statement.excluded.delivered_at,
+                    "error_message": statement.excluded.error_message,
+                    "updated_at": func.now()
+                }
+            )
+        
+        await self.db_session.execute(statement)
         await self.db_session.commit()
+    
+    async def bulk_insert_notifications(
+        self,
+        rows: List[Dict[str, Any]],
+        method: Optional[str] = None
+    ) -> int:
+        """Insert many notification rows in one round trip and commit
+        
+        ``rows`` are dicts keyed by ``PushNotification`` attribute names, all
+        with the same keys (see ``build_notification_row``). ``method`` is
+        ``"executemany"`` (multi-row INSERT through SQLAlchemy Core) or
+        ``"copy"`` (asyncpg COPY, PostgreSQL only) and defaults to
+        ``notification_bulk_insert_method``.
+        """
+        
+        if not rows:
+            return 0
+        
+        method = method or settings.notification_bulk_insert_method
+        if method == "copy":
+            await self._copy_notifications(rows)
+        elif method == "executemany":
+            await self.db_session.execute(insert(PushNotification), rows)
+        else:
+            raise ValueError(f"Unknown bulk insert method: {method}")
         
-        return notification
+        await self.db_session.commit()
+        logger.info(f"Bulk inserted {len(rows)} notifications via {method}")
+        return len(rows)
+    
+    async def _copy_notifications(self, rows: List[Dict[str, Any]]):
+        """Stream rows into push_notifications with asyncpg's binary COPY"""
+        
+        keys = list(rows[0])
+        columns = PushNotification.__mapper__.columns
+        json_keys = {key for key in keys if isinstance(columns[key].type, JSON)}
+        
+        def copy_value(key: str, value: Any) -> Any:
+            # asyncpg takes json as text and varchar as a plain str
+            if key in json_keys and value is not None:
+                return json.dumps(value)
+            if isinstance(value, Enum):
+                return value.value
+            return value
+        
+        connection = await self.db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            PushNotification.__tablename__,
+            records=[tuple(copy_value(key, row[key]) for key in keys) for row in rows],
+            columns=[columns[key].name for key in keys]
+        )
     
     async def _prepare_notification_data(
         self,
@@ -140,23 +560,69 @@ class PushNotificationService:
             body=request.variables.get("body", "You have a new notification"),
             data=request.variables.get("data", {}),
             image_url=request.variables.get("image_url"),
-            click_action=request.variables.get("click_action")
+            click_action=request.variables.get("click_action"),
+            template_code=request.template_code
         )
     
+    async def _send_to_devices(
+        self,
+        devices: List[Dict[str, Any]],
+        notification_data: PushNotificationData,
+        correlation_id: str = None
+    ) -> List[Dict[str, Any]]:
+        """Send to every device with one call per provider, results in device order"""
+        
+        groups: Dict[int, Tuple[PushProvider, List[int]]] = {}
+        for index, device in enumerate(devices):
+            provider = self.push_provider.for_device(device.get("device_type"))
+            groups.setdefault(id(provider), (provider, []))[1].append(index)
+        
+        async def send_group(provider: PushProvider, indexes: List[int]) -> List[Dict[str, Any]]:
+            try:
+                # Send notification with circuit breaker
+                return await self.circuit_breaker.call(
+                    self._send_with_retry,
+                    provider,
+                    [devices[index]["token"] for index in indexes],
+                    notification_data,
+                    correlation_id
+                )
+            except Exception as e:
+                return [{"success": False, "error": str(e)} for _ in indexes]
+        
+        group_list = list(groups.values())
+        group_results = await asyncio.gather(*(
+            send_group(provider, indexes) for provider, indexes in group_list
+        ))
+        
+        results: List[Dict[str, Any]] = [None] * len(devices)
+        for (_, indexes), group_result in zip(group_list, group_results):
+            for index, result in zip(indexes, group_result):
+                results[index] = result
+        return results
+    
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10)
     )
     async def _send_with_retry(
         self,
-        device_token: str,
+        provider: PushProvider,
+        device_tokens: List[str],
         notification_data: PushNotificationData,
         correlation_id: str = None
-    ) -> Dict[str, Any]:
+    ) -> List[Dict[str, Any]]:
         """Send notification with retry logic"""
         
-        return await self.push_provider.send_notification(
-            device_token,
+        if len(device_tokens) == 1:
+            return [await provider.send_notification(
+                device_tokens[0],
+                notification_data,
+                correlation_id
+            )]
+        
+        return await provider.send_multicast(
+            device_tokens,
             notification_data,
             correlation_id
         )
@@ -166,42 +632,162 @@ class PushNotificationService:
         notification_id: str,
         status: NotificationStatus,
         error_message: Optional[str] = None
-    ):
-        """Update notification status in database"""
-        
-        update_data = {
-            "status": status,
-            "updated_at": datetime.utcnow()
-        }
+    ) -> bool:
+        """Update notification status in database; False if there is no such notification
         
-        if status == NotificationStatus.DELIVERED:
-            update_data["delivered_at"] = datetime.utcnow()
+        The UPDATE returns the row, which is written to the status cache
+        unconditionally after the commit, so a read that loaded the old status
+        before the update can't fill the cache with it afterwards (those
+        fills only set missing keys). The timeline entry is only added when
+        the row exists.
+        """
         
-        if error_message:
-            update_data["error_message"] = error_message
+        if not is_uuid(notification_id):
+            return False
         
-        await self.db_session.execute(
+        now = datetime.utcnow()
+        result = await self.db_session.execute(
             update(PushNotification)
-            .where(PushNotification.id == notification_id)
-            .values(**update_data)
+            .where(_ids_clause([notification_id]))
+            .values(
+                status=status,
+                updated_at=now,
+                delivered_at=now if status == NotificationStatus.DELIVERED else None,
+                error_message=error_message
+            )
+            .returning(*STATUS_COLUMNS)
+            .execution_options(synchronize_session=False)
         )
+        notification = result.one_or_none()
+        if notification is None:
+            await self.db_session.rollback()
+            return False
+        
+        await self._append_timeline([build_log_row(notification_id, status, error_message)])
         await self.db_session.commit()
+        await self.status_cache.set(notification_id, _status_info(notification))
+        return True
     
-    async def get_notification_status(self, notification_id: str) -> Optional[Dict[str, Any]]:
-        """Get notification status"""
+    async def _update_notification_statuses(
+        self,
+        updates: List[Tuple[str, NotificationStatus, Optional[str]]]
+    ):
+        """Update the status of several notifications in one executemany"""
         
-        result = await self.db_session.execute(
-            select(PushNotification).where(PushNotification.id == notification_id)
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": notification_id,
+                "created_at": uuid7_time(notification_id),
+                "status": status,
+                "updated_at": now,
+                "delivered_at": now if status == NotificationStatus.DELIVERED else None,
+                "error_message": error_message
+            }
+            for notification_id, status, error_message in updates
+        ]
+        keyed = [row for row in rows if row["created_at"] is not None]
+        legacy = [row for row in rows if row["created_at"] is None]
+        
+        # Bulk UPDATE by primary key (id, created_at): one statement, executed for every row
+        if keyed:
+            await self.db_session.execute(update(PushNotification), keyed)
+        # Rows from before UUIDv7 ids: by id alone, across all partitions
+        if legacy:
+            table = PushNotification.__table__
+            await self.db_session.execute(
+                update(table).where(table.c.id == bindparam("b_id")),
+                [
+                    {"b_id": row["id"], **{key: row[key] for key in ("status", "updated_at", "delivered_at", "error_message")}}
+                    for row in legacy
+                ]
+            )
+        await self.db_session.commit()
+    
+    def _reader(self, allow_stale: bool) -> AsyncSession:
+        return self.read_session if allow_stale else self.db_session
+    
+    async def get_notification_status(
+        self,
+        notification_id: str,
+        allow_stale: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Get notification status, from the status cache when possible
+        
+        Cache misses are read from the replica unless ``allow_stale`` is False.
+        The cache is written through on every update, so it is used either way.
+        """
+        
+        if not is_uuid(notification_id):
+            return None
+        
+        cached = await self.status_cache.get(notification_id)
+        if cached is not None:
+            return cached
+        
+        result = await self._reader(allow_stale).execute(
+            select(*STATUS_COLUMNS).where(_ids_clause([notification_id]))
         )
-        notification = result.scalar_one_or_none()
+        notification = result.one_or_none()
         
         if not notification:
             return None
         
-        return {
-            "notification_id": notification.id,
-            "status": notification.status,
-            "created_at": notification.created_at,
-            "delivered_at": notification.delivered_at,
-            "error_message": notification.error_message
-        }
\ No newline at end of file
+        status_info = _status_info(notification)
+        await self.status_cache.set(notification_id, status_info, only_if_missing=True)
+        return status_info
+    
+    async def get_notification_statuses(
+        self,
+        notification_ids: List[str],
+        allow_stale: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get the statuses of several notifications, keyed by id; unknown ids are omitted
+        
+        Cached entries come from one MGET, the rest from one ``id = ANY(:ids)``
+        query that also bounds ``created_at`` (see ``_ids_clause``).
+        """
+        
+        notification_ids = [notification_id for notification_id in dict.fromkeys(notification_ids) if is_uuid(notification_id)]
+        statuses = await self.status_cache.get_many(notification_ids)
+        missing = [notification_id for notification_id in notification_ids if notification_id not in statuses]
+        if not missing:
+            return statuses
+        
+        result = await self._reader(allow_stale).execute(
+            select(*STATUS_COLUMNS).where(_ids_clause(missing))
+        )
+        loaded = {row.id: _status_info(row) for row in result}
+        await self.status_cache.set_many(loaded, only_if_missing=True)
+        
+        statuses.update(loaded)
+        return statuses
+    
+    async def get_notification_timeline(
+        self,
+        notification_id: str,
+        allow_stale: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Get every recorded status transition of a notification, oldest first
+        
+        Entries written behind may appear up to ``status_buffer_flush_interval``
+        seconds late, plus replication lag unless ``allow_stale`` is False.
+        For UUIDv7 ids only the partitions from the id's timestamp on are read.
+        """
+        
+        query = select(PushNotificationLog).where(PushNotificationLog.notification_id == notification_id)
+        created_at = uuid7_time(notification_id)
+        if created_at is not None:
+            query = query.where(PushNotificationLog.timestamp >= created_at - TIMELINE_CLOCK_SKEW)
+        
+        result = await self._reader(allow_stale).execute(query.order_by(PushNotificationLog.timestamp))
+        
+        return [
+            {
+                "status": entry.status,
+                "timestamp": entry.timestamp,
+                "error_message": entry.error_message,
+                "metadata": entry.metadata_
+            }
+            for entry in result.scalars()
+        ]
@@ -1,5 +1,6 @@
 import json
 import asyncio
+from datetime import timezone
 from typing import Dict, Any
 import aio_pika
 from aio_pika import Message, IncomingMessage
@@ -7,11 +8,17 @@ import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.services.push_service import PushNotificationService
+from app.services.push_provider import FCMPushProvider
+from app.services.push_service import PushNotificationService, queued_status
 from app.services.queue_producer import QueueProducer
-from app.services.user_service_client import UserServiceClient
-from app.models.notification import PushNotificationRequest
+from app.services.user_service_client import UserServiceClient, UserServiceUnavailable
+from app.services.cache_invalidation import CacheInvalidationListener
+from app.services.status_cache import status_cache
+from app.services.status_writer import StatusWriteBuffer
+from app.services.partition_maintenance import PartitionMaintenanceTask
+from app.models.notification import NotificationStatus, PushNotificationRequest
 from app.core.database import AsyncSessionLocal
+from app.utils.ids import derived_uuid7, uuid7, uuid7_time
 
 logger = structlog.get_logger()
 
@@ -26,6 +33,10 @@ class QueueConsumer:
         self.failed_queue = None
         self.producer = QueueProducer()
         self.user_client = UserServiceClient()
+        self.cache_listener = CacheInvalidationListener(self.user_client)
+        # Batches delivery timeline rows and write-behind status updates
+        self.status_writer = StatusWriteBuffer()
+        self.partition_maintenance = PartitionMaintenanceTask()
     
     async def connect(self):
         """Connect to RabbitMQ"""
@@ -55,6 +66,9 @@ class QueueConsumer:
         if not self.push_queue:
             await self.connect()
         
+        self.cache_listener.start()
+        self.status_writer.start()
+        self.partition_maintenance.start()
         await self.push_queue.consume(self._process_message)
         logger.info("Started consuming push notifications")
         
@@ -80,27 +94,33 @@ class QueueConsumer:
             
             # Validate message format
             notification_request = PushNotificationRequest(**message_data)
+            if uuid7_time(notification_request.notification_id) is None:
+                # Deferred copies carry the id along
+                notification_request.notification_id = self._notification_id(message, notification_request)
+                message_data["notification_id"] = notification_request.notification_id
             
-            # Get user device token from User Service
-            device_token = await self.user_client.get_user_device_token(
-                notification_request.user_id
-            )
-            
-            # Check user preferences
-            preferences = await self.user_client.get_user_preferences(
-                notification_request.user_id
-            )
+            # Preferences and device tokens come back in a single lookup
+            try:
+                profile = await self.user_client.get_delivery_profile(
+                    notification_request.user_id
+                )
+            except UserServiceUnavailable as e:
+                await self._handle_user_service_unavailable(message, message_data, correlation_id, str(e))
+                return
             
-            if not preferences.get("push", True):
+            if profile is not None and not profile.get("push_enabled", True):
                 logger.info(
                     "User has disabled push notifications",
                     correlation_id=correlation_id,
                     user_id=notification_request.user_id
                 )
+                await self._record_dropped(notification_request.notification_id, "Push notifications disabled by user")
                 await message.ack()
                 return
             
-            if not device_token:
+            push_tokens = profile.get("push_tokens", []) if profile else []
+            
+            if not push_tokens:
                 logger.warning(
                     "No device token found for user",
                     correlation_id=correlation_id,
@@ -111,15 +131,17 @@ class QueueConsumer:
                     "No device token found",
                     correlation_id
                 )
+                await self._record_dropped(notification_request.notification_id, "No device token found")
                 await message.ack()
                 return
             
             # Process notification
             async with AsyncSessionLocal() as db_session:
-                push_service = PushNotificationService(db_session)
-                result = await push_service.process_notification(
+                push_service = PushNotificationService(db_session, self.status_writer)
+                # One multicast to every active device of the user
+                result = await push_service.process_multicast(
                     notification_request,
-                    device_token,
+                    push_tokens,
                     correlation_id
                 )
             
@@ -156,16 +178,72 @@ class QueueConsumer:
             )
             await message.ack()
     
-
+    @staticmethod
+    def _notification_id(message: IncomingMessage, request: PushNotificationRequest) -> str:
+        """Id for a message published without one
+        
+        Derived from the message timestamp and the request, so a redelivered
+        message records the same rows. Messages without a timestamp can't be
+        told apart from new ones and get a fresh id.
+        """
+        
+        timestamp = message.timestamp
+        if timestamp is None:
+            return str(uuid7())
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return str(derived_uuid7(timestamp, f"{request.request_id}:{request.user_id}"))
     
-
+    async def _handle_user_service_unavailable(
+        self,
+        message: IncomingMessage,
+        message_data: Dict[str, Any],
+        correlation_id: str,
+        error: str
+    ):
+        """Apply the ``user_service_fallback`` policy to a message we cannot route"""
+        
+        deferrals = int((message.headers or {}).get("x-deferrals", 0))
+        
+        if settings.user_service_fallback == "defer" and deferrals < settings.user_service_max_deferrals:
+            logger.warning(
+                "User Service unavailable, deferring message",
+                correlation_id=correlation_id,
+                deferrals=deferrals + 1
+            )
+            await self.producer.defer_message(message_data, deferrals + 1, correlation_id)
+        else:
+            logger.warning(
+                "User Service unavailable, skipping message",
+                correlation_id=correlation_id,
+                deferrals=deferrals
+            )
+            await self.producer.send_to_failed_queue(message_data, error, correlation_id)
+            await self._record_dropped(message_data["notification_id"], error)
+        
+        await message.ack()
+    
+    @staticmethod
+    async def _record_dropped(notification_id: str, reason: str):
+        """Replace the pending status reported since the API accepted a message that won't be sent"""
+        
+        await status_cache.set(notification_id, {
+            **queued_status(notification_id),
+            "status": NotificationStatus.FAILED.value,
+            "error_message": reason
+        })
     
     async def close(self):
         """Close RabbitMQ connection"""
+        await self.cache_listener.stop()
+        await self.partition_maintenance.stop()
+        # Flush buffered status writes before the connections go away
+        await self.status_writer.close()
         if self.user_client:
             await self.user_client.close()
         if self.producer:
             await self.producer.close()
+        await FCMPushProvider.close_shared()
         if self.connection:
             await self.connection.close()
             logger.info("RabbitMQ connection closed")
\ No newline at end of file
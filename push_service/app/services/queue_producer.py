@@ -1,8 +1,9 @@
+import asyncio
 import json
 import uuid
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import aio_pika
-from aio_pika import Message
+from aio_pika import DeliveryMode, Message
 import logging
 
 from app.core.config import settings
@@ -16,16 +17,91 @@ class QueueProducer:
     def __init__(self):
         self.connection = None
         self.channel = None
+        self._connect_lock = asyncio.Lock()
     
     async def connect(self):
-        """Connect to RabbitMQ"""
-        try:
-            self.connection = await aio_pika.connect_robust(settings.rabbitmq_url)
-            self.channel = await self.connection.channel()
-            logger.info("Producer connected to RabbitMQ")
-        except Exception as e:
-            logger.error(f"Failed to connect producer to RabbitMQ: {str(e)}")
-            raise
+        """Connect to RabbitMQ
+        
+        Concurrent first publishes wait for a single connection instead of
+        each opening one.
+        """
+        async with self._connect_lock:
+            if self.channel:
+                return
+            try:
+                self.connection = await aio_pika.connect_robust(settings.rabbitmq_url)
+                self.channel = await self.connection.channel()
+                logger.info("Producer connected to RabbitMQ")
+            except Exception as e:
+                logger.error(f"Failed to connect producer to RabbitMQ: {str(e)}")
+                raise
+    
+    @staticmethod
+    def _notification_message(notification: Dict[str, Any], correlation_id: Optional[str]) -> Message:
+        return Message(
+            json.dumps(notification).encode(),
+            correlation_id=correlation_id or str(uuid.uuid4()),
+            delivery_mode=DeliveryMode.PERSISTENT
+        )
+    
+    async def publish_notification(
+        self,
+        notification: Dict[str, Any],
+        correlation_id: Optional[str] = None
+    ):
+        """Publish a push notification request onto the push queue
+        
+        The message is persistent and the channel uses publisher confirms, so
+        once this returns the broker has it. Errors are raised to the caller.
+        """
+        
+        if not self.channel:
+            await self.connect()
+        
+        await self.channel.default_exchange.publish(
+            self._notification_message(notification, correlation_id),
+            routing_key=settings.push_queue_name
+        )
+        
+        logger.info(f"Notification queued: {notification.get('notification_id')}")
+    
+    async def publish_notifications(
+        self,
+        notifications: List[Dict[str, Any]]
+    ) -> List[Optional[BaseException]]:
+        """Publish many notification requests onto the push queue in one burst
+        
+        Up to ``push_batch_publish_window`` messages are in flight at once, so
+        their publisher confirms are awaited together instead of one round
+        trip each. Returns None per published message, or its error.
+        """
+        
+        if not notifications:
+            return []
+        if not self.channel:
+            await self.connect()
+        
+        window = settings.push_batch_publish_window
+        results: List[Optional[BaseException]] = []
+        for i in range(0, len(notifications), window):
+            outcomes = await asyncio.gather(
+                *(
+                    self.channel.default_exchange.publish(
+                        self._notification_message(notification, notification.get("request_id")),
+                        routing_key=settings.push_queue_name
+                    )
+                    for notification in notifications[i:i + window]
+                ),
+                return_exceptions=True
+            )
+            results.extend(
+                outcome if isinstance(outcome, BaseException) else None
+                for outcome in outcomes
+            )
+        
+        failed = sum(result is not None for result in results)
+        logger.info(f"Notifications queued: {len(results) - failed}, failed: {failed}")
+        return results
     
     async def send_status_update(
         self,
@@ -109,8 +185,45 @@ class QueueProducer:
         except Exception as e:
             logger.error(f"Failed to send to failed queue: {str(e)}")
     
+    async def defer_message(
+        self,
+        original_message: Dict[str, Any],
+        deferrals: int,
+        correlation_id: Optional[str] = None
+    ):
+        """Park a message on the retry queue until it dead-letters back to the push queue"""
+        
+        if not self.channel:
+            await self.connect()
+        
+        await self.channel.declare_queue(
+            settings.push_retry_queue_name,
+            durable=True,
+            arguments={
+                "x-message-ttl": settings.user_service_defer_delay_ms,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": settings.push_queue_name
+            }
+        )
+        
+        message = Message(
+            json.dumps(original_message).encode(),
+            correlation_id=correlation_id or str(uuid.uuid4()),
+            headers={"x-deferrals": deferrals},
+            delivery_mode=DeliveryMode.PERSISTENT
+        )
+        
+        await self.channel.default_exchange.publish(
+            message,
+            routing_key=settings.push_retry_queue_name
+        )
+        
+        logger.info(f"Message deferred ({deferrals}/{settings.user_service_max_deferrals})")
+    
     async def close(self):
         """Close RabbitMQ connection"""
         if self.connection:
             await self.connection.close()
+            self.connection = None
+            self.channel = None
             logger.info("Producer connection closed")
\ No newline at end of file
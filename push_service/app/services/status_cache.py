@@ -0,0 +1,144 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+import structlog
+
+from app.core.config import settings
+from app.utils.metrics import metrics
+from app.utils.ttl_cache import TTLCache
+
+logger = structlog.get_logger()
+
+STATUS_CACHE_PREFIX = "push_status"
+
+
+def _encode(entry: Dict[str, Any]) -> str:
+    return json.dumps(
+        entry,
+        separators=(",", ":"),
+        default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value)
+    )
+
+
+class NotificationStatusCache:
+    """Read-through / write-through cache for notification status lookups
+    
+    Entries are the dicts returned by ``get_notification_status`` and live in
+    Redis for ``status_cache_ttl`` seconds. With ``status_cache_l1_ttl`` > 0 a
+    short-lived in-process tier sits in front of Redis; it is only updated by
+    this process, so keep it short when several instances serve reads.
+    Cache errors are logged and treated as misses.
+    """
+    
+    def __init__(self):
+        self.redis_client = None
+        self.ttl = settings.status_cache_ttl
+        self.l1_cache: Optional[TTLCache] = None
+        if settings.status_cache_l1_ttl > 0:
+            self.l1_cache = TTLCache(
+                maxsize=settings.status_cache_l1_max_size,
+                ttl=settings.status_cache_l1_ttl
+            )
+            metrics.register("status_l1_cache", self.l1_cache.stats)
+    
+    async def _get_redis_client(self):
+        if not self.redis_client:
+            self.redis_client = redis.from_url(settings.redis_url)
+        return self.redis_client
+    
+    @staticmethod
+    def _key(notification_id: str) -> str:
+        return f"{STATUS_CACHE_PREFIX}:{notification_id}"
+    
+    async def get(self, notification_id: str) -> Optional[Dict[str, Any]]:
+        if self.l1_cache is not None:
+            entry = self.l1_cache.get(notification_id)
+            if entry is not None:
+                return entry
+        
+        try:
+            redis_client = await self._get_redis_client()
+            cached = await redis_client.get(self._key(notification_id))
+        except Exception as e:
+            logger.warning("Status cache error", error=str(e))
+            return None
+        
+        if not cached:
+            return None
+        
+        entry = json.loads(cached)
+        if self.l1_cache is not None:
+            self.l1_cache.set(notification_id, entry)
+        return entry
+    
+    async def get_many(self, notification_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached entries for the given ids, fetched with a single MGET; misses are omitted"""
+        
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for notification_id in notification_ids:
+            entry = self.l1_cache.get(notification_id) if self.l1_cache is not None else None
+            if entry is not None:
+                found[notification_id] = entry
+            else:
+                missing.append(notification_id)
+        
+        if not missing:
+            return found
+        
+        try:
+            redis_client = await self._get_redis_client()
+            values = await redis_client.mget([self._key(notification_id) for notification_id in missing])
+        except Exception as e:
+            logger.warning("Status cache error", error=str(e))
+            return found
+        
+        for notification_id, cached in zip(missing, values):
+            if not cached:
+                continue
+            entry = json.loads(cached)
+            found[notification_id] = entry
+            if self.l1_cache is not None:
+                self.l1_cache.set(notification_id, entry)
+        return found
+    
+    async def set_many(self, entries: Dict[str, Dict[str, Any]], only_if_missing: bool = False):
+        """Write several status entries with one pipelined round trip
+        
+        Entries loaded by reads use ``only_if_missing`` so they never replace
+        a newer status written through meanwhile; writers always pass the
+        full entry as committed, never a partial change.
+        """
+        
+        if not entries:
+            return
+        
+        encoded = {notification_id: _encode(entry) for notification_id, entry in entries.items()}
+        if self.l1_cache is not None and not only_if_missing:
+            for notification_id, value in encoded.items():
+                self.l1_cache.set(notification_id, json.loads(value))
+        
+        try:
+            redis_client = await self._get_redis_client()
+            pipe = redis_client.pipeline(transaction=False)
+            for notification_id, value in encoded.items():
+                if only_if_missing:
+                    pipe.set(self._key(notification_id), value, ex=self.ttl, nx=True)
+                else:
+                    pipe.setex(self._key(notification_id), self.ttl, value)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Failed to cache notification status", error=str(e))
+    
+    async def set(self, notification_id: str, entry: Dict[str, Any], only_if_missing: bool = False):
+        await self.set_many({notification_id: entry}, only_if_missing)
+    
+    async def close(self):
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+
+
+status_cache = NotificationStatusCache()
@@ -0,0 +1,264 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import insert, text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.notification import NotificationStatus, PushNotificationLog
+from app.services.delivery_rollups import RollupKey, minute_bucket, upsert_rollups
+from app.utils.ids import uuid7_time
+from app.utils.metrics import metrics
+
+logger = structlog.get_logger()
+
+# (status, error_message, delivered_at, updated_at)
+StatusTransition = Tuple[str, Optional[str], Optional[datetime], datetime]
+
+
+class StatusWriteBuffer:
+    """Write-behind buffer for notification status transitions
+    
+    Transitions are collected in memory (the latest one per notification
+    wins) and written by a background task with one
+    ``UPDATE ... FROM unnest(...)`` per batch, either every
+    ``flush_interval`` seconds or as soon as ``max_batch`` transitions are
+    pending. Timeline entries for ``push_notification_logs`` are appended in
+    the same flush with one multi-row INSERT per batch, and delivery rollup
+    increments are summed per counter and upserted. At most ``max_pending``
+    items are held; ``add``, ``add_log`` and ``add_rollups`` flush inline
+    once that limit is reached. ``close`` flushes what is left.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable = AsyncSessionLocal,
+        max_batch: int = None,
+        flush_interval: float = None,
+        max_pending: int = None
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch or settings.status_buffer_max_batch
+        self.flush_interval = flush_interval or settings.status_buffer_flush_interval
+        self.max_pending = max(max_pending or settings.status_buffer_max_pending, self.max_batch)
+        self._pending: Dict[str, StatusTransition] = {}
+        self._log_rows: List[Dict[str, Any]] = []
+        self._rollups: Dict[RollupKey, int] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        metrics.register("status_write_buffer", self.stats)
+    
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._log_rows) + len(self._rollups)
+    
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def add(
+        self,
+        notification_id: str,
+        status: NotificationStatus,
+        error_message: Optional[str] = None
+    ):
+        """Queue a status transition for the next flush"""
+        
+        now = datetime.utcnow()
+        self._pending[notification_id] = (
+            NotificationStatus(status).value,
+            error_message,
+            now if status == NotificationStatus.DELIVERED else None,
+            now
+        )
+        
+        await self._after_add()
+    
+    async def add_log(self, rows: List[Dict[str, Any]]):
+        """Queue ``PushNotificationLog`` rows (dicts keyed by attribute name)"""
+        
+        self._log_rows.extend(rows)
+        await self._after_add()
+    
+    async def add_rollups(
+        self,
+        template_code: str,
+        counts: Dict[Tuple[str, str], int],
+        timestamp: Optional[datetime] = None
+    ):
+        """Queue rollup increments, ``{(status, provider): count}`` for one template"""
+        
+        bucket = minute_bucket(timestamp or datetime.utcnow())
+        for (status, provider), count in counts.items():
+            key = (bucket, status, template_code, provider)
+            self._rollups[key] = self._rollups.get(key, 0) + count
+        await self._after_add()
+    
+    async def _after_add(self):
+        if len(self) >= self.max_pending:
+            # Backpressure: don't grow past the bound, write now
+            await self.flush()
+        elif len(self) >= self.max_batch:
+            self._flush_requested.set()
+    
+    async def flush(self) -> int:
+        """Write every pending transition, ``max_batch`` rows per statement"""
+        
+        async with self._flush_lock:
+            if not len(self):
+                return 0
+            
+            pending, self._pending = self._pending, {}
+            log_rows, self._log_rows = self._log_rows, []
+            rollups, self._rollups = self._rollups, {}
+            items = list(pending.items())
+            try:
+                async with self.session_factory() as session:
+                    for i in range(0, len(items), self.max_batch):
+                        await self._write_batch(session, items[i:i + self.max_batch])
+                    for i in range(0, len(log_rows), self.max_batch):
+                        await session.execute(insert(PushNotificationLog), log_rows[i:i + self.max_batch])
+                    await upsert_rollups(session, rollups, self.max_batch)
+                    await session.commit()
+            except asyncio.CancelledError:
+                self._requeue(items, log_rows, rollups)
+                raise
+            except Exception as e:
+                self.failed_flushes += 1
+                self._requeue(items, log_rows, rollups)
+                logger.error(
+                    "Status flush failed",
+                    pending=len(items) + len(log_rows) + len(rollups),
+                    error=str(e)
+                )
+                return 0
+            
+            written = len(items) + len(log_rows) + len(rollups)
+            self.flushed += written
+            logger.debug("Status transitions flushed", count=written)
+            return written
+    
+    def _requeue(
+        self,
+        items: List[Tuple[str, StatusTransition]],
+        log_rows: List[Dict[str, Any]],
+        rollups: Dict[RollupKey, int]
+    ):
+        """Put unwritten items back unless newer transitions arrived meanwhile"""
+        
+        for notification_id, transition in items:
+            if notification_id in self._pending:
+                continue
+            if len(self) >= self.max_pending:
+                self.dropped += 1
+                continue
+            self._pending[notification_id] = transition
+        
+        room = max(self.max_pending - len(self), 0)
+        self.dropped += max(len(log_rows) - room, 0)
+        self._log_rows[:0] = log_rows[:room]
+        
+        # Counters still being accumulated absorb the unwritten increments
+        for key, count in rollups.items():
+            if key in self._rollups:
+                self._rollups[key] += count
+            elif len(self) < self.max_pending:
+                self._rollups[key] = count
+            else:
+                self.dropped += 1
+    
+    @staticmethod
+    async def _write_batch(session, items: List[Tuple[str, StatusTransition]]):
+        """Apply a batch of transitions with one UPDATE ... FROM unnest(...)
+        
+        For UUIDv7 ids the row's created_at is the id's timestamp, so those
+        rows are matched on the full (id, created_at) key and the statement
+        is bounded to the partitions they live in. Other (pre-UUIDv7) ids are
+        updated by id alone in a second statement.
+        """
+        
+        keyed, legacy = [], []
+        for item in items:
+            created_at = uuid7_time(item[0])
+            (keyed if created_at is not None else legacy).append((created_at, item))
+        
+        if keyed:
+            bounds = [created_at for created_at, _ in keyed]
+            await StatusWriteBuffer._update_from_values(
+                session,
+                keyed,
+                "AND n.created_at = v.created_at AND n.created_at BETWEEN :created_from AND :created_to",
+                {"created_from": min(bounds), "created_to": max(bounds)}
+            )
+        if legacy:
+            await StatusWriteBuffer._update_from_values(session, legacy)
+    
+    @staticmethod
+    async def _update_from_values(
+        session,
+        items: List[Tuple[Optional[datetime], Tuple[str, StatusTransition]]],
+        condition: str = "",
+        params: Optional[Dict[str, Any]] = None
+    ):
+        # One array per column: the SQL text doesn't depend on the batch size,
+        # so asyncpg prepares each statement once
+        columns = {"ids": [], "created": [], "statuses": [], "errors": [], "delivered": [], "updated": []}
+        for created_at, (notification_id, (status, error_message, delivered_at, updated_at)) in items:
+            columns["ids"].append(notification_id)
+            columns["created"].append(created_at)
+            columns["statuses"].append(status)
+            columns["errors"].append(error_message)
+            columns["delivered"].append(delivered_at)
+            columns["updated"].append(updated_at)
+        
+        await session.execute(
+            text(
+                "UPDATE push_notifications AS n SET "
+                "status = v.status, "
+                "error_message = COALESCE(v.error_message, n.error_message), "
+                "delivered_at = COALESCE(v.delivered_at, n.delivered_at), "
+                "updated_at = v.updated_at "
+                "FROM unnest("
+                "CAST(:ids AS UUID[]), CAST(:created AS TIMESTAMP[]), CAST(:statuses AS notification_status[]), "
+                "CAST(:errors AS TEXT[]), CAST(:delivered AS TIMESTAMP[]), CAST(:updated AS TIMESTAMP[])"
+                ") AS v(id, created_at, status, error_message, delivered_at, updated_at) "
+                f"WHERE n.id = v.id {condition}".rstrip()
+            ),
+            {**(params or {}), **columns}
+        )
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+    
+    async def close(self):
+        """Stop the background flusher and write what is still pending"""
+        
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    def stats(self) -> Dict[str, float]:
+        return {
+            "pending": len(self._pending),
+            "pending_log_rows": len(self._log_rows),
+            "pending_rollups": len(self._rollups),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped
+        }
@@ -1,12 +1,60 @@
+import asyncio
+import time
+import uuid
 import httpx
 import redis.asyncio as redis
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import structlog
 
 from app.core.config import settings
+from app.services.profile_codec import decode_profile, encode_profile
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.metrics import metrics
+from app.utils.singleflight import SingleFlight
+from app.utils.ttl_cache import TTLCache
 
 logger = structlog.get_logger()
 
+PROFILE_CACHE_PREFIX = "user_delivery_profile"
+PROFILE_LOCK_PREFIX = "user_delivery_profile_lock"
+# Bumped on every invalidation; fetched profiles are only cached when it is unchanged
+PROFILE_VERSION_PREFIX = "user_delivery_profile_version"
+
+# Cached in place of a profile for users the User Service does not know
+NEGATIVE_CACHE_VALUE = "__unknown_user__"
+UNKNOWN_USER = object()
+
+# Deletes the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Caches a fetched profile unless the user was invalidated since the fetch started
+CACHE_IF_CURRENT_SCRIPT = """
+if (redis.call("get", KEYS[2]) or "0") == ARGV[1] then
+    redis.call("setex", KEYS[1], ARGV[2], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+class UserServiceUnavailable(Exception):
+    """The User Service could not answer and no cached profile was usable
+    
+    Raised by ``get_many`` with the ``user_ids`` that could not be loaded and
+    the ``profiles`` of everyone else, so batch callers can defer or skip
+    just those users.
+    """
+    
+    def __init__(self, message: str, user_ids: Optional[List[str]] = None, profiles: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.user_ids = user_ids or []
+        self.profiles = profiles or {}
+
 
 class UserServiceClient:
     """Client for communicating with User Service"""
@@ -14,7 +62,24 @@ class UserServiceClient:
     def __init__(self):
         self.user_service_url = settings.user_service_url
         self.redis_client = None
-        self.cache_ttl = 300  # 5 minutes cache
+        self.http_client: Optional[httpx.AsyncClient] = None
+        # Fail fast while the User Service is unhealthy instead of waiting out timeouts
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.user_service_breaker_threshold,
+            timeout=settings.user_service_breaker_timeout
+        )
+        # Entries are invalidated by change events, so the TTL is only a backstop
+        self.cache_ttl = settings.user_cache_ttl
+        # Short-lived in-process tier in front of Redis for hot users
+        self.l1_cache = TTLCache(
+            maxsize=settings.user_cache_l1_max_size,
+            ttl=settings.user_cache_l1_ttl
+        )
+        metrics.register("user_profile_l1_cache", self.l1_cache.stats)
+        # Concurrent misses for the same user share one User Service call
+        self._singleflight = SingleFlight()
+        # Background refreshes of stale entries, keyed by user id
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
     
     async def _get_redis_client(self):
         """Get Redis client for caching"""
@@ -22,115 +87,536 @@ class UserServiceClient:
             self.redis_client = redis.from_url(settings.redis_url)
         return self.redis_client
     
-    async def get_user_device_token(self, user_id: str) -> Optional[str]:
-        """Get user device token with caching"""
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Long-lived client so connections to the User Service are reused"""
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                base_url=self.user_service_url,
+                headers={"X-API-Key": settings.api_key},
+                timeout=httpx.Timeout(
+                    settings.user_service_timeout,
+                    connect=settings.user_service_connect_timeout
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.user_service_max_connections,
+                    max_keepalive_connections=settings.user_service_max_keepalive,
+                    keepalive_expiry=settings.user_service_keepalive_expiry
+                )
+            )
+        return self.http_client
+    
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Call the User Service through the circuit breaker
+        
+        Timeouts, connection errors and 5xx responses count as failures;
+        4xx responses are answers and do not trip the breaker.
+        """
         
-        # Try cache first
-        cache_key = f"user_device_token:{user_id}"
+        async def send() -> httpx.Response:
+            response = await self._get_http_client().request(method, path, **kwargs)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            return response
+        
+        return await self.circuit_breaker.call(send)
+    
+    @staticmethod
+    def _profile_cache_key(user_id: str) -> str:
+        return f"{PROFILE_CACHE_PREFIX}:{user_id}"
+    
+    @staticmethod
+    def _version_key(user_id: str) -> str:
+        return f"{PROFILE_VERSION_PREFIX}:{user_id}"
+    
+    @staticmethod
+    def _is_negative(profile) -> bool:
+        """Unknown users and users without any push token"""
+        return profile is UNKNOWN_USER or (
+            profile.get("push_enabled", True) and not profile.get("push_tokens")
+        )
+    
+    def _profile_ttl(self, profile) -> int:
+        """How long a cached profile is served without a refresh"""
+        return settings.user_cache_negative_ttl if self._is_negative(profile) else self.cache_ttl
+    
+    def _redis_ttl(self, profile) -> int:
+        """Hard expiry in Redis; profiles may be served stale until then"""
+        if profile is UNKNOWN_USER:
+            return self._profile_ttl(profile)
+        return self._profile_ttl(profile) + settings.user_cache_max_stale
+    
+    def _encode_profile(self, user_id: str, profile):
+        if profile is UNKNOWN_USER:
+            return NEGATIVE_CACHE_VALUE
+        return encode_profile(user_id, profile, time.time() + self._profile_ttl(profile))
+    
+    @staticmethod
+    def _decode_profile(user_id: str, cached_profile):
+        """Return ``(profile, is_stale)`` for a cached Redis value"""
+        
+        if cached_profile == NEGATIVE_CACHE_VALUE.encode():
+            return UNKNOWN_USER, False
+        
+        profile, fresh_until = decode_profile(user_id, cached_profile)
+        return profile, fresh_until is not None and fresh_until <= time.time()
+    
+    def _remember(self, user_id: str, profile) -> None:
+        """Store a profile in the in-process cache"""
+        
+        if self._is_negative(profile):
+            self.l1_cache.set(user_id, profile, ttl=min(self.l1_cache.ttl, settings.user_cache_negative_ttl))
+        else:
+            self.l1_cache.set(user_id, profile)
+    
+    async def _fetch_delivery_profile(self, user_id: str):
+        """Fetch a delivery profile from the User Service internal API
+        
+        Returns ``UNKNOWN_USER`` when the User Service does not know the user
+        and ``None`` when the lookup itself failed.
+        """
+        
+        try:
+            response = await self._request("GET", f"/internal/users/{user_id}/delivery-profile/")
+            
+            if response.status_code == 200:
+                logger.info("Delivery profile fetched from User Service", user_id=user_id)
+                return response.json().get("data", {})
+            
+            if response.status_code == 404:
+                logger.info("User not found in User Service", user_id=user_id)
+                return UNKNOWN_USER
+            
+            logger.error(
+                "Failed to fetch delivery profile",
+                user_id=user_id,
+                status_code=response.status_code
+            )
+            return None
+        
+        except httpx.TimeoutException:
+            logger.error("User Service timeout", user_id=user_id)
+            return None
+        except Exception as e:
+            logger.error("User Service error", user_id=user_id, error=str(e))
+            return None
+    
+    async def get_delivery_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get push preferences and active push tokens for a user
+        
+        Returns ``{"push_enabled", "preferences", "push_tokens"}`` from a single
+        cache entry, or one User Service request on a miss. ``None`` means the
+        user is unknown; ``UserServiceUnavailable`` is raised when the User
+        Service could not be reached and nothing was cached. Unknown users
+        and users without push tokens are cached for the shorter
+        ``user_cache_negative_ttl``.
+        
+        Expired profiles are still served for up to ``user_cache_max_stale``
+        seconds while a background task refreshes them, so neither an expiring
+        entry nor a struggling User Service adds latency to the lookup.
+        """
+        
+        profile = await self._get_delivery_profile(user_id)
+        if profile is None:
+            raise UserServiceUnavailable(f"No delivery profile available for user {user_id}")
+        return None if profile is UNKNOWN_USER else profile
+    
+    async def _get_delivery_profile(self, user_id: str):
+        profile = self.l1_cache.get(user_id)
+        if profile is not None:
+            return profile
+        
+        cache_key = self._profile_cache_key(user_id)
         redis_client = await self._get_redis_client()
         
         try:
-            cached_token = await redis_client.get(cache_key)
-            if cached_token:
-                logger.info("Device token found in cache", user_id=user_id)
-                return cached_token.decode()
+            cached_profile = await redis_client.get(cache_key)
+            if cached_profile:
+                logger.info("Delivery profile found in cache", user_id=user_id)
+                profile, is_stale = self._decode_profile(user_id, cached_profile)
+                self._remember(user_id, profile)
+                if is_stale:
+                    self._schedule_refresh([user_id])
+                return profile
+        except Exception as e:
+            logger.warning("Redis cache error", error=str(e))
+        
+        return await self._singleflight.do(
+            user_id,
+            lambda: self._load_delivery_profile(user_id)
+        )
+    
+    async def _profile_version(self, user_id: str) -> Optional[str]:
+        """Invalidation version of a user, read before fetching its profile
+        
+        ``None`` when Redis is unavailable.
+        """
+        
+        try:
+            redis_client = await self._get_redis_client()
+            version = await redis_client.get(self._version_key(user_id))
         except Exception as e:
             logger.warning("Redis cache error", error=str(e))
+            return None
+        return version.decode() if version else "0"
+    
+    async def _cache_profile(self, user_id: str, profile, version: Optional[str]):
+        """Store a fetched profile in the in-process cache and in Redis
+        
+        The Redis write only happens while the user's invalidation version is
+        still ``version``. If the user was invalidated during the fetch, the
+        profile is dropped from both tiers again. Without a version (Redis was
+        unavailable) the profile is only kept in process.
+        """
         
-        # Fetch from User Service
+        self._remember(user_id, profile)
+        if version is None:
+            return
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.user_service_url}/api/v1/users/{user_id}/device-token",
-                    timeout=5.0
+            redis_client = await self._get_redis_client()
+            cached = await redis_client.eval(
+                CACHE_IF_CURRENT_SCRIPT,
+                2,
+                self._profile_cache_key(user_id),
+                self._version_key(user_id),
+                version,
+                self._redis_ttl(profile),
+                self._encode_profile(user_id, profile)
+            )
+        except Exception as e:
+            logger.warning("Failed to cache delivery profile", error=str(e))
+            return
+        
+        if not cached:
+            self.l1_cache.delete(user_id)
+            logger.info("Delivery profile changed during fetch, not cached", user_id=user_id)
+    
+    def _schedule_refresh(self, user_ids: List[str]) -> None:
+        """Refresh stale profiles in the background, once per user
+        
+        The stale entry stays in Redis until its hard expiry, so a failed
+        refresh leaves the old profile in place rather than dropping to
+        defaults. A refresh that overlaps an invalidation doesn't cache what
+        it fetched (see ``_cache_profile``).
+        """
+        
+        user_ids = [
+            user_id for user_id in user_ids
+            if user_id not in self._refresh_tasks and not self._singleflight.in_flight(user_id)
+        ]
+        if not user_ids:
+            return
+        
+        if len(user_ids) == 1:
+            user_id = user_ids[0]
+            refresh = self._singleflight.do(
+                user_id,
+                lambda: self._load_delivery_profile(user_id, wait=False)
+            )
+        else:
+            refresh = self._singleflight.do_many(user_ids, self._load_delivery_profiles)
+        
+        task = asyncio.create_task(refresh)
+        for user_id in user_ids:
+            self._refresh_tasks[user_id] = task
+        task.add_done_callback(lambda done: self._refresh_done(user_ids, done))
+        logger.info("Refreshing stale delivery profiles", count=len(user_ids))
+    
+    def _refresh_done(self, user_ids: List[str], task: asyncio.Task) -> None:
+        for user_id in user_ids:
+            self._refresh_tasks.pop(user_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Delivery profile refresh failed", error=str(task.exception()))
+    
+    async def _wait_for_cached_profile(self, redis_client, user_id: str):
+        """Wait for the process holding the fetch lock to fill the cache
+        
+        Returns ``None`` once the lock is gone or has expired without a cached
+        profile, in which case the caller fetches the profile itself.
+        """
+        
+        cache_key = self._profile_cache_key(user_id)
+        lock_key = f"{PROFILE_LOCK_PREFIX}:{user_id}"
+        deadline = time.monotonic() + settings.user_cache_lock_ttl_ms / 1000
+        
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.user_cache_lock_poll_interval)
+            try:
+                cached_profile, locked = await (
+                    redis_client.pipeline(transaction=False)
+                    .get(cache_key)
+                    .exists(lock_key)
+                    .execute()
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    device_token = data.get("data", {}).get("push_token")
-                    
-                    if device_token:
-                        # Cache the token
-                        try:
-                            await redis_client.setex(
-                                cache_key,
-                                self.cache_ttl,
-                                device_token
-                            )
-                        except Exception as e:
-                            logger.warning("Failed to cache device token", error=str(e))
-                        
-                        logger.info("Device token fetched from User Service", user_id=user_id)
-                        return device_token
-                    else:
-                        logger.warning("No device token found for user", user_id=user_id)
-                        return None
-                else:
-                    logger.error(
-                        "Failed to fetch device token",
-                        user_id=user_id,
-                        status_code=response.status_code
-                    )
-                    return None
-                    
+            except Exception as e:
+                logger.warning("Redis cache error", error=str(e))
+                return None
+            
+            if cached_profile:
+                return self._decode_profile(user_id, cached_profile)[0]
+            if not locked:
+                return None
+        
+        return None
+    
+    async def _load_delivery_profile(self, user_id: str, wait: bool = True):
+        """Fetch a profile on a cache miss, at most once across processes
+        
+        A short Redis lock elects one process to call the User Service; the
+        others wait for it to populate the cache, or give up straight away
+        when ``wait`` is false (background refreshes).
+        """
+        
+        redis_client = await self._get_redis_client()
+        lock_key = f"{PROFILE_LOCK_PREFIX}:{user_id}"
+        lock_token = uuid.uuid4().hex
+        
+        try:
+            acquired = bool(await redis_client.set(
+                lock_key,
+                lock_token,
+                nx=True,
+                px=settings.user_cache_lock_ttl_ms
+            ))
+            lock_held_elsewhere = not acquired
+        except Exception as e:
+            logger.warning("Redis lock error", error=str(e))
+            acquired = lock_held_elsewhere = False
+        
+        if lock_held_elsewhere:
+            if not wait:
+                return None
+            profile = await self._wait_for_cached_profile(redis_client, user_id)
+            if profile is not None:
+                self._remember(user_id, profile)
+                return profile
+        
+        try:
+            version = await self._profile_version(user_id)
+            profile = await self._fetch_delivery_profile(user_id)
+            if profile is not None:
+                await self._cache_profile(user_id, profile, version)
+            return profile
+        finally:
+            if acquired:
+                try:
+                    await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+                except Exception as e:
+                    logger.warning("Failed to release profile lock", error=str(e))
+    
+    async def _fetch_delivery_profiles(self, user_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Fetch delivery profiles for many users with one User Service request
+        
+        Returns ``None`` when the request failed; users missing from a
+        successful response are unknown to the User Service.
+        """
+        
+        try:
+            response = await self._request("POST", "/internal/users/batch/", json={"user_ids": user_ids})
+            
+            if response.status_code == 200:
+                profiles = response.json().get("data", {}).get("profiles", {})
+                logger.info(
+                    "Delivery profiles fetched from User Service",
+                    requested=len(user_ids),
+                    found=len(profiles)
+                )
+                return profiles
+            
+            logger.error(
+                "Failed to fetch delivery profiles",
+                requested=len(user_ids),
+                status_code=response.status_code
+            )
+            return None
+        
         except httpx.TimeoutException:
-            logger.error("User Service timeout", user_id=user_id)
+            logger.error("User Service timeout", requested=len(user_ids))
             return None
         except Exception as e:
-            logger.error("User Service error", user_id=user_id, error=str(e))
+            logger.error("User Service error", requested=len(user_ids), error=str(e))
             return None
     
-    async def get_user_preferences(self, user_id: str) -> Dict[str, Any]:
-        """Get user notification preferences"""
+    async def get_many(self, user_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get delivery profiles for many users
+        
+        The in-process cache is checked first, the remaining profiles are read
+        from Redis with a single MGET and only the misses are fetched from the
+        User Service, ``user_service_batch_size`` ids per request. Unknown
+        users map to ``None``. If some profiles could not be loaded at all,
+        ``UserServiceUnavailable`` is raised naming them and carrying the
+        profiles that were found.
+        """
+        
+        user_ids = list(dict.fromkeys(user_ids))
+        profiles: Dict[str, Any] = {}
+        for user_id in user_ids:
+            profile = self.l1_cache.get(user_id)
+            if profile is not None:
+                profiles[user_id] = profile
+        
+        remaining = [user_id for user_id in user_ids if user_id not in profiles]
+        if not remaining:
+            return self._public_profiles(user_ids, profiles)
         
-        cache_key = f"user_preferences:{user_id}"
         redis_client = await self._get_redis_client()
         
         try:
-            cached_prefs = await redis_client.get(cache_key)
-            if cached_prefs:
-                import json
-                return json.loads(cached_prefs.decode())
+            cached_profiles = await redis_client.mget(
+                [self._profile_cache_key(user_id) for user_id in remaining]
+            )
+            stale = []
+            for user_id, cached_profile in zip(remaining, cached_profiles):
+                if cached_profile:
+                    profiles[user_id], is_stale = self._decode_profile(user_id, cached_profile)
+                    self._remember(user_id, profiles[user_id])
+                    if is_stale:
+                        stale.append(user_id)
+            if stale:
+                self._schedule_refresh(stale)
         except Exception as e:
-            logger.warning("Redis cache error for preferences", error=str(e))
+            logger.warning("Redis cache error", error=str(e))
         
-        # Fetch from User Service
+        misses = [user_id for user_id in remaining if user_id not in profiles]
+        if misses:
+            loaded = await self._singleflight.do_many(misses, self._load_delivery_profiles)
+            profiles.update({user_id: profile for user_id, profile in loaded.items() if profile is not None})
+        
+        failed = [user_id for user_id in user_ids if user_id not in profiles]
+        if failed:
+            raise UserServiceUnavailable(
+                f"No delivery profile available for {len(failed)} users",
+                user_ids=failed,
+                profiles=self._public_profiles([user_id for user_id in user_ids if user_id in profiles], profiles)
+            )
+        return self._public_profiles(user_ids, profiles)
+    
+    @staticmethod
+    def _public_profiles(user_ids: List[str], profiles: Dict[str, Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+        return {
+            user_id: None if profiles.get(user_id) is UNKNOWN_USER else profiles.get(user_id)
+            for user_id in user_ids
+        }
+    
+    async def _load_delivery_profiles(self, user_ids: List[str]) -> Dict[str, Any]:
+        """Fetch and cache profiles for cache misses in batches
+        
+        Like ``_cache_profile``, profiles of users invalidated while the
+        batch was in flight are not cached.
+        """
+        
+        versions: Dict[str, str] = {}
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.user_service_url}/api/v1/users/{user_id}/preferences",
-                    timeout=5.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    preferences = data.get("data", {})
-                    
-                    # Cache preferences
-                    try:
-                        import json
-                        await redis_client.setex(
-                            cache_key,
-                            self.cache_ttl,
-                            json.dumps(preferences)
-                        )
-                    except Exception as e:
-                        logger.warning("Failed to cache preferences", error=str(e))
-                    
-                    return preferences
-                else:
-                    logger.error(
-                        "Failed to fetch user preferences",
-                        user_id=user_id,
-                        status_code=response.status_code
+            redis_client = await self._get_redis_client()
+            cached_versions = await redis_client.mget([self._version_key(user_id) for user_id in user_ids])
+            versions = {
+                user_id: version.decode() if version else "0"
+                for user_id, version in zip(user_ids, cached_versions)
+            }
+        except Exception as e:
+            logger.warning("Redis cache error", error=str(e))
+        
+        batch_size = settings.user_service_batch_size
+        chunks = [user_ids[i:i + batch_size] for i in range(0, len(user_ids), batch_size)]
+        fetched: Dict[str, Any] = {}
+        for chunk, chunk_profiles in zip(chunks, await asyncio.gather(*(
+            self._fetch_delivery_profiles(chunk) for chunk in chunks
+        ))):
+            if chunk_profiles is None:
+                continue
+            for user_id in chunk:
+                fetched[user_id] = chunk_profiles.get(user_id, UNKNOWN_USER)
+        
+        for user_id, profile in fetched.items():
+            self._remember(user_id, profile)
+        
+        versioned = [user_id for user_id in fetched if user_id in versions]
+        if versioned:
+            try:
+                redis_client = await self._get_redis_client()
+                pipe = redis_client.pipeline(transaction=False)
+                for user_id in versioned:
+                    pipe.eval(
+                        CACHE_IF_CURRENT_SCRIPT,
+                        2,
+                        self._profile_cache_key(user_id),
+                        self._version_key(user_id),
+                        versions[user_id],
+                        self._redis_ttl(fetched[user_id]),
+                        self._encode_profile(user_id, fetched[user_id])
                     )
-                    return {"push": True}  # Default preference
-                    
+                cached = await pipe.execute()
+            except Exception as e:
+                logger.warning("Failed to cache delivery profiles", error=str(e))
+            else:
+                for user_id, was_cached in zip(versioned, cached):
+                    if not was_cached:
+                        self.l1_cache.delete(user_id)
+                        logger.info("Delivery profile changed during fetch, not cached", user_id=user_id)
+        
+        return fetched
+    
+    async def invalidate(self, user_id: str):
+        """Drop a user's cached delivery profile from both cache tiers
+        
+        Also bumps the user's invalidation version, so a fetch that started
+        before this can't write the old profile back afterwards.
+        """
+        
+        self.l1_cache.delete(user_id)
+        try:
+            redis_client = await self._get_redis_client()
+            version_key = self._version_key(user_id)
+            await (
+                redis_client.pipeline(transaction=True)
+                .incr(version_key)
+                # Only has to outlive the fetches in flight
+                .expire(version_key, self.cache_ttl + settings.user_cache_max_stale)
+                .delete(self._profile_cache_key(user_id))
+                .execute()
+            )
         except Exception as e:
-            logger.error("User Service error for preferences", user_id=user_id, error=str(e))
+            logger.warning("Failed to invalidate delivery profile", user_id=user_id, error=str(e))
+    
+    async def get_user_device_token(self, user_id: str) -> Optional[str]:
+        """Get the most recently used device token for a user"""
+        
+        try:
+            profile = await self.get_delivery_profile(user_id)
+        except UserServiceUnavailable:
+            profile = None
+        if profile and profile.get("push_tokens"):
+            return profile["push_tokens"][0]["token"]
+        
+        logger.warning("No device token found for user", user_id=user_id)
+        return None
+    
+    async def get_user_device_tokens(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get every active device token for a user, most recently used first"""
+        
+        try:
+            profile = await self.get_delivery_profile(user_id)
+        except UserServiceUnavailable:
+            profile = None
+        return profile.get("push_tokens", []) if profile else []
+    
+    async def get_user_preferences(self, user_id: str) -> Dict[str, Any]:
+        """Get user notification preferences"""
+        
+        try:
+            profile = await self.get_delivery_profile(user_id)
+        except UserServiceUnavailable:
+            profile = None
+        if profile is None:
             return {"push": True}  # Default preference
+        
+        return {"push": profile.get("push_enabled", True), **profile.get("preferences", {})}
     
     async def close(self):
-        """Close Redis connection"""
+        """Close the User Service and Redis connections"""
+        for task in set(self._refresh_tasks.values()):
+            task.cancel()
+        if self.http_client:
+            await self.http_client.aclose()
+            self.http_client = None
         if self.redis_client:
-            await self.redis_client.close()
\ No newline at end of file
+            await self.redis_client.close()
@@ -0,0 +1,121 @@
+import re
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Statements are grouped by verb and first table, e.g. "update_push_notifications"
+_STATEMENT_TARGET = re.compile(
+    r'^\s*(?:(select)\b.*?\bfrom|(insert)\s+into|(update)|(delete)\s+from)\s+"?(\w+)',
+    re.IGNORECASE | re.DOTALL
+)
+# Bounds the number of exported series if statements get unusual
+MAX_STATEMENT_KEYS = 50
+
+
+class LatencyStats:
+    """Count, total and max of a stream of durations (seconds)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+    
+    def stats(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "seconds_total": self.total,
+            "seconds_max": self.max,
+            "seconds_avg": self.total / self.count if self.count else 0.0
+        }
+
+
+def statement_key(statement: str) -> str:
+    match = _STATEMENT_TARGET.match(statement)
+    if not match:
+        # e.g. the pre-ping "SELECT 1" or advisory lock calls
+        words = statement.split(None, 1)
+        return words[0].lower() if words and words[0].isalpha() else "other"
+    verb = next(group for group in match.groups()[:4] if group)
+    return f"{verb.lower()}_{match.group(5).lower()}"
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waits
+    
+    The wait includes queueing for a free connection, opening an overflow
+    connection and the pre-ping, i.e. everything a session waits for before
+    its first statement. Timeouts (pool exhausted) are counted separately.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = LatencyStats()
+        self.checkout_timeouts = 0
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+    
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        pool.checkout_timeouts = self.checkout_timeouts
+        return pool
+
+
+class DatabaseMetrics:
+    """Pool saturation, checkout wait and per-statement query latency for an engine"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.queries: Dict[str, LatencyStats] = {}
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+    
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+    
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+        key = statement_key(statement)
+        if key not in self.queries and len(self.queries) >= MAX_STATEMENT_KEYS:
+            key = "other"
+        self.queries.setdefault(key, LatencyStats()).observe(elapsed)
+    
+    def stats(self) -> Dict[str, float]:
+        pool = self.engine.pool
+        samples: Dict[str, float] = {}
+        
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            samples.update({
+                "pool_size": pool.size(),
+                "pool_checked_out": pool.checkedout(),
+                "pool_idle": pool.checkedin(),
+                "pool_overflow": max(pool.overflow(), 0),
+                "pool_saturation": pool.checkedout() / capacity if capacity else 0.0
+            })
+        if isinstance(pool, TimedQueuePool):
+            samples["pool_checkout_timeouts"] = pool.checkout_timeouts
+            for name, value in pool.checkout_wait.stats().items():
+                samples[f"pool_checkout_wait_{name}"] = value
+        
+        for key, latency in self.queries.items():
+            for name, value in latency.stats().items():
+                samples[f"query_{key}_{name}"] = value
+        return samples
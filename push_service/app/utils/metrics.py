@@ -0,0 +1,34 @@
+from typing import Callable, Dict
+
+
+class MetricsRegistry:
+    """Process-wide registry of metric collectors
+    
+    Each collector is a callable returning a flat ``{name: value}`` dict; the
+    values are rendered in the Prometheus text format by ``/metrics``.
+    """
+    
+    def __init__(self):
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+    
+    def register(self, prefix: str, collector: Callable[[], Dict[str, float]]) -> None:
+        self._collectors[prefix] = collector
+    
+    def unregister(self, prefix: str) -> None:
+        self._collectors.pop(prefix, None)
+    
+    def collect(self) -> Dict[str, float]:
+        samples: Dict[str, float] = {}
+        for prefix, collector in self._collectors.items():
+            for name, value in collector().items():
+                samples[f"{prefix}_{name}"] = value
+        return samples
+    
+    def render_prometheus(self) -> str:
+        return "".join(
+            f"push_service_{name} {value}\n"
+            for name, value in sorted(self.collect().items())
+        )
+
+
+metrics = MetricsRegistry()
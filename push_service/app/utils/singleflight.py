@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call
+    
+    The first caller for a key runs the call; everyone arriving while it is
+    in flight awaits the same result (or exception) instead of repeating it.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+    
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+    
+    @staticmethod
+    def _settle(future: asyncio.Future, result: Any = None, error: BaseException = None) -> None:
+        if future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            # Nobody may be waiting; don't warn about an unretrieved exception
+            future.exception()
+        else:
+            future.set_result(result)
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._settle(future, error=e)
+            raise
+        else:
+            self._settle(future, result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+    
+    async def do_many(
+        self,
+        keys: List[Hashable],
+        fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+    ) -> Dict[Hashable, Any]:
+        """Batch variant of ``do``
+        
+        Keys already in flight are awaited; ``fn`` is called once with the
+        remaining keys and must return a dict (missing keys resolve to None).
+        """
+        
+        waiting = {key: self._calls[key] for key in keys if key in self._calls}
+        leading = [key for key in keys if key not in waiting]
+        
+        futures = {}
+        loop = asyncio.get_running_loop()
+        for key in leading:
+            futures[key] = self._calls[key] = loop.create_future()
+        
+        results: Dict[Hashable, Any] = {}
+        try:
+            if leading:
+                results = dict(await fn(leading))
+        except BaseException as e:
+            for future in futures.values():
+                self._settle(future, error=e)
+            raise
+        else:
+            for key, future in futures.items():
+                self._settle(future, results.get(key))
+        finally:
+            for key in leading:
+                self._calls.pop(key, None)
+        
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+        
+        return results
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: push_notifications insert throughput against a real PostgreSQL.
+
+Compares the per-message path (ORM add + commit per row) with the bulk
+persistence API (``PushNotificationService.bulk_insert_notifications``) using
+a multi-row INSERT and asyncpg COPY. Rows are written to the table named in
+DATABASE_URL and removed again afterwards.
+
+    DATABASE_URL=postgresql+asyncpg://... python benchmarks/bench_bulk_insert.py [rows]
+"""
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete
+
+from app.core.database import AsyncSessionLocal, close_db, create_tables
+from app.models.notification import PushNotification, PushNotificationRequest
+from app.services.push_service import PushNotificationService, build_notification_row
+
+BATCH_SIZE = 1000
+
+
+def make_rows(rows, request):
+    return [
+        build_notification_row(str(uuid.uuid4()), request, f"bench-token-{i:08d}")
+        for i in range(rows)
+    ]
+
+
+async def orm_per_row(session, service, rows):
+    for row in rows:
+        session.add(PushNotification(**row))
+        await session.commit()
+
+
+async def orm_add_all(session, service, rows):
+    session.add_all([PushNotification(**row) for row in rows])
+    await session.commit()
+
+
+def bulk(method):
+    async def run(session, service, rows):
+        for i in range(0, len(rows), BATCH_SIZE):
+            await service.bulk_insert_notifications(rows[i:i + BATCH_SIZE], method=method)
+    return run
+
+
+async def measure(label, fn, rows, request):
+    batch = make_rows(rows, request)
+    async with AsyncSessionLocal() as session:
+        service = PushNotificationService(session)
+        start = time.perf_counter()
+        await fn(session, service, batch)
+        elapsed = time.perf_counter() - start
+        
+        await session.execute(
+            delete(PushNotification).where(PushNotification.request_id == request.request_id)
+        )
+        await session.commit()
+    
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {rows / elapsed:10.0f} rows/s")
+    return rows / elapsed
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    request = PushNotificationRequest(
+        user_id="bench-user",
+        template_code="bench",
+        variables={"title": "Spring sale", "body": "Everything is 50% off", "data": {"campaign": "spring"}},
+        request_id=f"bench-{uuid.uuid4()}",
+        metadata={"source": "bench_bulk_insert"}
+    )
+    
+    await create_tables()
+    print(f"{rows} rows, bulk batches of {BATCH_SIZE}\n")
+    
+    # The per-row path is slow; time a slice of it and extrapolate the rate
+    baseline = await measure("ORM add + commit per row", orm_per_row, min(rows, 2_000), request)
+    await measure("ORM add_all, one commit", orm_add_all, rows, request)
+    executemany = await measure("bulk executemany", bulk("executemany"), rows, request)
+    copy = await measure("bulk COPY", bulk("copy"), rows, request)
+    
+    print()
+    print(f"executemany vs per-row: {executemany / baseline:.1f}x")
+    print(f"COPY vs per-row:        {copy / baseline:.1f}x")
+    
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
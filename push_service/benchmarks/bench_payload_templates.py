@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-send payload construction in the push providers.
+
+Compares rebuilding the headers and JSON payload for every send (the old
+OneSignal path) with splicing the recipient into a cached template, for
+single-recipient sends with repeated content and for a fan-out multicast.
+
+    python benchmarks/bench_payload_templates.py [sends]
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.notification import PushNotificationData
+from app.services.push_provider import OneSignalPushProvider
+
+
+def rebuild_per_send(provider, device_token, notification_data):
+    headers = {
+        "Authorization": f"Basic {provider.api_key}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "app_id": provider.app_id,
+        "include_player_ids": [device_token],
+        "headings": {"en": notification_data.title},
+        "contents": {"en": notification_data.body},
+        "data": notification_data.data or {},
+    }
+    if notification_data.image_url:
+        payload["big_picture"] = notification_data.image_url
+    if notification_data.click_action:
+        payload["url"] = notification_data.click_action
+    return headers, json.dumps(payload).encode()
+
+
+def measure(label, sends, fn, calls=None):
+    calls = calls or sends
+    start = time.process_time()
+    for i in range(calls):
+        fn(i)
+    elapsed = time.process_time() - start
+    print(f"{label:<36} {elapsed * 1000:8.1f} ms CPU  {elapsed / sends * 1e6:6.2f} us/send")
+    return elapsed
+
+
+def main():
+    sends = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    
+    provider = OneSignalPushProvider()
+    provider.app_id = "bench-app"
+    provider.api_key = "bench-key"
+    
+    notification_data = PushNotificationData(
+        title="Spring sale",
+        body="Everything is 50% off until Sunday",
+        data={"campaign": "spring", "deep_link": "app://sale", "variant": "b"},
+        image_url="https://cdn.example.com/spring.png",
+        click_action="https://example.com/sale"
+    )
+    tokens = [f"player-{i:08d}" for i in range(sends)]
+    
+    print(f"{sends} sends with identical content\n")
+    baseline = measure(
+        "rebuild payload per send",
+        sends,
+        lambda i: rebuild_per_send(provider, tokens[i], notification_data)
+    )
+    templated = measure(
+        "cached template, one token/send",
+        sends,
+        lambda i: provider._build_payload([tokens[i]], notification_data)
+    )
+    
+    chunk = provider.max_recipients
+    multicast = measure(
+        f"cached template, {chunk} tokens/request",
+        sends,
+        lambda i: provider._build_payload(tokens[i * chunk:(i + 1) * chunk], notification_data),
+        calls=-(-sends // chunk)
+    )
+    
+    print()
+    print(f"CPU saved per {sends} single sends: {(baseline - templated) * 1000:.1f} ms")
+    print(f"CPU saved per {sends} sends as multicast: {(baseline - multicast) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from pydantic import ValidationError
+
+from app.models.notification import PushNotificationBatchRequest
+from app.services.batch_send import enqueue_batch, expand_batch, validate_items
+
+
+def test_template_batch_expands_per_recipient():
+    """Test that recipients inherit the template and override shared variables"""
+    
+    batch = PushNotificationBatchRequest(
+        template_code="sale",
+        variables={"title": "Sale", "body": "Up to 50% off"},
+        request_id="campaign-7",
+        recipients=[
+            {"user_id": "user-1"},
+            {"user_id": "user-2", "variables": {"body": "Your cart is on sale"}, "request_id": "req-2"}
+        ]
+    )
+    
+    first, second = expand_batch(batch)
+    
+    assert first["template_code"] == "sale" and first["request_id"] == "campaign-7:0"
+    assert second["variables"] == {"title": "Sale", "body": "Your cart is on sale"}
+    assert second["request_id"] == "req-2"
+    
+    with pytest.raises(ValidationError):
+        PushNotificationBatchRequest(recipients=[{"user_id": "user-1"}])
+
+
+def test_invalid_items_are_rejected_individually():
+    """Test that one bad item is reported by index without rejecting the rest"""
+    
+    items = [
+        {"user_id": "user-1", "template_code": "welcome", "request_id": "req-1"},
+        {"user_id": "user-2", "request_id": "req-2", "priority": "high"},
+        {"user_id": "user-3", "template_code": "welcome", "request_id": "req-3"}
+    ]
+    
+    valid, rejected = validate_items(items)
+    
+    assert [index for index, _ in valid] == [0, 2]
+    assert valid[1][1].user_id == "user-3"
+    assert sorted(rejected[1]) == ["priority: Input should be a valid integer, unable to parse string as an integer", "template_code: Field required"]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_batch_publishes_valid_items_in_one_burst():
+    """Test that valid items are published together and get per-item ids"""
+    
+    producer = Mock(publish_notifications=AsyncMock(return_value=[None, ConnectionError("channel closed")]))
+    batch = PushNotificationBatchRequest(notifications=[
+        {"user_id": "user-1", "template_code": "welcome", "request_id": "req-1"},
+        {"user_id": "user-2", "request_id": "req-2"},
+        {"user_id": "user-3", "template_code": "welcome", "request_id": "req-3"}
+    ])
+    
+    cache = AsyncMock()
+    queued, rejected, failed = await enqueue_batch(producer, batch, cache)
+    
+    producer.publish_notifications.assert_awaited_once()
+    [messages] = producer.publish_notifications.await_args.args
+    assert [message["user_id"] for message in messages] == ["user-1", "user-3"]
+    assert queued["status"] == "queued" and queued["notification_id"] == messages[0]["notification_id"]
+    assert rejected["status"] == "rejected"
+    assert failed == {"index": 2, "status": "failed", "error": "channel closed"}
+    # Only the queued item reads as pending until the consumer records it
+    [entries] = cache.set_many.await_args.args
+    assert list(entries) == [queued["notification_id"]]
+    assert entries[queued["notification_id"]]["status"] == "pending"
+    assert cache.set_many.await_args.kwargs == {"only_if_missing": True}
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.cache_invalidation import CacheInvalidationListener
+from app.services.user_service_client import UserServiceClient
+from tests.test_user_service_client import FakeRedis
+
+
+@pytest.fixture
+def user_client():
+    client = UserServiceClient()
+    client.redis_client = FakeRedis()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_change_event_evicts_both_cache_tiers(user_client):
+    """Test that a change event forces the next lookup back to the User Service"""
+    
+    profile = {"user_id": "42", "push_enabled": True, "preferences": {}, "push_tokens": []}
+    user_client._fetch_delivery_profile = AsyncMock(return_value=profile)
+    await user_client.get_delivery_profile("42")
+    
+    listener = CacheInvalidationListener(user_client)
+    await listener.handle_event(json.dumps({"u": 42, "k": "token", "op": "save"}))
+    
+    assert user_client.l1_cache.get("42") is None
+    assert "user_delivery_profile:42" not in user_client.redis_client.store
+    
+    await user_client.get_delivery_profile("42")
+    assert user_client._fetch_delivery_profile.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_in_flight_during_invalidation_is_not_cached(user_client):
+    """Test that a profile fetched before a change event doesn't go back into the cache"""
+    
+    old = {"user_id": "42", "push_enabled": True, "preferences": {}, "push_tokens": [{"token": "token-a"}]}
+    new = {"user_id": "42", "push_enabled": False, "preferences": {}, "push_tokens": [{"token": "token-a"}]}
+    fetch_started = asyncio.Event()
+    invalidated = asyncio.Event()
+    
+    async def fetch(user_id):
+        if user_client._fetch_delivery_profile.await_count > 1:
+            return new
+        fetch_started.set()
+        await invalidated.wait()
+        return old
+    
+    user_client._fetch_delivery_profile = AsyncMock(side_effect=fetch)
+    lookup = asyncio.create_task(user_client.get_delivery_profile("42"))
+    await fetch_started.wait()
+    
+    listener = CacheInvalidationListener(user_client)
+    await listener.handle_event(json.dumps({"u": 42, "k": "prefs", "op": "save"}))
+    invalidated.set()
+    
+    # The lookup in flight still answers, but neither tier keeps the old profile
+    assert await lookup == old
+    assert user_client.l1_cache.get("42") is None
+    assert "user_delivery_profile:42" not in user_client.redis_client.store
+    assert await user_client.get_delivery_profile("42") == new
+    assert (await user_client.get_delivery_profile("42"))["push_enabled"] is False
+
+
+@pytest.mark.asyncio
+async def test_malformed_events_are_ignored(user_client):
+    """Test that bad payloads do not kill the listener"""
+    
+    user_client.invalidate = AsyncMock()
+    listener = CacheInvalidationListener(user_client)
+    
+    await listener.handle_event(b"not json")
+    await listener.handle_event(json.dumps({"k": "prefs"}))
+    
+    user_client.invalidate.assert_not_awaited()
+    assert listener.events_handled == 0
@@ -0,0 +1,33 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.dialects import postgresql
+
+from app.services.delivery_rollups import query_stats
+
+
+@pytest.mark.asyncio
+async def test_query_stats_groups_counters_by_requested_columns():
+    """Test that stats are summed over the rollups, optionally per time bucket"""
+    
+    row = Mock(_mapping={"template_code": "welcome", "count": 7}, count=7)
+    session = Mock(execute=AsyncMock(return_value=[row]))
+    
+    stats = await query_stats(
+        session,
+        datetime(2025, 11, 24, 10, 0),
+        datetime(2025, 11, 24, 11, 0),
+        ["template_code"],
+        "hour"
+    )
+    
+    assert stats == [{"template_code": "welcome", "count": 7}]
+    [query] = session.execute.await_args.args
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "FROM push_delivery_rollups" in sql
+    assert "GROUP BY date_trunc" in sql and "push_delivery_rollups.template_code" in sql
+    
+    with pytest.raises(ValueError):
+        await query_stats(session, datetime(2025, 11, 24), datetime(2025, 11, 25), ["user_id"])
+    with pytest.raises(ValueError):
+        await query_stats(session, datetime(2025, 11, 24), datetime(2025, 11, 25), interval="week")
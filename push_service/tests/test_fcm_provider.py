@@ -0,0 +1,113 @@
+import pytest
+import httpx
+
+from app.services import fcm_standin
+from app.services.push_provider import (
+    FCMPushProvider,
+    DeviceRoutingPushProvider,
+    MockPushProvider
+)
+from app.models.notification import PushNotificationData
+
+
+@pytest.fixture
+def fcm_provider(monkeypatch):
+    monkeypatch.setattr("app.services.push_provider.settings.firebase_project_id", "local")
+    monkeypatch.setattr("app.services.push_provider.settings.firebase_credentials_path", None)
+    monkeypatch.setattr("app.services.push_provider.settings.fcm_base_url", "http://fcm-standin")
+    fcm_standin.sent_messages.clear()
+    return FCMPushProvider(transport=httpx.ASGITransport(app=fcm_standin.app))
+
+
+@pytest.fixture
+def notification_data():
+    return PushNotificationData(
+        title="Welcome!",
+        body="Welcome to our app",
+        data={"action": "welcome", "count": 2},
+        click_action="https://example.com"
+    )
+
+
+@pytest.mark.asyncio
+async def test_fcm_send_notification(fcm_provider, notification_data):
+    """Test a single FCM send against the stand-in"""
+    
+    result = await fcm_provider.send_notification("device-1", notification_data)
+    
+    assert result["success"] is True
+    assert result["provider"] == "fcm"
+    assert result["message_id"].startswith("projects/local/messages/")
+    
+    message = fcm_standin.sent_messages[0]
+    assert message["token"] == "device-1"
+    assert message["data"] == {"action": "welcome", "count": "2"}
+    assert message["webpush"]["fcm_options"]["link"] == "https://example.com"
+    
+    await fcm_provider.close()
+
+
+@pytest.mark.asyncio
+async def test_fcm_send_multicast_reports_per_device(fcm_provider, notification_data):
+    """Test that a multicast returns one result per token, in order"""
+    
+    results = await fcm_provider.send_multicast(
+        ["device-1", "invalid-device", "device-2"],
+        notification_data
+    )
+    
+    assert [result["success"] for result in results] == [True, False, True]
+    assert results[1]["error_code"] == "UNREGISTERED"
+    assert results[1]["invalid_token"] is True
+    assert len(fcm_standin.sent_messages) == 2
+    
+    await fcm_provider.close()
+
+
+@pytest.mark.asyncio
+async def test_fcm_requires_credentials_outside_standin(monkeypatch, notification_data):
+    """Test that the real FCM endpoint is not called without credentials"""
+    
+    monkeypatch.setattr("app.services.push_provider.settings.firebase_project_id", "prod")
+    monkeypatch.setattr("app.services.push_provider.settings.firebase_credentials_path", None)
+    monkeypatch.setattr("app.services.push_provider.settings.fcm_base_url", "https://fcm.googleapis.com")
+    
+    result = await FCMPushProvider().send_notification("device-1", notification_data)
+    
+    assert result["success"] is False
+    assert result["error"] == "FCM credentials not configured"
+
+
+def test_routing_provider_picks_provider_by_device_type():
+    """Test routing by PushToken.device_type"""
+    
+    fcm_provider = MockPushProvider()
+    default_provider = MockPushProvider()
+    router = DeviceRoutingPushProvider(
+        routes={"android": fcm_provider, "web": fcm_provider},
+        default=default_provider
+    )
+    
+    assert router.for_device("android") is fcm_provider
+    assert router.for_device("ios") is default_provider
+    assert router.for_device(None) is default_provider
+
+
+@pytest.mark.asyncio
+async def test_fcm_instances_share_the_client_and_concurrency_limit(monkeypatch):
+    """Test that closing one provider leaves the process-wide client open"""
+    
+    client = httpx.AsyncClient()
+    monkeypatch.setattr(FCMPushProvider, "_shared_client", client)
+    first, second = FCMPushProvider(), FCMPushProvider()
+    
+    assert first._semaphore is second._semaphore
+    assert first._get_client() is second._get_client() is client
+    
+    await first.close()
+    assert not client.is_closed
+    assert second._get_client() is client
+    
+    await FCMPushProvider.close_shared()
+    assert client.is_closed
+    assert FCMPushProvider._shared_client is None
@@ -0,0 +1,71 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from app.api import push_routes
+from app import main
+from app.main import app
+from app.utils.ids import is_uuid
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://push-service")
+
+
+@pytest.fixture
+def producer(monkeypatch):
+    monkeypatch.setattr(push_routes.queue_producer, "publish_notification", AsyncMock())
+    monkeypatch.setattr(push_routes.queue_producer, "publish_notifications", AsyncMock(return_value=[None]))
+    monkeypatch.setattr(push_routes, "status_cache", AsyncMock())
+    return push_routes.queue_producer
+
+
+@pytest.mark.asyncio
+async def test_send_is_served_by_the_push_router(producer):
+    """Test that the served app queues notifications instead of answering with a stub"""
+    
+    async with _client() as client:
+        response = await client.post("/api/v1/push/send", json={
+            "user_id": "user-123",
+            "template_code": "welcome",
+            "variables": {"title": "Welcome", "body": "Hello"},
+            "request_id": "req-123"
+        })
+    
+    assert response.status_code == 202
+    assert is_uuid(response.json()["data"]["notification_id"])
+    producer.publish_notification.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batch_and_metrics_routes_are_mounted(producer):
+    """Test that the batch endpoint and the health router are reachable"""
+    
+    async with _client() as client:
+        batch = await client.post("/api/v1/push/send-batch", json={
+            "request_id": "batch-1",
+            "template_code": "welcome",
+            "recipients": [{"user_id": "user-123"}]
+        })
+        metrics = await client.get("/metrics")
+    
+    assert batch.status_code == 202
+    assert batch.json()["data"]["queued"] == 1
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+
+
+@pytest.mark.asyncio
+async def test_shutdown_closes_the_shared_producer(monkeypatch):
+    """Test that the lifespan hook closes what request handlers opened"""
+    
+    close = AsyncMock()
+    monkeypatch.setattr(push_routes.queue_producer, "close", close)
+    monkeypatch.setattr(main, "status_cache", AsyncMock())
+    monkeypatch.setattr(main, "close_db", AsyncMock())
+    
+    async with main.lifespan(app):
+        close.assert_not_awaited()
+    
+    close.assert_awaited_once()
+    main.close_db.assert_awaited_once()
@@ -0,0 +1,94 @@
+import pytest
+from datetime import date
+
+from app.services.partition_maintenance import (
+    apply_retention,
+    create_partition_sql,
+    partition_name,
+    partition_range,
+    upcoming_periods,
+)
+
+
+class FakeResult(list):
+    pass
+
+
+class FakeConnection:
+    def __init__(self, partitions):
+        # Partition names by parent table
+        self.partitions = partitions
+        self.statements = []
+    
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith("SELECT c.relname"):
+            return FakeResult((name,) for name in self.partitions.get(params["parent"], []))
+        self.statements.append(sql)
+
+
+def test_partition_periods_and_names():
+    """Test daily and weekly period boundaries and partition naming"""
+    
+    # 2025-11-20 is a Thursday
+    assert upcoming_periods(date(2025, 11, 20), "weekly", 2) == [date(2025, 11, 17), date(2025, 11, 24)]
+    assert upcoming_periods(date(2025, 11, 20), "daily", 2) == [date(2025, 11, 20), date(2025, 11, 21)]
+    
+    name = partition_name(date(2025, 11, 17), "weekly")
+    assert name == "push_notifications_w20251117"
+    assert partition_range(name) == (date(2025, 11, 17), date(2025, 11, 24))
+    assert partition_range("push_notifications_legacy") is None
+    assert create_partition_sql(date(2025, 11, 20), "daily").endswith(
+        "FOR VALUES FROM ('2025-11-20') TO ('2025-11-21')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_retention_detaches_expired_partitions(monkeypatch):
+    """Test that only partitions that ended before the cutoff are retired"""
+    
+    monkeypatch.setattr("app.services.partition_maintenance.settings.notification_retention_days", 30)
+    monkeypatch.setattr("app.services.partition_maintenance.settings.notification_retention_mode", "drop")
+    conn = FakeConnection({"push_notifications": [
+        "push_notifications_legacy",
+        "push_notifications_d20251019",
+        "push_notifications_d20251020",
+        "push_notifications_d20251021"
+    ]})
+    
+    retired = await apply_retention(conn, today=date(2025, 11, 20))
+    
+    assert retired == ["push_notifications_d20251019", "push_notifications_d20251020"]
+    assert conn.statements == [
+        "ALTER TABLE push_notifications DETACH PARTITION push_notifications_d20251019",
+        "DROP TABLE push_notifications_d20251019",
+        "ALTER TABLE push_notifications DETACH PARTITION push_notifications_d20251020",
+        "DROP TABLE push_notifications_d20251020"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_timeline_partitions_are_retired_with_notifications(monkeypatch):
+    """Test that push_notification_logs partitions follow the same retention"""
+    
+    monkeypatch.setattr("app.services.partition_maintenance.settings.notification_retention_days", 30)
+    monkeypatch.setattr("app.services.partition_maintenance.settings.notification_retention_mode", "detach")
+    conn = FakeConnection({
+        "push_notifications": ["push_notifications_d20251020"],
+        "push_notification_logs": [
+            "push_notification_logs_legacy",
+            "push_notification_logs_d20251020",
+            "push_notification_logs_d20251021"
+        ]
+    })
+    
+    retired = await apply_retention(conn, today=date(2025, 11, 20))
+    
+    assert retired == ["push_notifications_d20251020", "push_notification_logs_d20251020"]
+    assert conn.statements[-1] == (
+        "ALTER TABLE push_notification_logs DETACH PARTITION push_notification_logs_d20251020"
+    )
+    assert partition_range("push_notification_logs_d20251020") is None
+    assert partition_range("push_notification_logs_d20251020", "push_notification_logs") == (
+        date(2025, 10, 20), date(2025, 10, 21)
+    )
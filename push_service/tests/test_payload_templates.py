@@ -0,0 +1,83 @@
+import json
+
+from app.services.push_provider import (
+    FCMPushProvider,
+    OneSignalPushProvider,
+    PayloadTemplateCache
+)
+from app.models.notification import PushNotificationData
+
+
+def _notification_data(**overrides):
+    fields = {
+        "title": "Sale",
+        "body": "50% off today",
+        "data": {"campaign": "spring", "ids": [1, 2]},
+        "image_url": "https://example.com/banner.png",
+        "click_action": "https://example.com/sale"
+    }
+    fields.update(overrides)
+    return PushNotificationData(**fields)
+
+
+def test_onesignal_payload_splices_recipients():
+    """Test that the spliced OneSignal payload equals a freshly built one"""
+    
+    provider = OneSignalPushProvider()
+    provider.app_id = "app-123"
+    
+    payload = json.loads(provider._build_payload(["p1", "p2"], _notification_data()))
+    
+    assert payload == {
+        "app_id": "app-123",
+        "headings": {"en": "Sale"},
+        "contents": {"en": "50% off today"},
+        "data": {"campaign": "spring", "ids": [1, 2]},
+        "big_picture": "https://example.com/banner.png",
+        "url": "https://example.com/sale",
+        "include_player_ids": ["p1", "p2"]
+    }
+
+
+def test_fcm_template_splices_token():
+    """Test that the FCM template yields a valid message for each token"""
+    
+    prefix, suffix = FCMPushProvider._build_template(_notification_data(click_action=None))
+    message = json.loads(prefix + json.dumps('tok"en').encode() + suffix)["message"]
+    
+    assert message["token"] == 'tok"en'
+    assert message["notification"]["image"] == "https://example.com/banner.png"
+    assert message["data"] == {"campaign": "spring", "ids": "[1, 2]"}
+    assert "webpush" not in message
+
+
+def test_template_cache_reuses_and_evicts():
+    """Test that templates are built once per content and bounded in size"""
+    
+    cache = PayloadTemplateCache(maxsize=2)
+    builds = []
+    
+    def build(name):
+        builds.append(name)
+        return name.encode(), b""
+    
+    cache.get(("app", "a"), lambda: build("a"))
+    cache.get(("app", "a"), lambda: build("a"))
+    cache.get(("app", "b"), lambda: build("b"))
+    cache.get(("app", "c"), lambda: build("c"))
+    cache.get(("app", "a"), lambda: build("a"))
+    
+    assert builds == ["a", "b", "c", "a"]
+
+
+def test_content_key_separates_what_changes_the_payload():
+    """Test that the cache key follows every field that is serialized"""
+    
+    key = PayloadTemplateCache.content_key(_notification_data(template_code="sale"))
+    
+    assert PayloadTemplateCache.content_key(_notification_data(template_code="sale")) == key
+    assert PayloadTemplateCache.content_key(_notification_data(template_code="news")) != key
+    assert PayloadTemplateCache.content_key(_notification_data(template_code="sale", body="60% off")) != key
+    assert PayloadTemplateCache.content_key(
+        _notification_data(template_code="sale", data={"campaign": "spring", "ids": [1, True]})
+    ) != key
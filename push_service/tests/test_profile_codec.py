@@ -0,0 +1,47 @@
+import json
+
+from app.services.profile_codec import PACKED_VERSION, decode_profile, encode_profile
+
+
+def _profile(**overrides):
+    profile = {
+        "user_id": "42",
+        "push_enabled": True,
+        "preferences": {"push_marketing": False, "push_transactional": True, "push_security": True},
+        "push_tokens": [
+            {"token": "f" * 152 + ":APA91b", "device_type": "android"},
+            {"token": "ExponentPushToken[abc]", "device_type": "ios"}
+        ]
+    }
+    profile.update(overrides)
+    return profile
+
+
+def test_packed_round_trip_is_much_smaller_than_json():
+    """Test that User Service profiles are packed losslessly and compactly"""
+    
+    profile = _profile()
+    packed = encode_profile("42", profile, 1700000000.5)
+    
+    assert packed[0] == PACKED_VERSION
+    assert decode_profile("42", packed) == (profile, 1700000001.0)
+    
+    legacy = json.dumps({"fresh_until": 1700000000.5, "profile": profile}).encode()
+    tokens = sum(len(token["token"]) for token in profile["push_tokens"])
+    assert len(packed) - tokens < (len(legacy) - tokens) / 10
+
+
+def test_unexpected_shapes_fall_back_to_json():
+    """Test that profiles the packed layout cannot represent still round-trip"""
+    
+    for profile in (
+        _profile(preferences={"push_marketing": False}),
+        _profile(push_tokens=[{"token": "t", "device_type": "blackberry"}]),
+        _profile(quiet_hours={"start": "22:00"})
+    ):
+        encoded = encode_profile("42", profile, 10)
+        assert encoded[0] != PACKED_VERSION
+        assert decode_profile("42", encoded) == (profile, 10)
+    
+    # Entries written before freshness was tracked
+    assert decode_profile("42", json.dumps(_profile()).encode()) == (_profile(), None)
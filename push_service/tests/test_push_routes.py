@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import AsyncMock
+from fastapi import HTTPException, Response
+
+from app.api import push_routes
+from app.models.notification import NotificationStatus, NotificationStatusUpdate, PushNotificationRequest
+from app.utils.ids import is_uuid
+
+
+@pytest.fixture
+def notification_request():
+    return PushNotificationRequest(
+        user_id="user-123",
+        template_code="welcome",
+        variables={"title": "Welcome", "body": "Hello"},
+        request_id="req-123"
+    )
+
+
+@pytest.mark.asyncio
+async def test_send_enqueues_and_returns_the_assigned_id(notification_request, monkeypatch):
+    """Test that /send queues the request with its notification id instead of delivering inline"""
+    
+    publish = AsyncMock()
+    monkeypatch.setattr(push_routes.queue_producer, "publish_notification", publish)
+    monkeypatch.setattr(push_routes, "_send_inline", AsyncMock())
+    monkeypatch.setattr(push_routes, "status_cache", AsyncMock())
+    
+    result = await push_routes.send_push_notification(notification_request, Response())
+    
+    notification_id = result.data["notification_id"]
+    assert is_uuid(notification_id)
+    [message, correlation_id] = publish.await_args.args
+    assert message["notification_id"] == notification_id
+    assert message["user_id"] == "user-123" and correlation_id == "req-123"
+    push_routes._send_inline.assert_not_awaited()
+    # The id reads as pending until the consumer records the outcome
+    [cached_id, entry] = push_routes.status_cache.set.await_args.args
+    assert cached_id == notification_id and entry["status"] == "pending"
+    assert entry["created_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_send_reports_queue_outage(notification_request, monkeypatch):
+    """Test that a failed publish is a 503, not a silent accept"""
+    
+    monkeypatch.setattr(
+        push_routes.queue_producer,
+        "publish_notification",
+        AsyncMock(side_effect=ConnectionError("broker down"))
+    )
+    
+    with pytest.raises(HTTPException) as error:
+        await push_routes.send_push_notification(notification_request, Response())
+    assert error.value.status_code == 503
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("factory, get_session", [
+    ("AsyncSessionLocal", push_routes.get_db),
+    ("ReadSessionLocal", push_routes.get_read_db),
+])
+async def test_sessions_are_closed_after_the_request(monkeypatch, factory, get_session):
+    """Test that primary and read replica sessions go back to the pool"""
+    
+    session = AsyncMock()
+    session.__aenter__.return_value = session
+    monkeypatch.setattr(push_routes, factory, lambda: session)
+    
+    dependency = get_session()
+    assert await dependency.__anext__() is session
+    with pytest.raises(StopAsyncIteration):
+        await dependency.__anext__()
+    
+    session.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_status_webhook_for_unknown_notification_is_404(monkeypatch):
+    """Test that the webhook reports an unknown id instead of failing or recording it"""
+    
+    monkeypatch.setattr(
+        push_routes.PushNotificationService,
+        "_update_notification_status",
+        AsyncMock(return_value=False)
+    )
+    
+    with pytest.raises(HTTPException) as exc_info:
+        await push_routes.update_notification_status(
+            NotificationStatusUpdate(notification_id="unknown", status=NotificationStatus.DELIVERED),
+            AsyncMock()
+        )
+    
+    assert exc_info.value.status_code == 404
@@ -1,10 +1,28 @@
 import pytest
 import asyncio
 from unittest.mock import Mock, AsyncMock
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.push_service import PushNotificationService
-from app.models.notification import PushNotificationRequest, NotificationType
+from app.services.push_service import TIMELINE_CLOCK_SKEW, PushNotificationService, build_notification_row
+from app.services.status_cache import NotificationStatusCache
+from app.models.notification import PushNotificationRequest, NotificationType, NotificationStatus
+from app.utils.ids import uuid7_time
+from tests.test_user_service_client import FakeRedis
+
+NOTIFICATION_ID = "01936a4e-7c1a-7000-8000-000000000123"
+NOTIFICATION_IDS = [f"01936a4e-7c1a-7000-8000-00000000000{i}" for i in (1, 2, 3)]
+
+
+def _inserted_rows(session):
+    """Rows of every push_notifications insert executed on ``session``, keyed by column"""
+    
+    return [
+        {column.key: value for column, value in row.items()}
+        for call in session.execute.await_args_list
+        if call.args[0].is_insert and call.args[0].table.name == "push_notifications"
+        for row in call.args[0]._multi_values[0]
+    ]
 
 
 @pytest.fixture
@@ -13,8 +31,15 @@ def mock_db_session():
 
 
 @pytest.fixture
-def push_service(mock_db_session):
-    return PushNotificationService(mock_db_session)
+def mock_status_cache():
+    return AsyncMock(get=AsyncMock(return_value=None))
+
+
+@pytest.fixture
+def push_service(mock_db_session, mock_status_cache):
+    service = PushNotificationService(mock_db_session, status_cache=mock_status_cache)
+    service.queue_producer = AsyncMock()
+    return service
 
 
 @pytest.fixture
@@ -92,19 +117,431 @@ async def test_get_notification_status(push_service):
     
     # Mock database query result
     mock_notification = Mock()
-    mock_notification.id = "notif-123"
+    mock_notification.id = NOTIFICATION_ID
     mock_notification.status = "delivered"
     mock_notification.created_at = "2024-01-01T00:00:00Z"
     mock_notification.delivered_at = "2024-01-01T00:01:00Z"
     mock_notification.error_message = None
     
     mock_result = Mock()
-    mock_result.scalar_one_or_none.return_value = mock_notification
+    mock_result.one_or_none.return_value = mock_notification
     
     push_service.db_session.execute = AsyncMock(return_value=mock_result)
     
-    status = await push_service.get_notification_status("notif-123")
+    status = await push_service.get_notification_status(NOTIFICATION_ID)
     
     assert status is not None
-    assert status["notification_id"] == "notif-123"
-    assert status["status"] == "delivered"
\ No newline at end of file
+    assert status["notification_id"] == NOTIFICATION_ID
+    assert status["status"] == "delivered"
+    push_service.status_cache.set.assert_awaited_once_with(NOTIFICATION_ID, status, only_if_missing=True)
+    
+    # Cached statuses don't touch the database
+    push_service.db_session.execute.reset_mock()
+    push_service.status_cache.get.return_value = status
+    assert await push_service.get_notification_status(NOTIFICATION_ID) == status
+    push_service.db_session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_notification_statuses_queries_cache_misses_once(push_service):
+    """Test that a batch lookup does one MGET and one ANY() query for the misses"""
+    
+    cached = {"notification_id": NOTIFICATION_IDS[0], "status": "delivered"}
+    push_service.status_cache.get_many.return_value = {NOTIFICATION_IDS[0]: cached}
+    row = Mock(id=NOTIFICATION_IDS[1], status="failed", created_at=None, delivered_at=None, error_message="Expired")
+    push_service.db_session.execute = AsyncMock(return_value=[row])
+    
+    statuses = await push_service.get_notification_statuses(NOTIFICATION_IDS + [NOTIFICATION_IDS[1], "not-a-uuid"])
+    
+    assert statuses[NOTIFICATION_IDS[0]] == cached
+    assert statuses[NOTIFICATION_IDS[1]]["error_message"] == "Expired"
+    assert NOTIFICATION_IDS[2] not in statuses
+    # Duplicates and malformed ids never reach the cache or the database
+    push_service.status_cache.get_many.assert_awaited_once_with(NOTIFICATION_IDS)
+    push_service.db_session.execute.assert_awaited_once()
+    [query] = push_service.db_session.execute.await_args.args
+    assert query.compile().params["ids"] == [NOTIFICATION_IDS[1], NOTIFICATION_IDS[2]]
+    push_service.status_cache.set_many.assert_awaited_once_with({NOTIFICATION_IDS[1]: statuses[NOTIFICATION_IDS[1]]}, only_if_missing=True)
+
+
+@pytest.mark.asyncio
+async def test_status_reads_use_replica_unless_fresh_read_required(mock_db_session, mock_status_cache):
+    """Test that stale-tolerant reads go to the read session and strict ones to the primary"""
+    
+    read_session = Mock(spec=AsyncSession)
+    read_session.execute = AsyncMock(return_value=Mock(one_or_none=Mock(return_value=None)))
+    mock_db_session.execute = AsyncMock(return_value=Mock(one_or_none=Mock(return_value=None)))
+    service = PushNotificationService(mock_db_session, status_cache=mock_status_cache, read_session=read_session)
+    
+    await service.get_notification_status(NOTIFICATION_IDS[0])
+    read_session.execute.assert_awaited_once()
+    mock_db_session.execute.assert_not_awaited()
+    
+    await service.get_notification_status(NOTIFICATION_IDS[0], allow_stale=False)
+    mock_db_session.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_assigned_notification_id_is_recorded(push_service, sample_notification_request):
+    """Test that an id assigned when the API accepted the request is the one recorded"""
+    
+    push_service.push_provider.send_notification = AsyncMock(return_value={"success": True, "provider": "onesignal"})
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.execute = AsyncMock()
+    push_service.db_session.commit = AsyncMock()
+    request = sample_notification_request.model_copy(update={"notification_id": NOTIFICATION_ID})
+    
+    result = await push_service.process_notification(request, "token-a", "corr-1")
+    
+    assert result["notification_id"] == NOTIFICATION_ID
+    [row] = _inserted_rows(push_service.db_session)
+    assert row["id"] == NOTIFICATION_ID
+
+
+@pytest.mark.asyncio
+async def test_status_is_written_through_to_cache(push_service, sample_notification_request):
+    """Test that final and webhook statuses update the status cache"""
+    
+    push_service.push_provider.send_notification = AsyncMock(return_value={
+        "success": True,
+        "provider": "onesignal"
+    })
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.execute = AsyncMock()
+    push_service.db_session.commit = AsyncMock()
+    
+    result = await push_service.process_notification(sample_notification_request, "token-a", "corr-1")
+    
+    [entries] = push_service.status_cache.set_many.await_args.args
+    entry = entries[result["notification_id"]]
+    assert entry["status"] == "delivered"
+    assert entry["created_at"] is not None
+    
+    row = Mock(id=result["notification_id"], status="failed", created_at=entry["created_at"], delivered_at=None, error_message="Expired")
+    push_service.db_session.execute = AsyncMock(return_value=Mock(one_or_none=Mock(return_value=row)))
+    await push_service._update_notification_status(result["notification_id"], NotificationStatus.FAILED, "Expired")
+    push_service.status_cache.set.assert_awaited_once_with(result["notification_id"], {
+        "notification_id": result["notification_id"],
+        "status": "failed",
+        "created_at": entry["created_at"],
+        "delivered_at": None,
+        "error_message": "Expired"
+    })
+
+@pytest.mark.asyncio
+async def test_status_update_for_unknown_ids_writes_nothing(push_service):
+    """Test that invalid and unknown ids are reported without a timeline row or a commit"""
+    
+    push_service.db_session.execute = AsyncMock(return_value=Mock(one_or_none=Mock(return_value=None)))
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.commit = AsyncMock()
+    
+    assert await push_service._update_notification_status("not-a-uuid", NotificationStatus.FAILED) is False
+    push_service.db_session.execute.assert_not_awaited()
+    
+    assert await push_service._update_notification_status(NOTIFICATION_ID, NotificationStatus.FAILED) is False
+    push_service.db_session.rollback.assert_awaited_once()
+    push_service.db_session.add_all.assert_not_called()
+    push_service.db_session.commit.assert_not_awaited()
+    push_service.status_cache.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_process_multicast_sends_once_per_provider(push_service, sample_notification_request, monkeypatch):
+    """Test that all devices are recorded in one insert and sent in one multicast"""
+    
+    monkeypatch.setattr("app.services.push_service.settings.notification_write_mode", "two_phase")
+    push_service.push_provider.send_multicast = AsyncMock(return_value=[
+        {"success": True, "provider": "onesignal"},
+        {"success": False, "provider": "onesignal", "error": "Invalid device token"}
+    ])
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.commit = AsyncMock()
+    push_service.db_session.execute = AsyncMock()
+    
+    result = await push_service.process_multicast(
+        sample_notification_request,
+        [
+            {"token": "token-a", "device_type": "android"},
+            {"token": "token-b", "device_type": "ios"}
+        ],
+        "correlation-123"
+    )
+    
+    assert result["success"] is True
+    assert [delivery["success"] for delivery in result["deliveries"]] == [True, False]
+    assert result["notification_id"] == result["deliveries"][0]["notification_id"]
+    
+    push_service.push_provider.send_multicast.assert_awaited_once()
+    assert push_service.push_provider.send_multicast.await_args.args[0] == ["token-a", "token-b"]
+    
+    rows = _inserted_rows(push_service.db_session)
+    assert [row["device_token"] for row in rows] == ["token-a", "token-b"]
+    [timeline] = [call.args[0] for call in push_service.db_session.add_all.call_args_list]
+    assert [entry.status for entry in timeline] == ["pending", "pending", "delivered", "failed"]
+    assert timeline[3].error_message == "Invalid device token"
+    
+    # One insert and one bulk status update for both devices, then one rollup upsert
+    _, status_update, rollups = push_service.db_session.execute.await_args_list
+    assert rollups.args[0].table.name == "push_delivery_rollups"
+    assert len(status_update.args[1]) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_write_mode_inserts_final_status_once(push_service, sample_notification_request, monkeypatch):
+    """Test that single-write mode records the outcome in one insert and one commit"""
+    
+    monkeypatch.setattr("app.services.push_service.settings.notification_write_mode", "single")
+    push_service.push_provider.send_notification = AsyncMock(return_value={
+        "success": False,
+        "provider": "onesignal",
+        "error": "Invalid device token"
+    })
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.commit = AsyncMock()
+    push_service.db_session.execute = AsyncMock()
+    
+    result = await push_service.process_notification(
+        sample_notification_request,
+        "invalid-token",
+        "correlation-123"
+    )
+    
+    assert result["success"] is False
+    # The notification row, then the rollup increment once it is recorded
+    assert push_service.db_session.commit.await_count == 2
+    assert push_service.db_session.execute.await_count == 2
+    
+    [row] = _inserted_rows(push_service.db_session)
+    assert row["id"] == result["notification_id"]
+    assert row["status"] == NotificationStatus.FAILED
+    assert row["error_message"] == "Invalid device token"
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_uses_one_statement(push_service, sample_notification_request):
+    """Test that bulk inserts go out as one executemany or one COPY"""
+    
+    rows = [
+        build_notification_row(f"notif-{i}", sample_notification_request, f"token-{i}")
+        for i in range(3)
+    ]
+    push_service.db_session.commit = AsyncMock()
+    push_service.db_session.execute = AsyncMock()
+    
+    assert await push_service.bulk_insert_notifications(rows, method="executemany") == 3
+    push_service.db_session.execute.assert_awaited_once()
+    assert push_service.db_session.execute.await_args.args[1] == rows
+    
+    driver_connection = Mock(copy_records_to_table=AsyncMock())
+    raw_connection = Mock(driver_connection=driver_connection)
+    connection = Mock(get_raw_connection=AsyncMock(return_value=raw_connection))
+    push_service.db_session.connection = AsyncMock(return_value=connection)
+    
+    assert await push_service.bulk_insert_notifications(rows, method="copy") == 3
+    kwargs = driver_connection.copy_records_to_table.await_args.kwargs
+    assert "metadata" in kwargs["columns"]
+    assert kwargs["records"][0][kwargs["columns"].index("status")] == "pending"
+    assert kwargs["records"][0][kwargs["columns"].index("variables")].startswith("{")
+    
+    with pytest.raises(ValueError):
+        await push_service.bulk_insert_notifications(rows, method="csv")
+
+
+@pytest.mark.asyncio
+async def test_timeline_goes_through_status_writer(mock_db_session, sample_notification_request):
+    """Test that timeline entries are buffered when a status writer is given"""
+    
+    status_writer = AsyncMock()
+    service = PushNotificationService(mock_db_session, status_writer, AsyncMock())
+    service.queue_producer = AsyncMock()
+    service.push_provider.send_notification = AsyncMock(return_value={
+        "success": True,
+        "provider": "onesignal",
+        "message_id": "msg-123"
+    })
+    service.db_session.add_all = Mock()
+    service.db_session.execute = AsyncMock()
+    service.db_session.commit = AsyncMock()
+    
+    result = await service.process_notification(sample_notification_request, "token-a", "corr-1")
+    
+    [rows] = status_writer.add_log.await_args.args
+    assert [row["status"] for row in rows] == ["pending", "delivered"]
+    assert all(row["notification_id"] == result["notification_id"] for row in rows)
+    assert rows[1]["metadata_"] == {"provider": "onesignal", "message_id": "msg-123"}
+    
+    # Only the notification row itself is written inline
+    service.db_session.add_all.assert_not_called()
+    assert len(_inserted_rows(service.db_session)) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_recording_is_not_counted_twice(mock_db_session, sample_notification_request, monkeypatch):
+    """Test that a failure after the timeline was buffered only appends the failure, counted once"""
+    
+    monkeypatch.setattr("app.services.push_service.settings.notification_write_mode", "single")
+    status_writer = AsyncMock()
+    service = PushNotificationService(mock_db_session, status_writer, AsyncMock())
+    service.queue_producer = AsyncMock()
+    service.push_provider.send_notification = AsyncMock(return_value={"success": True, "provider": "onesignal"})
+    service.db_session.add_all = Mock()
+    service.db_session.execute = AsyncMock()
+    service.db_session.rollback = AsyncMock()
+    service.db_session.commit = AsyncMock(side_effect=[Exception("connection reset"), None])
+    
+    result = await service.process_notification(sample_notification_request, "token-a", "corr-1")
+    
+    assert result["success"] is False
+    appended = [call.args[0] for call in status_writer.add_log.await_args_list]
+    assert [[row["status"] for row in rows] for rows in appended] == [["pending", "delivered"], ["failed"]]
+    [(template_code, counts)] = [call.args for call in status_writer.add_rollups.await_args_list]
+    assert counts == {("failed", "onesignal"): 1}
+
+
+@pytest.mark.asyncio
+async def test_rollup_and_status_publish_failures_keep_a_delivered_send(push_service, sample_notification_request, monkeypatch):
+    """Test that best-effort steps after the outcome is recorded can't fail the notification"""
+    
+    monkeypatch.setattr("app.services.push_service.settings.notification_write_mode", "single")
+    monkeypatch.setattr("app.services.push_service.upsert_rollups", AsyncMock(side_effect=Exception("deadlock detected")))
+    push_service.push_provider.send_notification = AsyncMock(return_value={"success": True, "provider": "onesignal"})
+    push_service.queue_producer.send_status_update = AsyncMock(side_effect=Exception("channel closed"))
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.execute = AsyncMock()
+    push_service.db_session.commit = AsyncMock()
+    
+    result = await push_service.process_notification(sample_notification_request, "token-a", "corr-1")
+    
+    assert result["success"] is True
+    push_service.db_session.rollback.assert_awaited_once()
+    # Only the delivered outcome was written
+    assert [row["status"] for row in _inserted_rows(push_service.db_session)] == [NotificationStatus.DELIVERED]
+
+
+@pytest.mark.asyncio
+async def test_timeline_reads_start_at_the_notification_partition(push_service):
+    """Test that timeline reads for UUIDv7 ids are bounded on the log partition key"""
+    
+    push_service.read_session.execute = AsyncMock(return_value=Mock(scalars=Mock(return_value=[])))
+    
+    await push_service.get_notification_timeline(NOTIFICATION_ID)
+    
+    [statement] = [call.args[0] for call in push_service.read_session.execute.await_args_list]
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert "push_notification_logs.timestamp >=" in str(statement)
+    assert uuid7_time(NOTIFICATION_ID) - params["timestamp_1"] == TIMELINE_CLOCK_SKEW
+
+
+@pytest.mark.asyncio
+async def test_redelivered_message_upserts_the_same_rows(push_service, sample_notification_request, monkeypatch):
+    """Test that processing a message twice writes the same ids with ON CONFLICT"""
+    
+    monkeypatch.setattr("app.services.push_service.settings.notification_write_mode", "single")
+    push_service.push_provider.send_multicast = AsyncMock(return_value=[
+        {"success": True, "provider": "onesignal"},
+        {"success": True, "provider": "onesignal"}
+    ])
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.commit = AsyncMock()
+    push_service.db_session.execute = AsyncMock()
+    request = sample_notification_request.model_copy(update={"notification_id": NOTIFICATION_ID})
+    devices = [{"token": "token-a", "device_type": "android"}, {"token": "token-b", "device_type": "ios"}]
+    
+    first = await push_service.process_multicast(request, devices, "corr-1")
+    second = await push_service.process_multicast(request, devices, "corr-1")
+    
+    assert first["deliveries"] == second["deliveries"]
+    rows = _inserted_rows(push_service.db_session)
+    assert [row["id"] for row in rows[:2]] == [row["id"] for row in rows[2:]]
+    assert rows[1]["id"] != NOTIFICATION_ID
+    # created_at comes from the id, so the (id, created_at) key matches again
+    assert len({row["created_at"] for row in rows}) == 1
+    insert = push_service.db_session.execute.await_args_list[0].args[0]
+    assert "ON CONFLICT (id, created_at) DO UPDATE" in str(insert.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_rolled_back_before_recording_the_failure(push_service, sample_notification_request, monkeypatch):
+    """Test that a failed insert rolls the session back and the failure is still recorded"""
+    
+    monkeypatch.setattr("app.services.push_service.settings.notification_write_mode", "single")
+    push_service.push_provider.send_notification = AsyncMock(return_value={"success": True, "provider": "onesignal"})
+    push_service.db_session.add_all = Mock()
+    push_service.db_session.execute = AsyncMock()
+    push_service.db_session.rollback = AsyncMock()
+    push_service.db_session.commit = AsyncMock(side_effect=[Exception("deadlock detected"), None, None])
+    
+    result = await push_service.process_notification(sample_notification_request, "token-a", "corr-1")
+    
+    assert result["success"] is False
+    assert result["error"] == "deadlock detected"
+    push_service.db_session.rollback.assert_awaited_once()
+    delivered, failed = _inserted_rows(push_service.db_session)
+    assert delivered["id"] == failed["id"]
+    assert failed["status"] == NotificationStatus.FAILED
+
+
+@pytest.mark.asyncio
+async def test_id_lookups_and_updates_include_the_partition_key(push_service):
+    """Test that UUIDv7 ids are looked up and updated together with their created_at"""
+    
+    push_service.db_session.execute = AsyncMock(return_value=Mock(one_or_none=Mock(return_value=None)))
+    push_service.db_session.commit = AsyncMock()
+    legacy_id = "6f1c2f9e-3b7a-4c55-9d3e-0a6b8f7e2c11"
+    
+    await push_service.get_notification_status(NOTIFICATION_ID)
+    [query] = push_service.db_session.execute.await_args.args
+    params = query.compile().params
+    assert params["ids"] == [NOTIFICATION_ID]
+    assert params["created"] == [uuid7_time(NOTIFICATION_ID)]
+    
+    push_service.db_session.execute.reset_mock()
+    await push_service._update_notification_statuses([
+        (NOTIFICATION_ID, NotificationStatus.DELIVERED, None),
+        (legacy_id, NotificationStatus.FAILED, "Expired")
+    ])
+    (keyed, keyed_rows), (legacy, legacy_rows) = [call.args for call in push_service.db_session.execute.await_args_list]
+    assert keyed_rows[0]["created_at"] == uuid7_time(NOTIFICATION_ID)
+    assert legacy_rows == [{
+        "b_id": legacy_id,
+        "status": NotificationStatus.FAILED,
+        "updated_at": legacy_rows[0]["updated_at"],
+        "delivered_at": None,
+        "error_message": "Expired"
+    }]
+
+
+@pytest.mark.asyncio
+async def test_stale_read_fill_does_not_undo_a_status_update(mock_db_session, sample_notification_request):
+    """Test that a read which loaded the old status before an update can't cache it afterwards"""
+    
+    cache = NotificationStatusCache()
+    cache.redis_client = FakeRedis()
+    replica_read = asyncio.Event()
+    update_done = asyncio.Event()
+    
+    def status_row(status, error_message=None):
+        row = Mock(id=NOTIFICATION_ID, status=status, created_at=uuid7_time(NOTIFICATION_ID), delivered_at=None, error_message=error_message)
+        return Mock(one_or_none=Mock(return_value=row))
+    
+    async def lagging_read(statement):
+        replica_read.set()
+        await update_done.wait()
+        return status_row("pending")
+    
+    read_session = Mock(spec=AsyncSession, execute=AsyncMock(side_effect=lagging_read))
+    mock_db_session.execute = AsyncMock(return_value=status_row("failed", "Expired"))
+    mock_db_session.commit = AsyncMock()
+    mock_db_session.add_all = Mock()
+    service = PushNotificationService(mock_db_session, status_cache=cache, read_session=read_session)
+    
+    read = asyncio.create_task(service.get_notification_status(NOTIFICATION_ID))
+    await replica_read.wait()
+    await service._update_notification_status(NOTIFICATION_ID, NotificationStatus.FAILED, "Expired")
+    update_done.set()
+    
+    # The read returns what it saw, but the cache keeps the update
+    assert (await read)["status"] == "pending"
+    assert (await cache.get(NOTIFICATION_ID))["status"] == "failed"
+    assert (await service.get_notification_status(NOTIFICATION_ID))["error_message"] == "Expired"
@@ -0,0 +1,92 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from app.services.queue_consumer import QueueConsumer
+from app.services.user_service_client import UserServiceUnavailable
+
+
+def _message(body, headers=None, timestamp=None):
+    message = Mock()
+    message.body = json.dumps(body).encode()
+    message.correlation_id = "corr-1"
+    message.headers = headers or {}
+    message.timestamp = timestamp
+    message.ack = AsyncMock()
+    return message
+
+
+@pytest.fixture
+def status_cache(monkeypatch):
+    cache = AsyncMock()
+    monkeypatch.setattr("app.services.queue_consumer.status_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def consumer(status_cache):
+    consumer = QueueConsumer()
+    consumer.producer = AsyncMock()
+    consumer.user_client.get_delivery_profile = AsyncMock(
+        side_effect=UserServiceUnavailable("down")
+    )
+    return consumer
+
+
+@pytest.fixture
+def message_body():
+    return {
+        "notification_type": "push",
+        "user_id": "42",
+        "template_code": "welcome",
+        "request_id": "req-1"
+    }
+
+
+@pytest.mark.asyncio
+async def test_unavailable_user_service_defers_message(consumer, message_body, monkeypatch):
+    """Test that the defer policy parks the message instead of failing it"""
+    
+    monkeypatch.setattr("app.services.queue_consumer.settings.user_service_fallback", "defer")
+    message = _message(message_body, headers={"x-deferrals": 1})
+    
+    await consumer._process_message(message)
+    
+    [deferred, deferrals, correlation_id] = consumer.producer.defer_message.await_args.args
+    assert (deferrals, correlation_id) == (2, "corr-1")
+    # The deferred copy keeps the id assigned to the message
+    assert deferred == {**message_body, "notification_id": deferred["notification_id"]}
+    consumer.producer.send_to_failed_queue.assert_not_awaited()
+    message.ack.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_deferral_limit_and_skip_policy_fail_the_message(consumer, message_body, status_cache, monkeypatch):
+    """Test that exhausted deferrals and the skip policy go to the failed queue"""
+    
+    monkeypatch.setattr("app.services.queue_consumer.settings.user_service_max_deferrals", 3)
+    await consumer._process_message(_message(message_body, headers={"x-deferrals": 3}))
+    
+    monkeypatch.setattr("app.services.queue_consumer.settings.user_service_fallback", "skip")
+    await consumer._process_message(_message(message_body))
+    
+    consumer.producer.defer_message.assert_not_awaited()
+    assert consumer.producer.send_to_failed_queue.await_count == 2
+    # The pending status reported since the message was accepted is replaced
+    assert [call.args[1]["status"] for call in status_cache.set.await_args_list] == ["failed", "failed"]
+
+
+@pytest.mark.asyncio
+async def test_redelivered_message_gets_the_same_notification_id(consumer, message_body, monkeypatch):
+    """Test that a message published without an id is given a stable one"""
+    
+    monkeypatch.setattr("app.services.queue_consumer.settings.user_service_fallback", "skip")
+    timestamp = datetime(2025, 11, 28, 9, 30, tzinfo=timezone.utc)
+    for _ in range(2):
+        await consumer._process_message(_message(message_body, timestamp=timestamp))
+    
+    first, second = [call.args[0] for call in consumer.producer.send_to_failed_queue.await_args_list]
+    assert first["notification_id"] == second["notification_id"]
+    assert first["notification_id"].startswith("019")
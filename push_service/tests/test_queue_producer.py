@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services import queue_producer as queue_producer_module
+from app.services.queue_producer import QueueProducer
+
+
+@pytest.fixture
+def connect_robust(monkeypatch):
+    connection = MagicMock()
+    connection.channel = AsyncMock()
+    connection.close = AsyncMock()
+    connect = AsyncMock(return_value=connection)
+    monkeypatch.setattr(queue_producer_module.aio_pika, "connect_robust", connect)
+    return connect
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_publishes_share_one_connection(connect_robust):
+    """Test that racing connects open a single AMQP connection"""
+    
+    producer = QueueProducer()
+    
+    await asyncio.gather(*(producer.connect() for _ in range(5)))
+    
+    connect_robust.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_close_allows_reconnecting(connect_robust):
+    """Test that a closed producer connects again on next use"""
+    
+    producer = QueueProducer()
+    await producer.connect()
+    await producer.close()
+    
+    assert producer.channel is None
+    await producer.connect()
+    assert connect_robust.await_count == 2
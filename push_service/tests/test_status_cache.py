@@ -0,0 +1,47 @@
+import pytest
+from datetime import datetime
+
+from app.services.status_cache import NotificationStatusCache
+from tests.test_user_service_client import FakeRedis
+
+
+@pytest.fixture
+def status_cache():
+    cache = NotificationStatusCache()
+    cache.redis_client = FakeRedis()
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_status_round_trip(status_cache):
+    """Test that cached statuses survive Redis with their TTL"""
+    
+    created_at = datetime(2025, 11, 20, 10, 0, 0)
+    await status_cache.set_many({
+        "notif-1": {"notification_id": "notif-1", "status": "pending", "created_at": created_at, "error_message": None}
+    })
+    
+    assert status_cache.redis_client.ttls["push_status:notif-1"] == status_cache.ttl
+    entry = await status_cache.get("notif-1")
+    assert entry["created_at"] == "2025-11-20T10:00:00"
+
+
+@pytest.mark.asyncio
+async def test_get_many_returns_only_cached_entries(status_cache):
+    """Test that batch lookups come back from one MGET keyed by id"""
+    
+    await status_cache.set("notif-1", {"notification_id": "notif-1", "status": "delivered"})
+    
+    entries = await status_cache.get_many(["notif-1", "notif-2"])
+    
+    assert entries == {"notif-1": {"notification_id": "notif-1", "status": "delivered"}}
+
+
+@pytest.mark.asyncio
+async def test_read_populated_entries_do_not_replace_written_status(status_cache):
+    """Test that a status loaded by a (possibly lagging) read never overwrites a newer one"""
+    
+    await status_cache.set("notif-1", {"notification_id": "notif-1", "status": "delivered"})
+    await status_cache.set("notif-1", {"notification_id": "notif-1", "status": "pending"}, only_if_missing=True)
+    
+    assert (await status_cache.get("notif-1"))["status"] == "delivered"
@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from datetime import datetime
+
+from app.models.notification import NotificationStatus
+from app.services.status_writer import StatusWriteBuffer
+
+
+class FakeSession:
+    def __init__(self, log, fail=False):
+        self.log = log
+        self.fail = fail
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def execute(self, statement, params=None):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.log.append((str(statement), params))
+    
+    async def commit(self):
+        pass
+
+
+def _buffer(log, fail=lambda: False, **kwargs):
+    return StatusWriteBuffer(session_factory=lambda: FakeSession(log, fail()), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_one_update_per_batch():
+    """Test that pending transitions are coalesced and written with UPDATE ... FROM unnest(...)"""
+    
+    log = []
+    buffer = _buffer(log, max_batch=2, max_pending=10)
+    
+    await buffer.add("n1", NotificationStatus.PENDING)
+    await buffer.add("n1", NotificationStatus.DELIVERED)
+    await buffer.add("n2", NotificationStatus.FAILED, "Invalid device token")
+    await buffer.add("n3", NotificationStatus.DELIVERED)
+    
+    assert await buffer.flush() == 3
+    assert len(log) == 2
+    statement, params = log[0]
+    assert "FROM unnest(" in statement
+    assert params["statuses"][0] == "delivered" and params["delivered"][0] is not None
+    assert params["errors"][1] == "Invalid device token"
+    # Batches of different sizes use the same statement text
+    assert log[1][0] == statement and len(log[1][1]["ids"]) == 1
+    assert len(buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_size_trigger_and_close_flush():
+    """Test that a full batch wakes the flusher and close writes the rest"""
+    
+    log = []
+    buffer = _buffer(log, max_batch=2, flush_interval=60, max_pending=10)
+    buffer.start()
+    
+    await buffer.add("n1", NotificationStatus.DELIVERED)
+    await buffer.add("n2", NotificationStatus.DELIVERED)
+    await asyncio.sleep(0.01)
+    assert len(log) == 1
+    
+    await buffer.add("n3", NotificationStatus.DELIVERED)
+    await buffer.close()
+    assert len(log) == 2
+    assert buffer.stats()["flushed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_transitions_within_bound():
+    """Test that a failed flush requeues transitions without exceeding max_pending"""
+    
+    log = []
+    failing = [True]
+    buffer = _buffer(log, fail=lambda: failing[0], max_batch=2, max_pending=3)
+    
+    for i in range(3):
+        await buffer.add(f"n{i}", NotificationStatus.DELIVERED)
+    
+    # Reaching max_pending forced an inline flush, which failed and requeued
+    assert len(buffer) == 3
+    assert buffer.stats()["failed_flushes"] == 1
+    
+    failing[0] = False
+    assert await buffer.flush() == 3
+    assert len(buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_timeline_rows_are_appended_in_the_same_flush():
+    """Test that timeline rows are inserted in batches alongside status updates"""
+    
+    log = []
+    buffer = _buffer(log, max_batch=2, max_pending=10)
+    
+    await buffer.add("n1", NotificationStatus.DELIVERED)
+    await buffer.add_log([{"notification_id": "n1", "status": status} for status in ("pending", "delivered", "failed")])
+    
+    assert await buffer.flush() == 4
+    statements = [statement for statement, _ in log]
+    assert statements[0].startswith("UPDATE push_notifications")
+    assert [s.startswith("INSERT INTO push_notification_logs") for s in statements[1:]] == [True, True]
+    assert len(log[1][1]) == 2 and len(log[2][1]) == 1
+
+
+@pytest.mark.asyncio
+async def test_rollup_increments_are_summed_before_upsert():
+    """Test that rollup increments for the same minute collapse into one counter row"""
+    
+    log = []
+    buffer = _buffer(log, max_batch=10, max_pending=100)
+    timestamp = datetime(2025, 11, 24, 10, 15, 42)
+    
+    await buffer.add_rollups("welcome", {("delivered", "fcm"): 2, ("failed", "fcm"): 1}, timestamp)
+    await buffer.add_rollups("welcome", {("delivered", "fcm"): 3}, timestamp.replace(second=5))
+    assert len(buffer) == 2
+    
+    assert await buffer.flush() == 2
+    [(statement, _)] = log
+    assert "ON CONFLICT (bucket, status, template_code, provider) DO UPDATE" in statement
+    assert buffer.stats()["pending_rollups"] == 0
+
+
+@pytest.mark.asyncio
+async def test_uuid7_ids_are_matched_with_their_partition_key():
+    """Test that UUIDv7 ids are updated on (id, created_at) within the batch's time range"""
+    
+    log = []
+    buffer = _buffer(log, max_batch=10, max_pending=10)
+    
+    await buffer.add("01936a4e-7c1a-7000-8000-000000000001", NotificationStatus.DELIVERED)
+    await buffer.add("01936a4e-8000-7000-8000-000000000002", NotificationStatus.DELIVERED)
+    await buffer.add("n3", NotificationStatus.FAILED)
+    
+    assert await buffer.flush() == 3
+    (keyed, keyed_params), (legacy, legacy_params) = log
+    assert "n.created_at = v.created_at" in keyed and "BETWEEN" in keyed
+    assert keyed_params["created"][0] == keyed_params["created_from"] == datetime(2024, 11, 26, 21, 9, 8, 762000)
+    assert keyed_params["created_to"] == keyed_params["created"][1]
+    assert legacy.endswith("WHERE n.id = v.id")
+    assert legacy_params["ids"] == ["n3"] and legacy_params["created"] == [None]
@@ -0,0 +1,41 @@
+from unittest.mock import patch
+
+from app.utils.ttl_cache import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    """Test that entries are dropped once their TTL has passed"""
+    
+    cache = TTLCache(maxsize=10, ttl=5)
+    
+    with patch("app.utils.ttl_cache.time.monotonic", return_value=100.0):
+        cache.set("user-1", {"push_enabled": True})
+    
+    with patch("app.utils.ttl_cache.time.monotonic", return_value=104.9):
+        assert cache.get("user-1") == {"push_enabled": True}
+    
+    with patch("app.utils.ttl_cache.time.monotonic", return_value=105.0):
+        assert cache.get("user-1") is None
+    
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Test LRU eviction and the hit-rate statistics"""
+    
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.75
@@ -0,0 +1,419 @@
+import asyncio
+import json
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.profile_codec import decode_profile, encode_profile
+from app.services.user_service_client import (
+    CACHE_IF_CURRENT_SCRIPT,
+    UserServiceClient,
+    UserServiceUnavailable,
+    UNKNOWN_USER,
+)
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis.asyncio commands we use"""
+    
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+    
+    async def get(self, key):
+        value = self.store.get(key)
+        return value.encode() if isinstance(value, str) else value
+    
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+        self.ttls[key] = ttl
+    
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+    
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+    
+    async def exists(self, key):
+        return int(key in self.store)
+    
+    async def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+    
+    async def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+    
+    async def expire(self, key, ttl):
+        self.ttls[key] = ttl
+        return int(key in self.store)
+    
+    async def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == CACHE_IF_CURRENT_SCRIPT:
+            if self.store.get(keys[1], "0") != argv[0]:
+                return 0
+            await self.setex(keys[0], argv[1], argv[2])
+            return 1
+        # Compare-and-delete lock release
+        if self.store.get(keys[0]) == argv[0]:
+            return await self.delete(keys[0])
+        return 0
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    async def close(self):
+        pass
+
+
+class FakePipeline:
+    """Buffers commands and applies them on execute, like a redis pipeline"""
+    
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+    
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+    
+    async def execute(self):
+        results = [
+            await getattr(self.redis_client, name)(*args)
+            for name, args in self.commands
+        ]
+        self.commands = []
+        return results
+
+
+@pytest.fixture
+def user_client():
+    client = UserServiceClient()
+    client.redis_client = FakeRedis()
+    return client
+
+
+@pytest.fixture
+def sample_profile():
+    return {
+        "user_id": "42",
+        "push_enabled": True,
+        "preferences": {"push_marketing": False},
+        "push_tokens": [
+            {"token": "token-a", "device_type": "android"},
+            {"token": "token-b", "device_type": "ios"}
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_delivery_profile_is_fetched_once_and_cached(user_client, sample_profile):
+    """Test that a miss costs one User Service call and later lookups hit the cache"""
+    
+    user_client._fetch_delivery_profile = AsyncMock(return_value=sample_profile)
+    
+    first = await user_client.get_delivery_profile("42")
+    second = await user_client.get_delivery_profile("42")
+    
+    assert first == sample_profile
+    assert second == sample_profile
+    user_client._fetch_delivery_profile.assert_awaited_once_with("42")
+
+
+@pytest.mark.asyncio
+async def test_legacy_lookups_share_the_profile(user_client, sample_profile):
+    """Test that token and preference lookups are served by one profile fetch"""
+    
+    user_client._fetch_delivery_profile = AsyncMock(return_value=sample_profile)
+    
+    assert await user_client.get_user_device_token("42") == "token-a"
+    assert [t["token"] for t in await user_client.get_user_device_tokens("42")] == ["token-a", "token-b"]
+    assert await user_client.get_user_preferences("42") == {"push": True, "push_marketing": False}
+    user_client._fetch_delivery_profile.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_user_service_is_not_cached(user_client):
+    """Test that failed lookups fall back to the default preference"""
+    
+    user_client._fetch_delivery_profile = AsyncMock(return_value=None)
+    
+    assert await user_client.get_user_device_token("42") is None
+    assert await user_client.get_user_preferences("42") == {"push": True}
+    assert user_client.redis_client.store == {}
+
+
+@pytest.mark.asyncio
+async def test_get_many_fetches_only_cache_misses(user_client, sample_profile, monkeypatch):
+    """Test that get_many reads the cache in one MGET and batches the misses"""
+    
+    monkeypatch.setattr("app.services.user_service_client.settings.user_service_batch_size", 2)
+    user_client._fetch_delivery_profile = AsyncMock(return_value=sample_profile)
+    await user_client.get_delivery_profile("42")
+    
+    async def fetch_many(user_ids):
+        return {
+            user_id: {**sample_profile, "user_id": user_id}
+            for user_id in user_ids if user_id != "404"
+        }
+    
+    user_client._fetch_delivery_profiles = AsyncMock(side_effect=fetch_many)
+    
+    profiles = await user_client.get_many(["7", "42", "8", "404", "7"])
+    
+    assert list(profiles) == ["7", "42", "8", "404"]
+    assert profiles["42"] == sample_profile
+    assert profiles["8"]["user_id"] == "8"
+    assert profiles["404"] is None
+    fetched_ids = [call.args[0] for call in user_client._fetch_delivery_profiles.await_args_list]
+    assert fetched_ids == [["7", "8"], ["404"]]
+    
+    # Fetched profiles are cached, so a second call makes no requests
+    user_client._fetch_delivery_profiles.reset_mock()
+    await user_client.get_many(["7", "8"])
+    user_client._fetch_delivery_profiles.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_many_reports_failed_lookups_apart_from_unknown_users(user_client, sample_profile, monkeypatch):
+    """Test that users whose batch failed raise instead of looking unknown"""
+    
+    monkeypatch.setattr("app.services.user_service_client.settings.user_service_batch_size", 2)
+    
+    async def fetch_many(user_ids):
+        if "9" in user_ids:
+            return None
+        return {"7": {**sample_profile, "user_id": "7"}}
+    
+    user_client._fetch_delivery_profiles = AsyncMock(side_effect=fetch_many)
+    
+    with pytest.raises(UserServiceUnavailable) as error:
+        await user_client.get_many(["7", "404", "9"])
+    
+    assert error.value.user_ids == ["9"]
+    assert error.value.profiles == {"7": {**sample_profile, "user_id": "7"}, "404": None}
+
+
+@pytest.mark.asyncio
+async def test_in_process_cache_skips_redis(user_client, sample_profile):
+    """Test that repeated lookups for a hot user stay in process"""
+    
+    user_client._fetch_delivery_profile = AsyncMock(return_value=sample_profile)
+    await user_client.get_delivery_profile("42")
+    
+    user_client.redis_client.get = AsyncMock(side_effect=AssertionError("Redis was called"))
+    
+    for _ in range(3):
+        assert await user_client.get_delivery_profile("42") == sample_profile
+    assert (await user_client.get_many(["42"]))["42"] == sample_profile
+    assert user_client.l1_cache.stats()["hits"] == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch(user_client, sample_profile):
+    """Test that a burst of lookups for one user makes a single backend call"""
+    
+    async def slow_fetch(user_id):
+        await asyncio.sleep(0.01)
+        return sample_profile
+    
+    user_client._fetch_delivery_profile = AsyncMock(side_effect=slow_fetch)
+    
+    results = await asyncio.gather(*(
+        user_client.get_delivery_profile("42") for _ in range(20)
+    ))
+    
+    assert all(result == sample_profile for result in results)
+    user_client._fetch_delivery_profile.assert_awaited_once_with("42")
+    assert "user_delivery_profile_lock:42" not in user_client.redis_client.store
+
+
+@pytest.mark.asyncio
+async def test_waits_for_fetch_in_other_process(user_client, sample_profile, monkeypatch):
+    """Test that a lookup waits for another process holding the fetch lock"""
+    
+    monkeypatch.setattr("app.services.user_service_client.settings.user_cache_lock_poll_interval", 0.001)
+    store = user_client.redis_client.store
+    store["user_delivery_profile_lock:42"] = "other-process"
+    user_client._fetch_delivery_profile = AsyncMock(return_value=sample_profile)
+    
+    async def other_process_fills_cache():
+        await asyncio.sleep(0.005)
+        store["user_delivery_profile:42"] = json.dumps(sample_profile)
+        del store["user_delivery_profile_lock:42"]
+    
+    result, _ = await asyncio.gather(
+        user_client.get_delivery_profile("42"),
+        other_process_fills_cache()
+    )
+    
+    assert result == sample_profile
+    user_client._fetch_delivery_profile.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_batch_and_single_lookups_are_coalesced(user_client, sample_profile):
+    """Test that single lookups wait for an in-flight batch fetch"""
+    
+    async def slow_fetch_many(user_ids):
+        await asyncio.sleep(0.01)
+        return {user_id: {**sample_profile, "user_id": user_id} for user_id in user_ids}
+    
+    user_client._fetch_delivery_profiles = AsyncMock(side_effect=slow_fetch_many)
+    user_client._fetch_delivery_profile = AsyncMock(return_value=sample_profile)
+    
+    many, single = await asyncio.gather(
+        user_client.get_many(["1", "2"]),
+        user_client.get_delivery_profile("2")
+    )
+    
+    assert many["2"] == single
+    user_client._fetch_delivery_profile.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_unknown_users_are_negatively_cached(user_client, monkeypatch):
+    """Test that unknown users are cached with the shorter negative TTL"""
+    
+    monkeypatch.setattr("app.services.user_service_client.settings.user_cache_negative_ttl", 30)
+    user_client._fetch_delivery_profile = AsyncMock(return_value=UNKNOWN_USER)
+    
+    assert await user_client.get_delivery_profile("404") is None
+    
+    # A fresh process only sees the Redis entry
+    user_client.l1_cache.clear()
+    assert await user_client.get_delivery_profile("404") is None
+    assert (await user_client.get_many(["404"]))["404"] is None
+    
+    user_client._fetch_delivery_profile.assert_awaited_once()
+    assert user_client.redis_client.store["user_delivery_profile:404"] == "__unknown_user__"
+    assert user_client.redis_client.ttls["user_delivery_profile:404"] == 30
+
+
+@pytest.mark.asyncio
+async def test_users_without_tokens_use_negative_ttl(user_client, sample_profile, monkeypatch):
+    """Test TTL selection for users with and without push tokens"""
+    
+    monkeypatch.setattr("app.services.user_service_client.settings.user_cache_negative_ttl", 30)
+    monkeypatch.setattr("app.services.user_service_client.settings.user_cache_max_stale", 100)
+    
+    async def fetch_many(user_ids):
+        return {
+            "1": sample_profile,
+            "2": {**sample_profile, "push_tokens": []},
+            "3": {**sample_profile, "push_enabled": False, "push_tokens": []}
+        }
+    
+    user_client._fetch_delivery_profiles = AsyncMock(side_effect=fetch_many)
+    await user_client.get_many(["1", "2", "3"])
+    
+    ttls = user_client.redis_client.ttls
+    assert ttls["user_delivery_profile:1"] == user_client.cache_ttl + 100
+    assert ttls["user_delivery_profile:2"] == 30 + 100
+    assert ttls["user_delivery_profile:3"] == user_client.cache_ttl + 100
+
+
+def _expire(user_client, user_id):
+    """Move a cached profile past its freshness without hitting its hard expiry"""
+    
+    key = f"user_delivery_profile:{user_id}"
+    profile, _ = decode_profile(user_id, user_client.redis_client.store[key])
+    user_client.redis_client.store[key] = encode_profile(user_id, profile, 0)
+    user_client.l1_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_stale_profile_is_served_while_refreshing(user_client, sample_profile):
+    """Test that an expired entry is returned at once and refreshed in the background"""
+    
+    updated = {**sample_profile, "push_enabled": False}
+    user_client._fetch_delivery_profile = AsyncMock(side_effect=[sample_profile, updated])
+    await user_client.get_delivery_profile("42")
+    _expire(user_client, "42")
+    
+    assert await user_client.get_delivery_profile("42") == sample_profile
+    assert await user_client.get_many(["42"]) == {"42": sample_profile}
+    await asyncio.gather(*user_client._refresh_tasks.values())
+    
+    assert user_client._fetch_delivery_profile.await_count == 2
+    user_client.l1_cache.clear()
+    assert await user_client.get_delivery_profile("42") == updated
+
+
+@pytest.mark.asyncio
+async def test_refresh_overlapping_an_invalidation_is_not_cached(user_client, sample_profile):
+    """Test that background refreshes started before a change event don't write back what they fetched"""
+    
+    other = {**sample_profile, "user_id": "43"}
+    user_client._fetch_delivery_profiles = AsyncMock(return_value={"42": sample_profile, "43": other})
+    await user_client.get_many(["42", "43"])
+    _expire(user_client, "42")
+    _expire(user_client, "43")
+    
+    refresh_started = asyncio.Event()
+    invalidated = asyncio.Event()
+    
+    async def slow_fetch(user_ids):
+        refresh_started.set()
+        await invalidated.wait()
+        return {"42": sample_profile, "43": other}
+    
+    user_client._fetch_delivery_profiles = AsyncMock(side_effect=slow_fetch)
+    assert await user_client.get_many(["42", "43"]) == {"42": sample_profile, "43": other}
+    await refresh_started.wait()
+    await user_client.invalidate("42")
+    invalidated.set()
+    await asyncio.gather(*user_client._refresh_tasks.values())
+    
+    # Only the user that didn't change is cached again
+    assert "user_delivery_profile:42" not in user_client.redis_client.store
+    assert user_client.l1_cache.get("42") is None
+    assert user_client.l1_cache.get("43") == other
+
+
+@pytest.mark.asyncio
+async def test_stale_profile_survives_user_service_outage(user_client, sample_profile):
+    """Test that a failed refresh keeps serving the stale profile instead of defaults"""
+    
+    user_client._fetch_delivery_profile = AsyncMock(side_effect=[sample_profile, None])
+    await user_client.get_delivery_profile("42")
+    _expire(user_client, "42")
+    
+    await user_client.get_delivery_profile("42")
+    await asyncio.gather(*user_client._refresh_tasks.values())
+    user_client.l1_cache.clear()
+    
+    assert await user_client.get_user_preferences("42") == {"push": True, "push_marketing": False}
+    assert "user_delivery_profile:42" in user_client.redis_client.store
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_when_user_service_is_down(user_client, monkeypatch):
+    """Test that repeated 5xx answers open the breaker and stop hitting the User Service"""
+    
+    calls = []
+    
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+    
+    user_client.http_client = httpx.AsyncClient(
+        base_url="http://users", transport=httpx.MockTransport(handler)
+    )
+    user_client.circuit_breaker.failure_threshold = 2
+    
+    for user_id in ("1", "2", "3", "4"):
+        with pytest.raises(UserServiceUnavailable):
+            await user_client.get_delivery_profile(user_id)
+    
+    assert len(calls) == 2
+    assert await user_client.get_user_preferences("5") == {"push": True}
+    await user_client.close()